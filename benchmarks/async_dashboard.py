@@ -0,0 +1,101 @@
+"""
+Dashboard assembly: serial Database calls against concurrent AsyncDatabase calls.
+
+Each dashboard needs the accounts, the unread alerts, the monthly summary,
+the expenses by category and the recent transactions of a user. The serial
+path issues these reads one after the other; the async path gathers them,
+and assembles the dashboards of several users at once. --rtt-ms adds a
+per-statement latency to the local SQLite file so the numbers reflect a
+networked MySQL server.
+
+Usage:
+    python -m benchmarks.async_dashboard [--users 20] [--rtt-ms 2] [--workers 8]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.posting import BenchDatabase
+from data.async_database import AsyncDatabase
+from data.config import ENGINE
+
+
+def serial_dashboard(db, user_id):
+    db.account_cache.invalidate(user_id)  # mesurer la lecture, pas le cache
+    return (
+        db.get_user_accounts(user_id),
+        db.get_alerts(user_id),
+        db.get_monthly_summary(user_id),
+        db.get_expenses_by_category(user_id),
+        db.get_user_transactions(user_id, {"limit": 5}),
+    )
+
+
+async def async_dashboard(adb, user_id):
+    adb.db.account_cache.invalidate(user_id)
+    return await adb.gather(
+        adb.get_user_accounts(user_id),
+        adb.get_alerts(user_id),
+        adb.get_monthly_summary(user_id),
+        adb.get_expenses_by_category(user_id),
+        adb.get_user_transactions(user_id, {"limit": 5}),
+    )
+
+
+async def async_dashboards(adb, user_ids):
+    return await asyncio.gather(*(async_dashboard(adb, user_id) for user_id in user_ids))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="simulated round trip per statement, in ms")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent calls (and pooled connections)")
+    args = parser.parse_args(argv)
+
+    settings = None
+    if ENGINE == "sqlite" and "BUDGET_DB_PATH" not in os.environ:
+        settings = {"path": os.path.join(tempfile.mkdtemp(), "bench_async.db")}
+    db = BenchDatabase(settings=settings, pool_options={"size": args.workers})
+    user_ids = []
+    for n in range(args.users):
+        _, _, user_id = db.register_user("Bench", "Async", f"bench.async.{n}.{time.time_ns()}@example.com", "Bench-Async-2024!")
+        account_id = db.get_user_accounts(user_id)[0]["account_id"]
+        db.add_transactions_bulk([
+            {"account_id": account_id, "amount": "12.50", "description": f"Bench {i}",
+             "transaction_type": 1 if i % 4 == 0 else 2, "category_id": 8 if i % 4 == 0 else 1 + i % 7}
+            for i in range(40)
+        ])
+        user_ids.append(user_id)
+    db.rtt = args.rtt_ms / 1000
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        serial_dashboard(db, user_id)
+    serial = time.perf_counter() - started
+
+    async def run():
+        async with AsyncDatabase(db, workers=args.workers) as adb:
+            started = time.perf_counter()
+            for user_id in user_ids:
+                await async_dashboard(adb, user_id)
+            one_at_a_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            await async_dashboards(adb, user_ids)
+            return one_at_a_time, time.perf_counter() - started
+
+    gathered, concurrent = asyncio.run(run())
+
+    print(f"{args.users} dashboards, {args.rtt_ms:g} ms per round trip, {args.workers} workers")
+    print(f"serial Database calls:          {serial * 1000 / args.users:>7.1f} ms/dashboard")
+    print(f"gathered, one user at a time:   {gathered * 1000 / args.users:>7.1f} ms/dashboard   x{serial / gathered:.1f}")
+    print(f"gathered, all users at once:    {concurrent * 1000 / args.users:>7.1f} ms/dashboard   x{serial / concurrent:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Throughput of Database.add_transactions_bulk against add_transaction.
+
+Loads synthetic transactions into a scratch database and prints rows/sec
+for both paths. The bulk path is expected to sustain at least 50k rows/sec.
+
+Usage:
+    python -m benchmarks.bulk_insert [--rows 200000] [--batch 10000] [--single 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from data.config import ENGINE
+from data.database import Database
+
+
+def make_rows(count, account_ids, seed=42):
+    """Generate synthetic deposit / withdrawal / transfer rows."""
+    rng = random.Random(seed)
+    for i in range(count):
+        type_id = rng.choice((1, 2, 2, 2, 3))
+        row = {
+            "account_id": rng.choice(account_ids),
+            "amount": f"{rng.randint(1, 50000) / 100:.2f}",
+            "description": f"Bench {i}",
+            "transaction_type": type_id,
+            "category_id": 8 if type_id == 1 else rng.randint(1, 7),
+            "transaction_date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00",
+        }
+        if type_id == 3:
+            row["to_account_id"] = rng.choice(account_ids)
+        yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="rows loaded with add_transactions_bulk")
+    parser.add_argument("--batch", type=int, default=10000, help="rows per add_transactions_bulk call")
+    parser.add_argument("--single", type=int, default=2000, help="rows loaded with add_transaction")
+    args = parser.parse_args(argv)
+
+    settings = None
+    if ENGINE == "sqlite" and "BUDGET_DB_PATH" not in os.environ:
+        settings = {"path": os.path.join(tempfile.mkdtemp(), "bench_bulk.db")}
+    db = Database(settings=settings)
+    _, _, user_id = db.register_user("Bench", "Bulk", f"bench.bulk.{time.time_ns()}@example.com", "Bench-Bulk-2024!")
+    account_ids = [account["account_id"] for account in db.get_user_accounts(user_id)]
+
+    rows = list(make_rows(args.single, account_ids))
+    started = time.perf_counter()
+    for row in rows:
+        db.add_transaction(row["account_id"], row["amount"], row["description"], row["transaction_type"],
+                           row["category_id"], row.get("to_account_id"))
+    single_rate = args.single / (time.perf_counter() - started)
+    print(f"add_transaction:       {single_rate:>10,.0f} rows/s ({args.single} rows)")
+
+    rows = list(make_rows(args.rows, account_ids, seed=7))
+    started = time.perf_counter()
+    for start in range(0, len(rows), args.batch):
+        ok, message, errors = db.add_transactions_bulk(rows[start:start + args.batch])
+        if not ok or errors:
+            print(message, errors[:5])
+            return 1
+    bulk_rate = args.rows / (time.perf_counter() - started)
+    print(f"add_transactions_bulk: {bulk_rate:>10,.0f} rows/s ({args.rows} rows, batches of {args.batch})")
+    print(f"speed-up: x{bulk_rate / single_rate:.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
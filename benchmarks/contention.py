@@ -0,0 +1,133 @@
+"""
+Stress test of concurrent postings on a handful of accounts.
+
+Worker threads post random transfers (in both directions) and withdrawals
+between a few accounts as fast as they can. At the end every balance must
+equal its funding plus the ledger of committed transactions, and the sum of
+the balances must only have dropped by the committed withdrawals: any lost
+update, double debit or half-applied transfer shows up as a mismatch.
+
+Usage:
+    python -m benchmarks.contention [--threads 16] [--postings 300] [--accounts 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from data.config import ENGINE
+from data.database import Database
+
+
+class StressDatabase(Database):
+    """Database counting the lock conflicts it replays."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.conflicts = 0
+        self._conflicts_lock = threading.Lock()
+        is_transient = self.engine.is_transient
+
+        def counting(error):
+            transient = is_transient(error)
+            if transient:
+                with self._conflicts_lock:
+                    self.conflicts += 1
+            return transient
+
+        self.engine.is_transient = counting
+
+
+def _worker(db, account_ids, postings, seed, outcome):
+    rng = random.Random(seed)
+    for i in range(postings):
+        amount = f"{rng.randint(1, 2000) / 100:.2f}"
+        if rng.random() < 0.8:
+            source, destination = rng.sample(account_ids, 2)
+            ok, message = db.transfer(source, destination, amount, f"Stress {seed}-{i}")
+        else:
+            ok, message = db.add_transaction(rng.choice(account_ids), amount, f"Stress {seed}-{i}", 2, 2)
+        key = "committed" if ok else ("refused" if "Solde insuffisant" in message else "failed")
+        outcome[key] += 1
+        if key == "failed":
+            outcome["errors"].append(message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--postings", type=int, default=300, help="postings per thread")
+    parser.add_argument("--accounts", type=int, default=3, help="accounts shared by all threads (>= 2)")
+    parser.add_argument("--funding", default="10000.00", help="initial balance of each account")
+    args = parser.parse_args(argv)
+
+    settings = None
+    if ENGINE == "sqlite" and "BUDGET_DB_PATH" not in os.environ:
+        settings = {"path": os.path.join(tempfile.mkdtemp(), "bench_contention.db")}
+    db = StressDatabase(settings=settings, pool_options={"size": args.threads})
+    _, _, user_id = db.register_user("Bench", "Stress", f"bench.stress.{time.time_ns()}@example.com", "Bench-Stress-2024!")
+    with db._connection() as (conn, cursor):
+        for n in range(1, args.accounts):
+            cursor.execute("INSERT INTO accounts (user_id, account_name) VALUES (%s, %s)", (user_id, f"Stress {n}"))
+        conn.commit()
+    account_ids = sorted(account["account_id"] for account in db.get_user_accounts(user_id))
+    for account_id in account_ids:
+        db.add_transaction(account_id, args.funding, "Stress funding", 1, 8)
+
+    outcomes = [{"committed": 0, "refused": 0, "failed": 0, "errors": []} for _ in range(args.threads)]
+    threads = [threading.Thread(target=_worker, args=(db, account_ids, args.postings, seed, outcomes[seed]))
+               for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    committed = sum(outcome["committed"] for outcome in outcomes)
+    refused = sum(outcome["refused"] for outcome in outcomes)
+    failed = sum(outcome["failed"] for outcome in outcomes)
+    print(f"{args.threads} threads x {args.postings} postings on {args.accounts} accounts in {elapsed:.1f}s "
+          f"({committed / elapsed:,.0f} committed/s)")
+    print(f"committed: {committed}   refused (balance): {refused}   failed: {failed}   lock conflicts replayed: {db.conflicts}")
+
+    # Soldes attendus d'après le grand livre
+    placeholders = ','.join('%s' for _ in account_ids)
+    with db._connection() as (conn, cursor):
+        cursor.execute(f"SELECT account_id, balance FROM accounts WHERE account_id IN ({placeholders})", account_ids)
+        balances = {row["account_id"]: Decimal(str(row["balance"])) for row in cursor.fetchall()}
+        cursor.execute(f"SELECT account_id, to_account_id, type_id, amount FROM transactions WHERE account_id IN ({placeholders})", account_ids)
+        expected = {account_id: Decimal("0.00") for account_id in account_ids}
+        withdrawn = Decimal("0.00")
+        for row in cursor.fetchall():
+            amount = Decimal(str(row["amount"]))
+            if row["type_id"] == 1:
+                expected[row["account_id"]] += amount
+            else:
+                expected[row["account_id"]] -= amount
+                if row["type_id"] == 3:
+                    expected[row["to_account_id"]] += amount
+                else:
+                    withdrawn += amount
+
+    funding = Decimal(args.funding) * len(account_ids)
+    mismatches = {account_id: (balances[account_id], expected[account_id])
+                  for account_id in account_ids if balances[account_id] != expected[account_id]}
+    negative = [account_id for account_id in account_ids if balances[account_id] < 0]
+    print(f"total: {sum(balances.values())} (funding {funding} - withdrawals {withdrawn})")
+    if mismatches or negative or sum(balances.values()) != funding - withdrawn or failed:
+        print(f"INCONSISTENT: mismatches={mismatches} negative={negative}")
+        for outcome in outcomes:
+            for message in outcome["errors"][:3]:
+                print(" ", message)
+        return 1
+    print("balances consistent with the ledger: no lost update")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
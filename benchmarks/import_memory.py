@@ -0,0 +1,68 @@
+"""
+Peak memory of data.importer on statements of growing size.
+
+Writes synthetic CSV statements to a scratch directory, imports each one
+into a scratch database and reports the peak Python heap (tracemalloc)
+and the throughput. The peak must stay flat as the statement grows: it is
+bounded by the chunk size, not by the file.
+
+Usage:
+    python -m benchmarks.import_memory [--lines 20000 200000 2000000] [--chunk-size 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from data.config import ENGINE
+from data.database import Database
+from data.importer import import_statement
+
+
+def write_statement(path, lines):
+    """Write a French-style CSV statement (Débit / Crédit columns)."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Date opération;Libellé;Débit;Crédit;Catégorie\n")
+        for i in range(lines):
+            day = f"{i % 28 + 1:02d}/{i % 12 + 1:02d}/2024"
+            if i % 5:
+                f.write(f"{day};Carte {i};{i % 9000 / 100 + 1:.2f};;Repas\n")
+            else:
+                f.write(f"{day};Virement {i};;{i % 90000 / 100 + 1:.2f};Revenu\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[20000, 200000])
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    settings = {"path": os.path.join(directory, "bench_import.db")} if ENGINE == "sqlite" else None
+    db = Database(settings=settings)
+    _, _, user_id = db.register_user("Bench", "Import", f"bench.import.{time.time_ns()}@example.com", "Bench-Import-2024!")
+    account_id = db.get_user_accounts(user_id)[0]["account_id"]
+
+    for lines in args.lines:
+        path = os.path.join(directory, f"statement_{lines}.csv")
+        write_statement(path, lines)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        ok, message, report = import_statement(db, path, account_id, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        os.remove(path)
+
+        if not ok:
+            print(message)
+            return 1
+        print(f"{lines:>9,} lines: peak {peak / 1e6:6.1f} MB, {lines / elapsed:>8,.0f} lines/s ({message})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Concurrent logins: password verification inline against a process pool.
+
+Registers --users users, then logs each of them in --rounds times from
+--threads threads, first with the key derivation run in the calling thread,
+then with a PasswordHasher process pool. Also reports the one-off cost of
+upgrading legacy '<hash>:<salt>' passwords on their first login.
+
+Usage:
+    python -m benchmarks.login [--users 16] [--threads 8] [--iterations 600000] [--workers 0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data.config import ENGINE, SECURITY
+from data.database import Database
+from data.security import LEGACY_ITERATIONS, PasswordHasher, hash_password, parse_hash
+
+PASSWORD = "Bench-Login-2024!"
+
+
+def login_all(db, emails, threads, rounds):
+    """Log every user in rounds times from threads threads; return logins per second."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda email: db.login_user(email, PASSWORD), emails * rounds))
+    elapsed = time.perf_counter() - started
+    failed = [message for success, message, _ in results if not success]
+    if failed:
+        raise SystemExit(f"{len(failed)} failed logins: {failed[0]}")
+    return len(results) / elapsed
+
+
+def legacy_hash(password):
+    # Ancien format "hash:sel", 100 000 itérations
+    _, salt, key = parse_hash(hash_password(password, LEGACY_ITERATIONS))
+    return f"{key.hex()}:{salt.hex()}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=1, help="logins per user")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent logins")
+    parser.add_argument("--iterations", type=int, default=SECURITY["pbkdf2_iterations"], help="PBKDF2 cost")
+    parser.add_argument("--workers", type=int, default=0, help="hashing processes (0: min(2, CPUs))")
+    args = parser.parse_args(argv)
+
+    # Le coût voyage dans chaque hachage : les processus du pool n'ont pas besoin de ce réglage
+    SECURITY["pbkdf2_iterations"] = args.iterations
+
+    settings = None
+    if ENGINE == "sqlite" and "BUDGET_DB_PATH" not in os.environ:
+        settings = {"path": os.path.join(tempfile.mkdtemp(), "bench_login.db")}
+    db = Database(settings=settings, pool_options={"size": args.threads})
+    inline = PasswordHasher(workers=-1)
+    pool = PasswordHasher(workers=args.workers)
+    db.hasher = pool
+
+    stamp = time.time_ns()
+    emails = [f"bench.login.{n}.{stamp}@example.com" for n in range(args.users)]
+    for email in emails:
+        success, message, _ = db.register_user("Bench", "Login", email, PASSWORD)
+        if not success:
+            raise SystemExit(message)
+
+    results = {}
+    for name, hasher in (("inline, 1 thread", inline), (f"inline, {args.threads} threads", inline),
+                         (f"process pool, {args.threads} threads", pool)):
+        db.hasher = hasher
+        threads = 1 if name.endswith("1 thread") else args.threads
+        results[name] = login_all(db, emails, threads, args.rounds)
+
+    # Première connexion avec un mot de passe à l'ancien format : vérification + nouveau hachage
+    with db._connection() as (conn, cursor):
+        cursor.executemany("UPDATE users SET password = %s WHERE email = %s",
+                           [(legacy_hash(PASSWORD), email) for email in emails])
+        conn.commit()
+    results[f"legacy upgrade, {args.threads} threads"] = login_all(db, emails, args.threads, 1)
+    with db._connection() as (conn, cursor):
+        cursor.execute("SELECT COUNT(*) AS n FROM users WHERE email IN (%s) AND password LIKE %s"
+                       % (", ".join(["%s"] * len(emails)), "%s"), (*emails, "pbkdf2_sha256$%"))
+        upgraded = cursor.fetchone()["n"]
+    pool.shutdown()
+
+    print(f"{args.users} users x {args.rounds} logins, PBKDF2-SHA256 {args.iterations} iterations, "
+          f"{pool.workers or min(2, os.cpu_count())} hashing process(es), {os.cpu_count()} CPU(s)")
+    baseline = next(iter(results.values()))
+    for name, rate in results.items():
+        print(f"{name:<30} {rate:>8.1f} logins/s   x{rate / baseline:.1f}")
+    print(f"legacy hashes upgraded:        {upgraded}/{args.users}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
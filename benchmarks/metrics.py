@@ -0,0 +1,83 @@
+"""
+Cost of the data-layer instrumentation on the hot read paths.
+
+The metrics are switched on at import time (BUDGET_METRICS), so each mode
+runs in its own interpreter: the same read loop is timed with the metrics
+disabled and enabled, and the difference is reported per call.
+
+Usage:
+    python -m benchmarks.metrics [--users 5] [--rounds 300]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from data.config import ENGINE
+
+
+def read_loop(users, rounds):
+    """Time the hot reads of a freshly seeded database; print the seconds per call."""
+    from data.database import Database
+
+    settings = None
+    if ENGINE == "sqlite" and "BUDGET_DB_PATH" not in os.environ:
+        settings = {"path": os.path.join(tempfile.mkdtemp(), "bench_metrics.db")}
+    db = Database(settings=settings)
+    ids = []
+    for n in range(users):
+        _, _, user_id = db.register_user("Bench", "Metrics", f"bench.metrics.{n}.{time.time_ns()}@example.com",
+                                         "Bench-Metrics-2024!")
+        account_id = db.get_user_accounts(user_id)[0]["account_id"]
+        db.add_transactions_bulk([
+            {"account_id": account_id, "amount": "4.20", "description": f"Bench {i}",
+             "transaction_type": 1 if i % 3 == 0 else 2, "category_id": 8 if i % 3 == 0 else 1 + i % 7}
+            for i in range(50)
+        ])
+        ids.append((user_id, account_id))
+
+    calls = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for user_id, account_id in ids:
+            db.get_user_accounts(user_id)
+            db.get_account_balance(account_id)
+            db.get_user_transactions(user_id, {"limit": 10})
+            db.get_monthly_summary(user_id)
+            db.get_alerts(user_id)
+            calls += 5
+    print((time.perf_counter() - started) / calls)
+
+
+def run_child(enabled, users, rounds):
+    env = dict(os.environ, BUDGET_METRICS="1" if enabled else "0", BUDGET_PBKDF2_ITERATIONS="1000")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.metrics", "--child", "--users", str(users), "--rounds", str(rounds)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        read_loop(args.users, args.rounds)
+        return 0
+
+    disabled = run_child(False, args.users, args.rounds)
+    enabled = run_child(True, args.users, args.rounds)
+    print(f"{args.users} users x {args.rounds} rounds of 5 reads")
+    print(f"metrics disabled:  {disabled * 1e6:>8.1f} us/call")
+    print(f"metrics enabled:   {enabled * 1e6:>8.1f} us/call   +{(enabled - disabled) * 1e6:.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Postings per second of add_transaction / transfer against the former posting path.
+
+The former path read the balances before writing them back (START
+TRANSACTION, SELECT, UPDATE, ...) and the home screen posted a transfer as
+two separate add_transaction calls. The current path is a fixed batch of
+read-free writes, and a transfer is one call. Every statement and commit is
+a round trip to the server; --rtt-ms adds that latency to a local SQLite
+file so the numbers reflect a networked MySQL server.
+
+Usage:
+    python -m benchmarks.posting [--postings 500] [--rtt-ms 1.0]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from data.config import ENGINE
+from data.database import Database
+
+
+class _LatencyCursor:
+    """Cursor proxy sleeping rtt seconds per statement and counting them."""
+
+    def __init__(self, cursor, counter, rtt):
+        self._cursor = cursor
+        self._counter = counter
+        self._rtt = rtt
+
+    def execute(self, sql, params=()):
+        self._counter["statements"] += 1
+        if self._rtt:
+            time.sleep(self._rtt)
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _LatencyConnection:
+    """Connection proxy sleeping rtt seconds per commit and counting them."""
+
+    def __init__(self, conn, counter, rtt):
+        self._conn = conn
+        self._counter = counter
+        self._rtt = rtt
+
+    def commit(self):
+        self._counter["statements"] += 1
+        if self._rtt:
+            time.sleep(self._rtt)
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class BenchDatabase(Database):
+    """Database with simulated network latency and the former posting path."""
+
+    def __init__(self, *args, rtt=0.0, **kwargs):
+        self.counter = {"statements": 0}
+        self.rtt = 0.0  # pas de latence pendant la création des tables
+        super().__init__(*args, **kwargs)
+        self.rtt = rtt
+
+    def _get_connection(self, streaming=False):
+        conn, cursor = super()._get_connection(streaming)
+        return (_LatencyConnection(conn, self.counter, self.rtt),
+                _LatencyCursor(cursor, self.counter, self.rtt))
+
+    def legacy_add_transaction(self, account_id, amount, description, transaction_type,
+                               category_id=None, to_account_id=None):
+        """Former add_transaction: read the balances, compute, write them back."""
+        reference = f"TRX-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+        with self._connection() as (conn, cursor):
+            cursor.execute("START TRANSACTION")
+            cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
+            current_balance = Decimal(str(cursor.fetchone()['balance']))
+            amount = Decimal(str(amount))
+            if transaction_type == 3:
+                cursor.execute("SELECT account_id FROM accounts WHERE account_id = %s", (to_account_id,))
+                cursor.fetchone()
+            if transaction_type == 1:
+                cursor.execute("UPDATE accounts SET balance = %s WHERE account_id = %s",
+                               (str(current_balance + amount), account_id))
+            else:
+                if current_balance < amount:
+                    return False, "Solde insuffisant."
+                cursor.execute("UPDATE accounts SET balance = %s WHERE account_id = %s",
+                               (str(current_balance - amount), account_id))
+                if transaction_type == 3:
+                    cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (to_account_id,))
+                    dest_balance = Decimal(str(cursor.fetchone()['balance']))
+                    cursor.execute("UPDATE accounts SET balance = %s WHERE account_id = %s",
+                                   (str(dest_balance + amount), to_account_id))
+            cursor.execute(
+                """
+                INSERT INTO transactions (reference, description, amount, account_id, category_id, type_id, to_account_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                (reference, description, str(amount), account_id, category_id, transaction_type, to_account_id)
+            )
+            self._update_rollups(cursor, "t.transaction_id = %s", (cursor.lastrowid,))
+            conn.commit()
+        self.account_cache.invalidate_accounts(account_id, to_account_id)
+        return True, "Transaction effectuée avec succès."
+
+    def legacy_transfer(self, from_account_id, to_account_id, amount, description):
+        """Former home screen transfer: one add_transaction call per leg."""
+        ok, message = self.legacy_add_transaction(from_account_id, amount, description, 3,
+                                                  to_account_id=to_account_id)
+        if ok:
+            ok, message = self.legacy_add_transaction(to_account_id, amount, description, 3,
+                                                      to_account_id=from_account_id)
+        return ok, message
+
+
+def _measure(db, count, post):
+    """Run post(i) count times; return (postings/s, statements per posting)."""
+    db.counter["statements"] = 0
+    started = time.perf_counter()
+    for i in range(count):
+        ok, message = post(i)
+        if not ok:
+            raise RuntimeError(message)
+    elapsed = time.perf_counter() - started
+    return count / elapsed, db.counter["statements"] / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--postings", type=int, default=500, help="postings per scenario")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="simulated round trip per statement, in ms")
+    args = parser.parse_args(argv)
+
+    settings = None
+    if ENGINE == "sqlite" and "BUDGET_DB_PATH" not in os.environ:
+        settings = {"path": os.path.join(tempfile.mkdtemp(), "bench_posting.db")}
+    db = BenchDatabase(settings=settings, rtt=args.rtt_ms / 1000)
+    _, _, user_id = db.register_user("Bench", "Posting", f"bench.posting.{time.time_ns()}@example.com", "Bench-Post-2024!")
+    with db._connection() as (conn, cursor):
+        cursor.execute("INSERT INTO accounts (user_id, account_name, balance) VALUES (%s, %s, %s)",
+                       (user_id, "Bench epargne", "0.00"))
+        conn.commit()
+    source, destination = sorted(account["account_id"] for account in db.get_user_accounts(user_id))
+    db.add_transaction(source, "1000000.00", "Bench funding", 1, 8)
+
+    scenarios = [
+        ("deposit", lambda i: db.legacy_add_transaction(source, "1.00", f"Bench {i}", 1, 8),
+                    lambda i: db.add_transaction(source, "1.00", f"Bench {i}", 1, 8)),
+        ("transfer", lambda i: db.legacy_transfer(source, destination, "1.00", f"Bench {i}"),
+                     lambda i: db.transfer(source, destination, "1.00", f"Bench {i}")),
+    ]
+    print(f"{args.postings} postings per scenario, {args.rtt_ms:g} ms per round trip")
+    for name, legacy, current in scenarios:
+        old_rate, old_trips = _measure(db, args.postings, legacy)
+        new_rate, new_trips = _measure(db, args.postings, current)
+        print(f"{name:<9} before: {old_rate:>8,.0f} postings/s ({old_trips:.0f} round trips)"
+              f"   after: {new_rate:>8,.0f} postings/s ({new_trips:.0f} round trips)"
+              f"   x{new_rate / old_rate:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
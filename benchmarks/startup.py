@@ -0,0 +1,91 @@
+"""
+Cold-start guard: import time of the login window module.
+
+Imports gui.login in fresh interpreters with -X importtime, keeps the best
+run, and fails when it exceeds the budget (STARTUP['import_budget_ms']) or
+when a module that only the home page needs (matplotlib, gui.homepage) is
+imported with it. The slowest imports are listed to show what to defer.
+
+Usage:
+    python -m benchmarks.startup [--budget-ms 800] [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from data.config import STARTUP
+
+MODULE = "gui.login"
+
+# Chargés en arrière-plan après l'affichage de la fenêtre de connexion, jamais à l'import
+DEFERRED = ("matplotlib", "gui.homepage")
+
+# Affiché par le processus fils après l'import : les modules différés déjà chargés
+_CHILD = (
+    "import sys, {module}\n"
+    "print(','.join(name for name in {deferred!r} if name in sys.modules))\n"
+)
+
+
+def import_once(module):
+    """
+    Import module in a fresh interpreter.
+
+    Returns:
+        tuple: (cumulative import time of module in us, {module: cumulative us},
+            deferred modules that were imported).
+    """
+    env = dict(os.environ, BUDGET_WATCHDOG="0", BUDGET_TRACE="", BUDGET_PROFILE_ACTIONS="0")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(module=module, deferred=DEFERRED)],
+        env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    times = {}
+    # "import time:       self [us] |  cumulative | imported package"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return times.get(module, 0), times, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP["import_budget_ms"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    try:
+        # Le premier import compile les .pyc : le meilleur essai mesure un démarrage normal
+        runs = [import_once(args.module) for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(f"Cannot import {args.module}: {e}")
+        return 1
+    total, times, loaded = min(runs, key=lambda run: run[0])
+
+    print(f"Slowest imports under {args.module} (cumulative):")
+    for name, cumulative in sorted(times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+    failures = []
+    if loaded:
+        failures.append(f"{args.module} imports {', '.join(loaded)} (load it lazily)")
+    if total / 1000 > args.budget_ms:
+        failures.append(f"import of {args.module} took {total / 1000:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"STARTUP REGRESSION: {failure}")
+    if failures:
+        return 1
+    print(f"{args.module} imported in {total / 1000:.0f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Hot read paths with and without prepared statements.
+
+Runs the reads of the home and transactions screens (listings with filters
+and sorts, keyset pages, monthly and category summaries, alerts) in a loop,
+first with every statement parsed and planned on each call, then through
+the query templates and the per-connection prepared statements. On SQLite
+the first pass runs on a copy of the database opened with sqlite3's own
+statement cache disabled, the closest equivalent of MySQL's text protocol.
+
+Usage:
+    python -m benchmarks.statements [--users 10] [--transactions 200] [--rounds 200]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from data.config import ENGINE
+from data.database import Database
+
+
+def read_round(db, users):
+    """The reads of one visit to the home and transactions screens, for every user."""
+    for user_id, account_id in users:
+        db.get_user_transactions(user_id, {"limit": 20})
+        db.get_account_transactions(account_id, {"category_id": 2, "sort_by": "amount", "sort_order": "desc"})
+        page, cursor = db.get_user_transactions_page(user_id, {"start_date": "2000-01-01"}, page_size=20)
+        db.get_user_transactions_page(user_id, {"start_date": "2000-01-01"}, cursor, page_size=20)
+        db.get_monthly_summary(user_id)
+        db.get_category_summary(user_id)
+        db.get_expenses_by_category(user_id)
+        db.get_alerts(user_id)
+
+
+def timed(db, users, rounds):
+    read_round(db, users)  # préparation et caches chauds
+    started = time.perf_counter()
+    for _ in range(rounds):
+        read_round(db, users)
+    return (time.perf_counter() - started) / rounds / len(users)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=200, help="transactions per user")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    settings = None
+    if ENGINE == "sqlite" and "BUDGET_DB_PATH" not in os.environ:
+        settings = {"path": os.path.join(tempfile.mkdtemp(), "bench_statements.db")}
+    db = Database(settings=settings)
+    users = []
+    for n in range(args.users):
+        _, _, user_id = db.register_user("Bench", "Statements", f"bench.statements.{n}.{time.time_ns()}@example.com",
+                                         "Bench-Statements-2024!")
+        account_id = db.get_user_accounts(user_id)[0]["account_id"]
+        db.add_transactions_bulk([
+            {"account_id": account_id, "amount": "12.50", "description": f"Bench {i}",
+             "transaction_type": 1 if i % 4 == 0 else 2, "category_id": 8 if i % 4 == 0 else 1 + i % 7}
+            for i in range(args.transactions)
+        ])
+        users.append((user_id, account_id))
+
+    if db.engine.name == "sqlite":
+        # Copie ouverte sans cache de requêtes compilées : chaque appel recompile ses requêtes
+        path = db.engine.path + ".unprepared"
+        with sqlite3.connect(db.engine.path) as source, sqlite3.connect(path) as target:
+            source.backup(target)
+        unprepared = Database(settings=dict(settings or {}, path=path, cached_statements=0))
+    else:
+        unprepared = db
+    size = db.statement_cache.size
+
+    unprepared.statement_cache.size = 0
+    baseline = timed(unprepared, users, args.rounds)
+    unprepared.statement_cache.size = size
+    db.statement_cache.size = size or 64  # même avec BUDGET_DB_STATEMENT_CACHE=0
+    prepared = timed(db, users, args.rounds)
+
+    print(f"{args.users} users x {args.transactions} transactions, {args.rounds} rounds of 8 reads, {db.engine.name}")
+    print(f"parsed on every call:    {baseline * 1000:>7.2f} ms/user")
+    print(f"templates + prepared:    {prepared * 1000:>7.2f} ms/user   x{baseline / prepared:.2f}")
+    stats = db.statement_stats()
+    print(f"templates: {stats['templates']}")
+    print(f"prepared:  {stats['prepared']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
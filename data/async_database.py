@@ -0,0 +1,144 @@
+"""
+Asyncio facade over Database.
+
+Every public method of Database is available as a coroutine with the same
+name and arguments. Calls run on a bounded thread pool sized like the
+connection pool, so a coroutine never blocks the event loop and at most
+`workers` queries run at once; the others wait in the executor queue, not
+in the connection pool.
+
+    async with AsyncDatabase() as db:
+        accounts, alerts, summary = await db.gather(
+            db.get_user_accounts(user_id),
+            db.get_alerts(user_id),
+            db.get_monthly_summary(user_id),
+        )
+
+Timeouts and cancellation: every call is bounded by `timeout` seconds
+(data.config.ASYNC). A call cancelled or timed out before a worker picked
+it up never runs. One that is already running cannot be interrupted: it
+finishes in its thread, its connection goes back to the pool and its result
+is dropped - for a write, that means it may still be committed.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from data.config import ASYNC
+from data.database import Database
+
+
+class AsyncDatabase:
+    """Coroutine counterpart of Database, backed by a bounded executor."""
+
+    def __init__(self, db=None, workers=None, timeout=None, **database_options):
+        """
+        Args:
+            db: Database to wrap; created with database_options if None
+                (this blocks while the tables are checked, once at startup).
+            workers: concurrent calls; defaults to the connection pool size.
+            timeout: default limit of a call in seconds (None: no limit).
+        """
+        self.db = db if db is not None else Database(**database_options)
+        self.workers = workers or ASYNC["workers"] or self.db.pool.size
+        self.timeout = timeout if timeout is not None else ASYNC["timeout"]
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="async-db")
+
+    async def run(self, func, *args, timeout=None, **kwargs):
+        """
+        Run a blocking callable on the executor.
+
+        Args:
+            func: a Database method name, or any callable.
+            timeout: seconds; defaults to self.timeout, 0 for no limit.
+
+        Raises:
+            asyncio.TimeoutError: the call did not complete in time.
+        """
+        if isinstance(func, str):
+            func = getattr(self.db, func)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        limit = self.timeout if timeout is None else timeout
+        if not limit:
+            return await future
+        return await asyncio.wait_for(future, limit)
+
+    def __getattr__(self, name):
+        # Méthodes publiques de Database exposées en coroutines, créées au premier accès
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attribute = getattr(self.db, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def method(*args, **kwargs):
+            return await self.run(attribute, *args, **kwargs)
+
+        setattr(self, name, method)
+        return method
+
+    async def gather(self, *calls, timeout=None):
+        """
+        Await independent calls concurrently and return their results in order.
+
+        If one of them fails or the overall timeout expires, the others are
+        cancelled and the error is raised.
+        """
+        tasks = [asyncio.ensure_future(call) for call in calls]
+        try:
+            return await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def iter_transactions(self, user_id=None, account_id=None, filters=None, batch_size=None):
+        """
+        Async generator over Database.iter_transactions.
+
+        Rows are fetched a batch at a time on the executor. To leave the
+        loop early, iterate inside contextlib.aclosing(): closing the
+        generator closes the cursor and returns its connection to the pool.
+        """
+        rows = self.db.iter_transactions(user_id=user_id, account_id=account_id,
+                                         filters=filters, batch_size=batch_size)
+        size = batch_size or 1000
+
+        def next_batch():
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= size:
+                    break
+            return batch
+
+        loop = asyncio.get_running_loop()
+        pending = None
+        try:
+            while True:
+                pending = loop.run_in_executor(self._executor, next_batch)
+                batch = await pending
+                if not batch:
+                    return
+                for row in batch:
+                    yield row
+        finally:
+            # Un lot en cours de lecture doit finir avant de fermer le générateur synchrone
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            try:
+                await loop.run_in_executor(self._executor, rows.close)
+            except RuntimeError:
+                rows.close()  # exécuteur déjà arrêté
+
+    def close(self, wait=True):
+        """Stop the executor; queued calls that have not started are cancelled."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
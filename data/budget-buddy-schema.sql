@@ -107,9 +107,36 @@ CREATE TABLE IF NOT EXISTS alerts (
     FOREIGN KEY (account_id) REFERENCES accounts(account_id)
 );
 
+-- Agrégats mensuels des transactions (résumés), tenus à jour par l'application
+-- category_id 0 = sans catégorie ; recalcul : python -m data.rollups
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    user_id INTEGER NOT NULL,
+    month CHAR(7) NOT NULL,
+    account_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0,
+    type_id INTEGER NOT NULL,
+    total DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    tx_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month, account_id, category_id, type_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+
+-- Avancement des imports de relevés (reprise après erreur)
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    import_id VARCHAR(64) PRIMARY KEY,
+    account_id INTEGER NOT NULL,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    finished BOOLEAN DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+
 -- Index pour améliorer les performances des requêtes
-CREATE INDEX idx_transactions_account_id ON transactions(account_id);
-CREATE INDEX idx_transactions_date ON transactions(transaction_date);
-CREATE INDEX idx_transactions_type ON transactions(type_id);
+-- (même jeu d'index que data.database.INDEXES, créé automatiquement au démarrage)
+CREATE INDEX idx_accounts_user ON accounts(user_id);
+CREATE INDEX idx_transactions_account_date ON transactions(account_id, transaction_date);
+CREATE INDEX idx_transactions_type_date ON transactions(type_id, transaction_date);
 CREATE INDEX idx_transactions_category ON transactions(category_id);
+CREATE INDEX idx_alerts_user_read_created ON alerts(user_id, is_read, created_at);
 CREATE INDEX idx_users_email ON users(email);
@@ -0,0 +1,190 @@
+import threading
+
+
+class ReferenceData:
+    """
+    In-memory copy of the categories and transaction types.
+
+    Loaded once, then served from memory with O(1) name <-> id lookups.
+    Call invalidate() after changing either table so the next access
+    reloads it.
+    """
+
+    def __init__(self, loader):
+        """
+        Args:
+            loader: callable returning (categories, transaction_types) as
+                lists of dicts, or raising on failure.
+        """
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._categories = []
+        self._types = []
+        self._category_ids = {}
+        self._category_names = {}
+        self._type_ids = {}
+        self._type_names = {}
+
+    def load(self):
+        """Load the reference tables if they are not in memory yet."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            categories, types = self._loader()
+            self._categories = [dict(row) for row in categories]
+            self._types = [dict(row) for row in types]
+            # En cas de doublons de nom, le premier identifiant (le plus ancien) l'emporte
+            self._category_ids = {}
+            for row in self._categories:
+                self._category_ids.setdefault(row['category_name'], row['category_id'])
+            self._category_names = {row['category_id']: row['category_name'] for row in self._categories}
+            self._type_ids = {}
+            for row in self._types:
+                self._type_ids.setdefault(row['type_name'], row['type_id'])
+            self._type_names = {row['type_id']: row['type_name'] for row in self._types}
+            self._loaded = True
+
+    def invalidate(self):
+        """Drop the cached tables; they are reloaded on next access."""
+        with self._lock:
+            self._loaded = False
+
+    def categories(self):
+        """Get all categories as a list of dicts (copies)."""
+        self.load()
+        return [dict(row) for row in self._categories]
+
+    def transaction_types(self):
+        """Get all transaction types as a list of dicts (copies)."""
+        self.load()
+        return [dict(row) for row in self._types]
+
+    def category_id(self, name):
+        """Get the id of a category from its name, or None."""
+        self.load()
+        return self._category_ids.get(name)
+
+    def category_name(self, category_id):
+        """Get the name of a category from its id, or None."""
+        self.load()
+        return self._category_names.get(category_id)
+
+    def type_id(self, name):
+        """Get the id of a transaction type from its name, or None."""
+        self.load()
+        return self._type_ids.get(name)
+
+    def type_name(self, type_id):
+        """Get the name of a transaction type from its id, or None."""
+        self.load()
+        return self._type_names.get(type_id)
+
+
+class AccountCache:
+    """
+    Per-user copy of the account list and balances.
+
+    Reads between two writes are served from memory. After committing, the
+    write paths of Database invalidate exactly the users owning the accounts
+    they touched, so the next read refills them. A fill that raced with a
+    write is discarded (see generation()/put()). Changes made by other
+    processes are only seen after invalidate().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._accounts = {}  # user_id -> {account_id: account dict}
+        self._owners = {}    # account_id -> user_id
+        self._generation = 0
+
+    def generation(self):
+        """Get the write generation, to be passed to put() before reading the DB."""
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id):
+        """
+        Get the cached accounts of a user.
+
+        Returns:
+            list: copies of the account dicts, or None if the user is not cached.
+        """
+        with self._lock:
+            accounts = self._accounts.get(user_id)
+            if accounts is None:
+                return None
+            return [dict(account) for account in accounts.values()]
+
+    def balance(self, account_id):
+        """Get the cached balance of an account, or None if it is not cached."""
+        with self._lock:
+            user_id = self._owners.get(account_id)
+            if user_id is None:
+                return None
+            return self._accounts[user_id][account_id]['balance']
+
+    def put(self, user_id, accounts, generation):
+        """
+        Cache the accounts of a user read from the database.
+
+        The rows are dropped if a write was committed since generation was
+        taken, because they may predate it.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._accounts[user_id] = {account['account_id']: dict(account) for account in accounts}
+            for account in accounts:
+                self._owners[account['account_id']] = user_id
+
+    def invalidate_accounts(self, *account_ids):
+        """Drop the cached users owning these accounts, after a committed write."""
+        with self._lock:
+            self._generation += 1
+            for account_id in account_ids:
+                user_id = self._owners.get(account_id)
+                if user_id is not None:
+                    self._drop(user_id)
+
+    def invalidate(self, user_id=None):
+        """Drop the cached accounts of a user, or of every user."""
+        with self._lock:
+            self._generation += 1
+            for uid in (list(self._accounts) if user_id is None else [user_id]):
+                self._drop(uid)
+
+    def _drop(self, user_id):
+        for account_id in self._accounts.pop(user_id, {}):
+            self._owners.pop(account_id, None)
+
+
+_reference_data = {}
+_account_caches = {}
+_registry_lock = threading.Lock()
+
+
+def shared_reference_data(key, loader):
+    """
+    Get the process-wide ReferenceData registered under key, creating it on first use.
+
+    Every Database instance on the same storage engine shares one copy.
+    """
+    with _registry_lock:
+        reference = _reference_data.get(key)
+        if reference is None:
+            reference = ReferenceData(loader)
+            _reference_data[key] = reference
+        return reference
+
+
+def shared_account_cache(key):
+    """Get the process-wide AccountCache registered under key, creating it on first use."""
+    with _registry_lock:
+        cache = _account_caches.get(key)
+        if cache is None:
+            cache = AccountCache()
+            _account_caches[key] = cache
+        return cache
@@ -0,0 +1,120 @@
+import os
+
+# Moteur de stockage : "mysql" (serveur) ou "sqlite" (fichier local, sans serveur)
+ENGINE = os.environ.get("BUDGET_DB_ENGINE", "mysql")
+
+# Paramètres de connexion à la base de données (surchargés par variables d'environnement)
+DATABASE = {
+    "host": os.environ.get("BUDGET_DB_HOST", "localhost"),
+    "port": int(os.environ.get("BUDGET_DB_PORT", "3306")),
+    "user": os.environ.get("BUDGET_DB_USER", "root"),
+    "password": os.environ.get("BUDGET_DB_PASSWORD", "root"),
+    "database": os.environ.get("BUDGET_DB_NAME", "budget"),
+    "connection_timeout": int(os.environ.get("BUDGET_DB_CONNECT_TIMEOUT", "10")),
+}
+
+# Paramètres du moteur SQLite
+SQLITE = {
+    "path": os.environ.get("BUDGET_DB_PATH", "budget_buddy.db"),
+    "busy_timeout": float(os.environ.get("BUDGET_DB_BUSY_TIMEOUT", "5")),  # attente d'un verrou d'écriture (s)
+    "cached_statements": int(os.environ.get("BUDGET_DB_SQLITE_STATEMENTS", "256")),  # requêtes compilées gardées par connexion
+    "pragmas": {
+        "journal_mode": "WAL",        # lecteurs et écrivain concurrents
+        "synchronous": "NORMAL",      # sûr en WAL, fsync seulement aux checkpoints
+        "foreign_keys": "ON",
+        "temp_store": "MEMORY",
+        "cache_size": -65536,         # 64 Mo de cache de pages
+        "mmap_size": 268435456,       # 256 Mo lus via mmap
+    },
+}
+
+# Paramètres du pool de connexions
+POOL = {
+    "size": int(os.environ.get("BUDGET_DB_POOL_SIZE", "5")),
+    "timeout": float(os.environ.get("BUDGET_DB_POOL_TIMEOUT", "10")),           # attente max d'une connexion (s)
+    "recycle": float(os.environ.get("BUDGET_DB_POOL_RECYCLE", "3600")),         # durée de vie max d'une connexion (s)
+    "health_check_interval": float(os.environ.get("BUDGET_DB_POOL_PING", "30")),  # ping si inactive depuis (s)
+}
+
+# Paramètres de l'import de relevés bancaires
+IMPORT = {
+    "chunk_size": int(os.environ.get("BUDGET_IMPORT_CHUNK_SIZE", "5000")),  # lignes par commit
+    "max_errors": int(os.environ.get("BUDGET_IMPORT_MAX_ERRORS", "100")),    # erreurs détaillées conservées
+}
+
+# Paramètres de lecture en flux (exports, longs historiques)
+EXPORT = {
+    "fetch_size": int(os.environ.get("BUDGET_EXPORT_FETCH_SIZE", "1000")),  # lignes lues par aller-retour
+}
+
+# Reprise des transactions interrompues par un interblocage ou une attente de verrou
+RETRY = {
+    "attempts": int(os.environ.get("BUDGET_DB_RETRY_ATTEMPTS", "5")),        # tentatives au total
+    "base_delay": float(os.environ.get("BUDGET_DB_RETRY_BASE_DELAY", "0.01")),  # premier délai max (s), doublé à chaque échec
+    "max_delay": float(os.environ.get("BUDGET_DB_RETRY_MAX_DELAY", "0.5")),     # plafond du délai (s)
+}
+
+# Paramètres du planificateur des paiements programmés (python -m data.scheduler)
+SCHEDULER = {
+    "workers": int(os.environ.get("BUDGET_SCHEDULER_WORKERS", "4")),                      # threads, comptes répartis par account_id
+    "batch_size": int(os.environ.get("BUDGET_SCHEDULER_BATCH_SIZE", "500")),               # paiements par passage d'un worker
+    "refresh_interval": float(os.environ.get("BUDGET_SCHEDULER_REFRESH", "60")),           # lecture des nouveaux paiements (s)
+    "resync_interval": float(os.environ.get("BUDGET_SCHEDULER_RESYNC", "3600")),           # relecture complète de l'échéancier (s)
+    "retry_interval": float(os.environ.get("BUDGET_SCHEDULER_RETRY", "900")),              # nouvel essai d'un paiement impayé (s)
+}
+
+# Façade asyncio (data.async_database)
+ASYNC = {
+    "workers": int(os.environ.get("BUDGET_ASYNC_WORKERS", "0")),      # appels simultanés, 0 : taille du pool
+    "timeout": float(os.environ.get("BUDGET_ASYNC_TIMEOUT", "30")),   # limite par appel (s), 0 : aucune
+}
+
+# Hachage des mots de passe (data.security)
+SECURITY = {
+    "pbkdf2_iterations": int(os.environ.get("BUDGET_PBKDF2_ITERATIONS", "600000")),  # coût des nouveaux hachages
+    "hash_workers": int(os.environ.get("BUDGET_HASH_WORKERS", "0")),                # processus de hachage, 0 : min(2, nombre de cœurs), -1 : aucun (dans le thread appelant)
+}
+
+# Requêtes préparées (data.statements)
+STATEMENTS = {
+    "cache_size": int(os.environ.get("BUDGET_DB_STATEMENT_CACHE", "64")),  # requêtes préparées gardées par connexion, 0 : désactivé
+}
+
+# Instrumentation des appels à la base (data.metrics)
+METRICS = {
+    "enabled": os.environ.get("BUDGET_METRICS", "0") == "1",                # désactivé : aucune méthode n'est enveloppée
+    "slow_query_ms": float(os.environ.get("BUDGET_SLOW_QUERY_MS", "100")),  # seuil du journal des requêtes lentes (ms)
+    "slow_query_log": os.environ.get("BUDGET_SLOW_QUERY_LOG", ""),          # fichier JSON lines, vide : en mémoire seulement
+    "slow_query_keep": int(os.environ.get("BUDGET_SLOW_QUERY_KEEP", "200")),  # requêtes lentes gardées en mémoire
+    "dump_path": os.environ.get("BUDGET_METRICS_DUMP", ""),                 # écrit à la sortie, .prom : Prometheus, sinon JSON
+}
+
+# Traces des actions de l'interface jusqu'au SQL (data.tracing), au format Chrome trace-event
+TRACING = {
+    "path": os.environ.get("BUDGET_TRACE", ""),                          # fichier écrit à la sortie, vide : désactivé
+    "max_events": int(os.environ.get("BUDGET_TRACE_MAX_EVENTS", "500000")),  # au-delà, les événements sont ignorés
+}
+
+# Détection des blocages du thread Tk (gui.watchdog)
+WATCHDOG = {
+    "enabled": os.environ.get("BUDGET_WATCHDOG", "1") == "1",
+    "threshold_ms": float(os.environ.get("BUDGET_WATCHDOG_THRESHOLD_MS", "500")),  # blocage signalé au-delà (ms)
+    "interval_ms": int(os.environ.get("BUDGET_WATCHDOG_INTERVAL_MS", "100")),       # battement via after() (ms)
+    "max_samples": int(os.environ.get("BUDGET_WATCHDOG_SAMPLES", "5")),             # piles capturées par blocage
+    "log_path": os.environ.get("BUDGET_WATCHDOG_LOG", ""),                           # fichier des blocages, vide : console
+}
+
+# Profilage des actions de l'interface (gui.profiler), aussi armé par Ctrl+Maj+P ou python main.py --profile N
+PROFILING = {
+    "actions": int(os.environ.get("BUDGET_PROFILE_ACTIONS", "0")),             # actions profilées dès le démarrage
+    "hotkey_actions": int(os.environ.get("BUDGET_PROFILE_HOTKEY_ACTIONS", "5")),  # actions profilées par raccourci
+    "mode": os.environ.get("BUDGET_PROFILE_MODE", "both"),                      # cprofile, sampling ou both
+    "sample_interval_ms": float(os.environ.get("BUDGET_PROFILE_INTERVAL_MS", "5")),
+    "dir": os.environ.get("BUDGET_PROFILE_DIR", "profiles"),
+}
+
+# Démarrage de l'interface (gui.login, benchmarks/startup.py)
+STARTUP = {
+    "warm_imports": os.environ.get("BUDGET_WARM_IMPORTS", "1") == "1",            # précharge la page d'accueil et matplotlib
+    "import_budget_ms": float(os.environ.get("BUDGET_IMPORT_BUDGET_MS", "800")),  # budget d'import de gui.login
+}
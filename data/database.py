@@ -1,33 +1,178 @@
-import mysql.connector
-import hashlib
-import secrets
+import base64
+import json
 import datetime
 import os
+import random
+import time
+from contextlib import contextmanager
 from decimal import Decimal
 
+from data.cache import shared_account_cache, shared_reference_data
+from data.config import EXPORT, POOL, RETRY, STATEMENTS
+from data.engines import create_engine
+from data.metrics import instrumented, query_metrics
+from data.pool import shared_pool
+from data.recurrence import advance, due_dates
+from data.security import ALGORITHM, UnknownHashFormat, needs_rehash, shared_hasher
+from data.snapshot import DashboardSnapshot, freeze
+from data.statements import PreparedSQL, StatementCursor, query_templates, shared_statement_cache
+from data.tracing import traced, tracer
 
+
+# Index des requêtes fréquentes : (nom, table, colonnes)
+# Les index secondaires contiennent aussi la clé primaire (InnoDB, rowid SQLite),
+# donc (account_id, transaction_date) couvre aussi le tri par transaction_id.
+INDEXES = [
+    ("idx_accounts_user", "accounts", ("user_id",)),
+    ("idx_transactions_account_date", "transactions", ("account_id", "transaction_date")),
+    ("idx_transactions_type_date", "transactions", ("type_id", "transaction_date")),
+    ("idx_transactions_account_amount", "transactions", ("account_id", "amount")),
+    ("idx_transactions_to_account_date", "transactions", ("to_account_id", "transaction_date")),
+    ("idx_alerts_user_read_created", "alerts", ("user_id", "is_read", "created_at")),
+    ("idx_scheduled_payments_next_date", "scheduled_payments", ("next_date",)),
+    ("idx_scheduled_payments_account_next", "scheduled_payments", ("account_id", "next_date")),
+]
+
+# Index devenus inutiles, supprimés au démarrage : (nom, table)
+# Les résumés lisent monthly_rollups, l'index couvrant ne faisait que ralentir les insertions.
+RETIRED_INDEXES = [
+    ("idx_transactions_account_type_date", "transactions"),
+]
+
+# Colonnes ajoutées après coup, créées au démarrage sur les bases existantes : (table, colonne, type)
+ADDED_COLUMNS = [
+    # Jour du mois visé par un paiement mensuel ou annuel (next_date peut être ramené au 28)
+    ("scheduled_payments", "anchor_day", "TINYINT"),
+]
+
+
+@traced
+@instrumented
 class Database:
-    def __init__(self):
+    def __init__(self, settings=None, pool_options=None, engine=None):
         """
-        Initialize the database connection.
+        Initialize the storage engine and its connection pool.
+
+        Args:
+            settings: engine-specific overrides of data.config (host, path, ...).
+            pool_options: overrides for data.config.POOL (size, timeout, ...).
+            engine: "mysql" or "sqlite"; defaults to data.config.ENGINE.
         """
+        self.engine = create_engine(engine, settings)
+        options = dict(POOL, **(pool_options or {}))
+        self.pool = shared_pool(self.engine.key, self.engine.connect, ping=self.engine.ping, **options)
+        # Requêtes préparées gardées sur les connexions du pool
+        self.statement_cache = shared_statement_cache(self.engine.key, self.engine, STATEMENTS["cache_size"])
         self._create_tables_if_not_exists()
+        # Catégories et types de transaction, partagés par toutes les instances du processus
+        self.reference = shared_reference_data(self.engine.key, self._load_reference_data)
+        try:
+            self.reference.load()
+        except Exception as e:
+            print(f"Error loading reference data: {e}")
+        # Comptes et soldes par utilisateur, invalidés par les écritures
+        self.account_cache = shared_account_cache(self.engine.key)
+        # Hachage des mots de passe dans un pool de processus, partagé par le processus
+        self.hasher = shared_hasher()
         
-    def _get_connection(self):
+    def _get_connection(self, streaming=False):
         """
-        Create and return a database connection.
+        Check a connection out of the pool.
+        
+        Args:
+            streaming: return an unbuffered cursor that reads rows from the
+                server as they are fetched (see iter_transactions).
         
         Returns:
-            tuple: (connection, cursor)
+            tuple: (connection, cursor) - closing the connection returns it to the pool.
+                The cursor runs PreparedSQL as prepared statements (see data.statements).
         """
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="root",
-            database="budget"
-        )
-        cursor = conn.cursor(dictionary=True)  # This enables column access by name
+        started = time.perf_counter()
+        conn = self.pool.acquire()
+        if streaming:
+            cursor = self.engine.stream_cursor(conn)
+        else:
+            cursor = StatementCursor(self.engine.cursor(conn), conn.raw, self.statement_cache)  # Rows are returned as dicts
+        if query_metrics.enabled:
+            query_metrics.record_wait(time.perf_counter() - started)
+            cursor = query_metrics.cursor(cursor)
+        if tracer.enabled:
+            tracer.complete("pool.acquire", "db", tracer.now() - (time.perf_counter() - started) * 1e6)
+            cursor = tracer.cursor(cursor)
         return conn, cursor
+
+    @contextmanager
+    def _connection(self, streaming=False):
+        """
+        Check a connection out of the pool for the duration of a with-block.
+        Any transaction that was not committed is rolled back on return.
+
+        Yields:
+            tuple: (connection, cursor)
+        """
+        conn, cursor = self._get_connection(streaming)
+        try:
+            yield conn, cursor
+        finally:
+            # La connexion retourne au pool même si la fermeture du curseur échoue
+            try:
+                if streaming:
+                    self.engine.discard_results(conn.raw)  # flux abandonné avant la fin
+                cursor.close()
+            finally:
+                conn.close()
+
+    def _run_transaction(self, work):
+        """
+        Run work(conn, cursor) on a pooled connection and return its result.
+
+        When the engine aborts the transaction because of lock contention
+        (deadlock, lock wait timeout, SQLite busy), the whole of work is
+        replayed on a fresh connection after a jittered exponential backoff,
+        up to RETRY['attempts'] times. work must therefore commit last and
+        be safe to run again after a rollback.
+        """
+        attempts = max(1, RETRY["attempts"])
+        for attempt in range(1, attempts + 1):
+            try:
+                with self._connection() as (conn, cursor):
+                    return work(conn, cursor)
+            except Exception as e:
+                if attempt == attempts or not self.engine.is_transient(e):
+                    raise
+            # Délai aléatoire dans [0, base * 2^n] : les transactions en conflit ne se relancent pas ensemble
+            time.sleep(random.uniform(0, min(RETRY["max_delay"], RETRY["base_delay"] * 2 ** (attempt - 1))))
+
+    def pool_stats(self):
+        """
+        Get connection pool statistics.
+
+        Returns:
+            dict: see ConnectionPool.stats()
+        """
+        return self.pool.stats()
+
+    def statement_stats(self):
+        """
+        Get query template and prepared statement statistics.
+
+        Returns:
+            dict: {'templates': QueryTemplates.stats(), 'prepared': StatementCache.stats()}
+        """
+        return {
+            'templates': query_templates.stats(),
+            'prepared': self.statement_cache.stats(),
+        }
+
+    def query_stats(self):
+        """
+        Get the per-method call statistics and the slow-query log.
+
+        Returns:
+            dict: see data.metrics.QueryMetrics.snapshot() - empty counters
+                unless BUDGET_METRICS=1.
+        """
+        return query_metrics.snapshot()
     
     def _create_tables_if_not_exists(self):
         """Create the database tables if they don't already exist."""
@@ -69,20 +214,23 @@ class Database:
                 )
             """)
             
-            # Insérer quelques catégories par défaut
-            cursor.execute("""
-                INSERT IGNORE INTO categories (category_name, description) VALUES
-                    ('Loisir', 'Depenses liees aux activités de loisir'),
-                    ('Repas', 'Depenses alimentaires'),
-                    ('Transport', 'Depenses liees aux déplacements'),
-                    ('Logement', 'Depenses liees au logement'),
-                    ('Sante', 'Depenses medicales'),
-                    ('Vetements', 'Achats de vetements'),
-                    ('Education', 'Frais de scolarite et materiel educatif'),
-                    ('Revenu', 'Sources de revenu'),
-                    ('Pot-de-vin', 'Cadeaux et pourboires'),
-                    ('Autre', 'Autres depenses')
-            """)
+            # Insérer quelques catégories par défaut (une seule fois : la table n'a pas de contrainte d'unicité,
+            # INSERT IGNORE seul ajouterait des doublons à chaque démarrage)
+            cursor.execute("SELECT COUNT(*) AS n FROM categories")
+            if cursor.fetchone()['n'] == 0:
+                cursor.execute("""
+                    INSERT IGNORE INTO categories (category_name, description) VALUES
+                        ('Loisir', 'Depenses liees aux activités de loisir'),
+                        ('Repas', 'Depenses alimentaires'),
+                        ('Transport', 'Depenses liees aux déplacements'),
+                        ('Logement', 'Depenses liees au logement'),
+                        ('Sante', 'Depenses medicales'),
+                        ('Vetements', 'Achats de vetements'),
+                        ('Education', 'Frais de scolarite et materiel educatif'),
+                        ('Revenu', 'Sources de revenu'),
+                        ('Pot-de-vin', 'Cadeaux et pourboires'),
+                        ('Autre', 'Autres depenses')
+                """)
             
             # Table des types de transactions
             cursor.execute("""
@@ -92,13 +240,15 @@ class Database:
                 )
             """)
             
-            # Insérer les types de transactions
-            cursor.execute("""
-                INSERT IGNORE INTO transaction_types (type_name) VALUES
-                    ('Dépôt'),
-                    ('Retrait'),
-                    ('Transfert')
-            """)
+            # Insérer les types de transactions (une seule fois, voir ci-dessus)
+            cursor.execute("SELECT COUNT(*) AS n FROM transaction_types")
+            if cursor.fetchone()['n'] == 0:
+                cursor.execute("""
+                    INSERT IGNORE INTO transaction_types (type_name) VALUES
+                        ('Dépôt'),
+                        ('Retrait'),
+                        ('Transfert')
+                """)
             
             # Table des transactions
             cursor.execute("""
@@ -131,6 +281,7 @@ class Database:
                     category_id INTEGER,
                     frequency ENUM('monthly', 'weekly', 'yearly') NOT NULL,
                     next_date DATE NOT NULL,
+                    anchor_day TINYINT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (account_id) REFERENCES accounts(account_id),
                     FOREIGN KEY (category_id) REFERENCES categories(category_id)
@@ -152,29 +303,141 @@ class Database:
                 )
             """)
             
+            # Agrégats mensuels des transactions, tenus à jour à chaque écriture
+            # (category_id 0 = sans catégorie, une clé primaire ne peut pas contenir NULL)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS monthly_rollups (
+                    user_id INTEGER NOT NULL,
+                    month CHAR(7) NOT NULL,
+                    account_id INTEGER NOT NULL,
+                    category_id INTEGER NOT NULL DEFAULT 0,
+                    type_id INTEGER NOT NULL,
+                    total DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+                    tx_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, month, account_id, category_id, type_id),
+                    FOREIGN KEY (user_id) REFERENCES users(user_id),
+                    FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+                )
+            """)
+            
+            # Avancement des imports de relevés, pour reprendre après une erreur
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS import_checkpoints (
+                    import_id VARCHAR(64) PRIMARY KEY,
+                    account_id INTEGER NOT NULL,
+                    rows_done INTEGER NOT NULL DEFAULT 0,
+                    finished BOOLEAN DEFAULT FALSE,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+                )
+            """)
+            
+            self._add_missing_columns(cursor)
+            self._create_indexes_if_not_exist(cursor)
+            
+            # Base existante sans agrégats : les calculer une fois
+            cursor.execute("SELECT 1 AS found FROM monthly_rollups LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute("SELECT 1 AS found FROM transactions LIMIT 1")
+                if cursor.fetchone() is not None:
+                    self._rebuild_rollups(cursor)
+            
             conn.commit()
         except Exception as e:
             print(f"Error creating tables: {e}")
         finally:
             conn.close()
+
+    def _add_missing_columns(self, cursor):
+        """Add the ADDED_COLUMNS missing from tables created by an older version."""
+        existing = {}
+        for table, column, definition in ADDED_COLUMNS:
+            if table not in existing:
+                existing[table] = self.engine.existing_columns(cursor, table)
+            if column not in existing[table]:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _create_indexes_if_not_exist(self, cursor):
+        """Create the indexes listed in INDEXES that are missing and drop the RETIRED_INDEXES."""
+        existing = {}
+        for name, table, columns in INDEXES:
+            if table not in existing:
+                existing[table] = self.engine.existing_indexes(cursor, table)
+            if name not in existing[table]:
+                cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+        for name, table in RETIRED_INDEXES:
+            if table not in existing:
+                existing[table] = self.engine.existing_indexes(cursor, table)
+            if name in existing[table]:
+                self.engine.drop_index(cursor, name, table)
     
-    def _hash_password(self, password, salt=None):
+    def _update_rollups(self, cursor, where_sql, params):
         """
-        Hash a password with a salt using PBKDF2 with SHA-256.
+        Add the transactions matching where_sql to monthly_rollups.
+
+        Must run in the same DB transaction as the insert of those
+        transactions, so the rollups never disagree with the raw table.
+
+        Args:
+            cursor: open cursor.
+            where_sql: condition on the transactions table (alias t).
+            params: parameters of where_sql.
         """
-        if salt is None:
-            salt = secrets.token_bytes(32)
-        key = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100000)
-        return key.hex(), salt.hex()
-    
-    def _verify_password(self, stored_hash, stored_salt, provided_password):
+        cursor.execute(
+            f"""
+            INSERT INTO monthly_rollups (user_id, month, account_id, category_id, type_id, total, tx_count)
+            SELECT a.user_id, DATE_FORMAT(t.transaction_date, '%Y-%m'), t.account_id,
+                   COALESCE(t.category_id, 0), t.type_id, SUM(t.amount), COUNT(*)
+            FROM transactions t
+            JOIN accounts a ON t.account_id = a.account_id
+            WHERE {where_sql}
+            GROUP BY a.user_id, DATE_FORMAT(t.transaction_date, '%Y-%m'), t.account_id,
+                     COALESCE(t.category_id, 0), t.type_id
+            ON DUPLICATE KEY UPDATE
+                total = ROUND(total + VALUES(total), 2),
+                tx_count = tx_count + VALUES(tx_count)
+            """,
+            params
+        )
+
+    def _rebuild_rollups(self, cursor, user_id=None):
+        """Recompute monthly_rollups from the transactions table (all users or one)."""
+        if user_id is None:
+            cursor.execute("DELETE FROM monthly_rollups")
+            self._update_rollups(cursor, "1 = 1", ())
+        else:
+            cursor.execute("DELETE FROM monthly_rollups WHERE user_id = %s", (user_id,))
+            self._update_rollups(cursor, "a.user_id = %s", (user_id,))
+
+    def rebuild_rollups(self, user_id=None):
         """
-        Verify a password against a stored hash and salt.
+        Recompute the monthly rollups from the raw transactions.
+
+        Only needed after transactions were changed outside of Database
+        (manual SQL, restore, ...); see also python -m data.rollups.
+
+        Args:
+            user_id: rebuild only this user, or everyone if None.
+
+        Returns:
+            tuple: (success, number of rollup rows or error message)
         """
-        salt = bytes.fromhex(stored_salt)
-        computed_hash, _ = self._hash_password(provided_password, salt)
-        return stored_hash == computed_hash
-    
+        try:
+            with self._connection() as (conn, cursor):
+                cursor.execute("START TRANSACTION")
+                self._rebuild_rollups(cursor, user_id)
+                if user_id is None:
+                    cursor.execute("SELECT COUNT(*) AS n FROM monthly_rollups")
+                else:
+                    cursor.execute("SELECT COUNT(*) AS n FROM monthly_rollups WHERE user_id = %s", (user_id,))
+                count = cursor.fetchone()['n']
+                conn.commit()
+            
+            return True, count
+            
+        except Exception as e:
+            return False, f"Erreur lors du recalcul des agrégats: {e}"
+
     def validate_password_strength(self, password):
         """
         Validate password strength.
@@ -200,37 +463,36 @@ class Database:
             return False, message, None
         
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
-            if cursor.fetchone():
-                conn.close()
-                return False, "Cette adresse email est déjà utilisée.", None
-            
-            hashed_password, salt = self._hash_password(password)
-            password_storage = f"{hashed_password}:{salt}"
-            
-            cursor.execute(
-                """
-                INSERT INTO users (first_name, last_name, email, password)
-                VALUES (%s, %s, %s, %s)
-                """,
-                (first_name, last_name, email, password_storage)
-            )
-            
-            user_id = cursor.lastrowid
-            
-            cursor.execute(
-                """
-                INSERT INTO accounts (user_id, account_name)
-                VALUES (%s, %s)
-                """,
-                (user_id, "Compte principal")
-            )
-            
-            conn.commit()
-            conn.close()
+            with self._connection() as (conn, cursor):
+                cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
+                if cursor.fetchone():
+                    return False, "Cette adresse email est déjà utilisée.", None
+            
+            # Hachage hors connexion : il ne retient pas une connexion du pool
+            password_storage = self.hasher.hash(password)
+            
+            with self._connection() as (conn, cursor):
+                cursor.execute(
+                    """
+                    INSERT INTO users (first_name, last_name, email, password)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    (first_name, last_name, email, password_storage)
+                )
+                
+                user_id = cursor.lastrowid
+                
+                cursor.execute(
+                    """
+                    INSERT INTO accounts (user_id, account_name)
+                    VALUES (%s, %s)
+                    """,
+                    (user_id, "Compte principal")
+                )
+                
+                conn.commit()
             
+            self.account_cache.invalidate(user_id)
             return True, "Utilisateur enregistré avec succès.", user_id
             
         except Exception as e:
@@ -239,37 +501,38 @@ class Database:
     def login_user(self, email, password):
         """
         Authenticate a user.
+
+        A password stored in the legacy format or with fewer iterations
+        than configured is re-hashed with the current parameters once it
+        has been verified.
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute(
-                """
-                SELECT user_id, first_name, last_name, email, password
-                FROM users
-                WHERE email = %s
-                """,
-                (email,)
-            )
-            
-            user = cursor.fetchone()
+            with self._connection() as (conn, cursor):
+                cursor.execute(
+                    """
+                    SELECT user_id, first_name, last_name, email, password
+                    FROM users
+                    WHERE email = %s
+                    """,
+                    (email,)
+                )
+                
+                user = cursor.fetchone()
             
             if not user:
-                conn.close()
+                # Même coût qu'un vrai mot de passe : le délai ne révèle pas si l'email existe
+                self.hasher.verify(password, self._unknown_user_hash())
                 return False, "Email ou mot de passe incorrect.", None
             
             stored_password = user['password']
-            parts = stored_password.split(':')
-            
-            if len(parts) != 2:
-                conn.close()
-                return False, "Erreur de format de mot de passe stocké.", None
-            
-            stored_hash, stored_salt = parts
+            try:
+                if not self.hasher.verify(password, stored_password):
+                    return False, "Email ou mot de passe incorrect.", None
+            except UnknownHashFormat as e:
+                return False, str(e), None
             
-            if not self._verify_password(stored_hash, stored_salt, password):
-                conn.close()
-                return False, "Email ou mot de passe incorrect.", None
+            if needs_rehash(stored_password):
+                self._rehash_password(user['user_id'], stored_password, password)
             
             user_data = {
                 'user_id': user['user_id'],
@@ -278,135 +541,374 @@ class Database:
                 'email': user['email']
             }
             
-            conn.close()
             return True, "Connexion réussie.", user_data
             
         except Exception as e:
             return False, f"Erreur lors de la connexion: {e}", None
+
+    @staticmethod
+    def _unknown_user_hash():
+        from data.config import SECURITY
+        return f"{ALGORITHM}${SECURITY['pbkdf2_iterations']}${'00' * 32}${'00' * 32}"
+
+    def _rehash_password(self, user_id, stored_password, password):
+        """Replace a verified password hash by one with the current parameters; failures are not fatal."""
+        try:
+            upgraded = self.hasher.hash(password)
+            with self._connection() as (conn, cursor):
+                # Ne remplacer que le hachage vérifié (pas un mot de passe changé entre-temps)
+                cursor.execute(
+                    "UPDATE users SET password = %s WHERE user_id = %s AND password = %s",
+                    (upgraded, user_id, stored_password)
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"Error upgrading password hash: {e}")
     
     def get_user_accounts(self, user_id):
         """
-        Get all accounts for a user.
+        Get all accounts for a user (served from the account cache between writes).
         """
+        accounts = self.account_cache.get(user_id)
+        if accounts is not None:
+            return accounts
+        
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute(
-                """
-                SELECT account_id, account_name, balance
-                FROM accounts
-                WHERE user_id = %s
-                """,
-                (user_id,)
-            )
-            
-            accounts = [dict(row) for row in cursor.fetchall()]
+            generation = self.account_cache.generation()
+            with self._connection() as (conn, cursor):
+                accounts = self._fetch_user_accounts(cursor, user_id)
             
-            conn.close()
+            self.account_cache.put(user_id, accounts, generation)
             return accounts
             
         except Exception as e:
             print(f"Error getting user accounts: {e}")
             return []
+
+    def _fetch_user_accounts(self, cursor, user_id):
+        """Read the accounts of a user on an open cursor."""
+        cursor.execute(
+            PreparedSQL("""
+            SELECT account_id, account_name, balance
+            FROM accounts
+            WHERE user_id = %s
+            """),
+            (user_id,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
     
+    # Clés de tri acceptées par les listes de transactions
+    TRANSACTION_SORT_FIELDS = {
+        'amount': 't.amount',
+        'date': 't.transaction_date',
+        'type': 'tt.type_name',
+        'category': 'c.category_name'
+    }
+
+    # Filtres des listes de transactions : (clé, condition), dans l'ordre des paramètres
+    TRANSACTION_FILTERS = (
+        ('start_date', " AND t.transaction_date >= %s"),
+        ('end_date', " AND t.transaction_date <= %s"),
+        ('category_id', " AND t.category_id = %s"),
+        ('type_id', " AND t.type_id = %s"),
+    )
+
+    # Transactions d'un compte : ses écritures et les transferts qu'il reçoit
+    # (un transfert est une seule ligne, sur le compte source)
+    ACCOUNT_SCOPE = "(t.account_id = %s OR t.to_account_id = %s)"
+
+    TRANSACTION_SELECT = """
+            SELECT t.transaction_id, t.reference, t.description, t.amount, 
+                t.transaction_date, t.account_id, t.to_account_id,
+                c.category_name, tt.type_name, a.account_name
+            FROM transactions t
+            JOIN accounts a ON t.account_id = a.account_id
+            LEFT JOIN categories c ON t.category_id = c.category_id
+            LEFT JOIN transaction_types tt ON t.type_id = tt.type_id
+            WHERE """
+
+    def _transaction_filters(self, filters):
+        """
+        Pick the filters of a transaction listing that are set.
+
+        Returns:
+            tuple: (keys, params) - keys of TRANSACTION_FILTERS present, in
+                order (part of the query shape), and their values.
+        """
+        if not filters:
+            return (), []
+        keys = tuple(key for key, _ in self.TRANSACTION_FILTERS if key in filters)
+        return keys, [filters[key] for key in keys]
+
+    def _transaction_filter_sql(self, keys):
+        """
+        Build the extra WHERE conditions for the filters keys.
+
+        Returns:
+            str: starts with " AND" or is empty.
+        """
+        return "".join(condition for key, condition in self.TRANSACTION_FILTERS if key in keys)
+
+    def _transaction_sort(self, filters):
+        """
+        Resolve the sort column and direction of a transaction listing.
+
+        Returns:
+            tuple: (column, 'ASC' or 'DESC') - defaults to most recent first.
+        """
+        if filters and filters.get('sort_by') in self.TRANSACTION_SORT_FIELDS:
+            sort_order = filters.get('sort_order', 'asc').upper()
+            if sort_order not in ('ASC', 'DESC'):
+                sort_order = 'ASC'
+            return self.TRANSACTION_SORT_FIELDS[filters['sort_by']], sort_order
+        return 't.transaction_date', 'DESC'
+
+    def _transactions_query(self, scope_sql, scope_params, filters):
+        """
+        Build the SELECT of a transaction listing.
+
+        The SQL only depends on the shape of the request (scope, filters
+        present, sort, limit): it is built once per shape and reused as a
+        prepared statement.
+
+        Args:
+            scope_sql: condition selecting the transactions ("a.user_id = %s"
+                or ACCOUNT_SCOPE).
+            scope_params: parameters of scope_sql.
+            filters: see get_account_transactions.
+
+        Returns:
+            tuple: (query, params)
+        """
+        keys, params = self._transaction_filters(filters)
+        params[:0] = scope_params
+        sort_field, sort_order = self._transaction_sort(filters)
+        # Ajout de la limite si spécifiée
+        limit = bool(filters and 'limit' in filters)
+        if limit:
+            params.append(filters['limit'])
+
+        def build():
+            query = self.TRANSACTION_SELECT + scope_sql + self._transaction_filter_sql(keys)
+            query += f" ORDER BY {sort_field} {sort_order}, t.transaction_id {sort_order}"
+            return query + " LIMIT %s" if limit else query
+
+        query = query_templates.get(("transactions", scope_sql, keys, sort_field, sort_order, limit), build)
+        return query, params
+
+    def _format_transaction(self, row):
+        """Convert a transaction row to a dict with a display-ready formatted_date."""
+        transaction = dict(row)
+        
+        # Formater la date pour l'affichage
+        if 'transaction_date' in transaction and transaction['transaction_date']:
+            if isinstance(transaction['transaction_date'], str):  # Vérifier si c'est une chaîne
+                date_obj = datetime.datetime.fromisoformat(transaction['transaction_date'])
+            else:  # Si c'est déjà un objet datetime
+                date_obj = transaction['transaction_date']
+            transaction['formatted_date'] = date_obj.strftime('%d/%m/%Y %H:%M')
+        
+        return transaction
+
     def get_account_transactions(self, account_id, filters=None):
         """
         Get transactions for an account with optional filtering.
+
+        Includes the transfers received by the account (rows of the source
+        account whose to_account_id is account_id).
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            query = """
-                SELECT t.transaction_id, t.reference, t.description, t.amount, 
-                    t.transaction_date, t.account_id, t.to_account_id,
-                    c.category_name, tt.type_name
-                FROM transactions t
-                LEFT JOIN categories c ON t.category_id = c.category_id
-                LEFT JOIN transaction_types tt ON t.type_id = tt.type_id
-                WHERE t.account_id = %s
-            """
+            query, params = self._transactions_query(self.ACCOUNT_SCOPE, (account_id, account_id), filters)
             
-            params = [account_id]
+            with self._connection() as (conn, cursor):
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
             
-            if filters:
-                if 'start_date' in filters:
-                    query += " AND t.transaction_date >= %s"
-                    params.append(filters['start_date'])
-                
-                if 'end_date' in filters:
-                    query += " AND t.transaction_date <= %s"
-                    params.append(filters['end_date'])
-                
-                if 'category_id' in filters:
-                    query += " AND t.category_id = %s"
-                    params.append(filters['category_id'])
-                
-                if 'type_id' in filters:
-                    query += " AND t.type_id = %s"
-                    params.append(filters['type_id'])
+            return [self._format_transaction(row) for row in rows]
             
-            if filters and 'sort_by' in filters:
-                sort_field = filters['sort_by']
-                sort_order = filters.get('sort_order', 'asc').upper()
-                
-                if sort_order not in ('ASC', 'DESC'):
-                    sort_order = 'ASC'
-                
-                valid_fields = {
-                    'amount': 't.amount',
-                    'date': 't.transaction_date',
-                    'type': 'tt.type_name',
-                    'category': 'c.category_name'
-                }
-                
-                if sort_field in valid_fields:
-                    query += f" ORDER BY {valid_fields[sort_field]} {sort_order}"
-                else:
-                    query += " ORDER BY t.transaction_date DESC"
-            else:
-                query += " ORDER BY t.transaction_date DESC"
+        except Exception as e:
+            print(f"Error getting account transactions: {e}")
+            return []
 
-            # Ajout de la limite si spécifiée
-            if filters and 'limit' in filters:
-                query += " LIMIT %s"
-                params.append(filters['limit'])
-            
-            cursor.execute(query, params)
-            
-            transactions = []
-            for row in cursor.fetchall():
-                transaction = dict(row)
-                
-                # Formater la date pour l'affichage
-                if 'transaction_date' in transaction and transaction['transaction_date']:
-                    if isinstance(transaction['transaction_date'], str):  # Vérifier si c'est une chaîne
-                        date_obj = datetime.datetime.fromisoformat(transaction['transaction_date'])
-                    else:  # Si c'est déjà un objet datetime
-                        date_obj = transaction['transaction_date']
-                    transaction['formatted_date'] = date_obj.strftime('%d/%m/%Y %H:%M')
-                
-                transactions.append(transaction)
-            
-            conn.close()
-            return transactions
+    def get_user_transactions(self, user_id, filters=None):
+        """
+        Get the transactions of all the accounts of a user in one query.
+
+        Accepts the same filters as get_account_transactions (dates, category,
+        type, sort_by amount/date/type/category, sort_order, limit). The
+        result is ordered and limited globally, and each row also carries the
+        account_name.
+        """
+        try:
+            with self._connection() as (conn, cursor):
+                return self._fetch_user_transactions(cursor, user_id, filters)
             
         except Exception as e:
-            print(f"Error getting account transactions: {e}")
+            print(f"Error getting user transactions: {e}")
             return []
+
+    def _fetch_user_transactions(self, cursor, user_id, filters=None):
+        """Read the transactions of a user on an open cursor (see get_user_transactions)."""
+        query, params = self._transactions_query("a.user_id = %s", (user_id,), filters)
+        cursor.execute(query, params)
+        return [self._format_transaction(row) for row in cursor.fetchall()]
+    
+    def iter_transactions(self, user_id=None, account_id=None, filters=None, batch_size=None):
+        """
+        Stream the transactions of a user or of an account.
+
+        Rows are read with an unbuffered (server-side) cursor and fetched
+        batch_size at a time, so memory does not depend on the length of the
+        history. The generator keeps its pooled connection until it is
+        exhausted or closed: consume it fully or call close() on it.
+
+        Args:
+            user_id: stream all the accounts of this user, or
+            account_id: stream this account only (received transfers included).
+            filters: same filters as get_account_transactions.
+            batch_size: rows per fetch (data.config.EXPORT['fetch_size'] by default).
+
+        Yields:
+            dict: same rows as get_user_transactions.
+        """
+        if (user_id is None) == (account_id is None):
+            raise ValueError("Indiquer un utilisateur ou un compte.")
+        if user_id is not None:
+            query, params = self._transactions_query("a.user_id = %s", (user_id,), filters)
+        else:
+            query, params = self._transactions_query(self.ACCOUNT_SCOPE, (account_id, account_id), filters)
+        batch_size = batch_size or EXPORT['fetch_size']
+        
+        with self._connection(streaming=True) as (conn, cursor):
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._format_transaction(row)
     
+    # Tris paginables par curseur : (colonne, clé de la ligne)
+    PAGINATED_SORT_FIELDS = {
+        'date': ('t.transaction_date', 'transaction_date'),
+        'amount': ('t.amount', 'amount')
+    }
+
+    def _encode_page_cursor(self, sort_by, sort_order, row):
+        """Build the opaque continuation cursor pointing after row."""
+        value = row[self.PAGINATED_SORT_FIELDS[sort_by][1]]
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat(sep=' ')
+        payload = json.dumps([sort_by, sort_order, str(value), row['transaction_id']])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def _decode_page_cursor(self, cursor, sort_by, sort_order):
+        """
+        Decode a continuation cursor.
+
+        Returns:
+            tuple: (sort value, transaction_id) of the last row already returned.
+        """
+        try:
+            cursor_sort, cursor_order, value, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except Exception:
+            raise ValueError("Curseur de pagination invalide.")
+        if (cursor_sort, cursor_order) != (sort_by, sort_order):
+            raise ValueError("Le curseur ne correspond pas au tri demandé.")
+        return value, int(transaction_id)
+
+    def _transactions_page(self, scope_sql, scope_params, filters, cursor, page_size):
+        """
+        Fetch one page of transactions with keyset pagination.
+
+        The page starts strictly after the (sort value, transaction_id) stored
+        in the cursor, so the cost of a page does not grow with its depth.
+        """
+        filters = filters or {}
+        sort_by = filters.get('sort_by') if filters.get('sort_by') in self.PAGINATED_SORT_FIELDS else 'date'
+        sort_order = 'ASC' if str(filters.get('sort_order', 'desc')).upper() == 'ASC' else 'DESC'
+        sort_field = self.PAGINATED_SORT_FIELDS[sort_by][0]
+        comparison = '<' if sort_order == 'DESC' else '>'
+        
+        keys, params = self._transaction_filters(filters)
+        params[:0] = scope_params
+        if cursor:
+            value, last_id = self._decode_page_cursor(cursor, sort_by, sort_order)
+            params.extend([value, value, last_id])
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        params.append(page_size + 1)
+        
+        def build():
+            query = self.TRANSACTION_SELECT + scope_sql + self._transaction_filter_sql(keys)
+            if cursor:
+                query += f" AND ({sort_field} {comparison} %s OR ({sort_field} = %s AND t.transaction_id {comparison} %s))"
+            return query + f" ORDER BY {sort_field} {sort_order}, t.transaction_id {sort_order} LIMIT %s"
+        
+        query = query_templates.get(("page", scope_sql, keys, sort_by, sort_order, bool(cursor)), build)
+        
+        with self._connection() as (conn, db_cursor):
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
+        
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = self._encode_page_cursor(sort_by, sort_order, rows[-1])
+        
+        return [self._format_transaction(row) for row in rows], next_cursor
+
+    def get_user_transactions_page(self, user_id, filters=None, cursor=None, page_size=50):
+        """
+        Get one page of the transactions of a user, across all their accounts.
+
+        Args:
+            filters: same filters as get_user_transactions; only the 'date'
+                (default) and 'amount' sort keys can be paginated.
+            cursor: continuation cursor returned with the previous page, or None.
+            page_size: number of transactions per page.
+
+        Returns:
+            tuple: (transactions, next_cursor) - next_cursor is None on the last page.
+        """
+        try:
+            return self._transactions_page("a.user_id = %s", (user_id,), filters, cursor, page_size)
+        except Exception as e:
+            print(f"Error getting user transactions page: {e}")
+            return [], None
+
+    def get_account_transactions_page(self, account_id, filters=None, cursor=None, page_size=50):
+        """
+        Get one page of the transactions of an account, received transfers included.
+
+        Returns:
+            tuple: (transactions, next_cursor) - see get_user_transactions_page.
+        """
+        try:
+            return self._transactions_page(self.ACCOUNT_SCOPE, (account_id, account_id), filters, cursor, page_size)
+        except Exception as e:
+            print(f"Error getting account transactions page: {e}")
+            return [], None
+    
+    def _load_reference_data(self):
+        """
+        Read the categories and transaction types tables (used by the reference cache).
+
+        Returns:
+            tuple: (categories, transaction_types)
+        """
+        with self._connection() as (conn, cursor):
+            cursor.execute("SELECT category_id, category_name FROM categories ORDER BY category_id")
+            categories = cursor.fetchall()
+            cursor.execute("SELECT type_id, type_name FROM transaction_types ORDER BY type_id")
+            types = cursor.fetchall()
+        return categories, types
+
     def get_categories(self):
         """
-        Get all transaction categories.
+        Get all transaction categories (served from the reference cache).
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT category_id, category_name FROM categories")
-            
-            categories = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            return categories
+            return self.reference.categories()
             
         except Exception as e:
             print(f"Error getting categories: {e}")
@@ -414,17 +916,10 @@ class Database:
     
     def get_transaction_types(self):
         """
-        Get all transaction types.
+        Get all transaction types (served from the reference cache).
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT type_id, type_name FROM transaction_types")
-            
-            types = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            return types
+            return self.reference.transaction_types()
             
         except Exception as e:
             print(f"Error getting transaction types: {e}")
@@ -433,118 +928,404 @@ class Database:
     def add_transaction(self, account_id, amount, description,  transaction_type, category_id=None, to_account_id=None, reference=None):
         """
         Add a new transaction.
+
+        The posting is a fixed batch of writes with no read in between: the
+        balance check is a condition of the debit UPDATE itself and the
+        existence checks come from the affected row counts. A deposit or a
+        withdrawal costs three statements plus the commit, a transfer (both
+        legs) four, instead of up to nine round trips.
+
+        Balances are only changed by relative UPDATEs, so concurrent postings
+        never lose an update. Row locks are taken by ascending account_id
+        and a posting aborted by a deadlock is replayed (see _run_transaction).
         """
         try:
-            conn, cursor = self._get_connection()
-
             # Générer une référence si non fournie
             if reference is None:
                reference = f"TRX-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-            
-            cursor.execute("START TRANSACTION")
             
-            cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
-            account = cursor.fetchone()
-            
-            if not account:
-                conn.close()
-                return False, "Compte introuvable."
-            
-            current_balance = Decimal(str(account['balance']))  # Convertir en Decimal
-            amount = Decimal(str(amount))  # Convertir le montant en Decimal
+            # Convertir le montant en Decimal, arrondi au centime comme la colonne DECIMAL(15, 2) :
+            # un échec du débit conditionnel ne peut alors venir que du compte ou du solde
+            try:
+                amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+            except ArithmeticError:
+                return False, "Montant invalide."
+            if not amount.is_finite():
+                return False, "Montant invalide."
+            if amount <= 0:
+                return False, "Le montant doit être positif."
             
             if transaction_type == 3 and not to_account_id:
-                conn.rollback()
-                conn.close()
                 return False, "Compte de destination requis pour un transfert."
+        
+            def post(conn, cursor):
+                # Toute transaction non validée est annulée au retour de la connexion dans le pool
+                result = self._post_transaction(cursor, account_id, amount, description, transaction_type,
+                                                category_id, to_account_id, reference)
+                if result[0]:
+                    conn.commit()
+                return result
             
-            if transaction_type == 3:
-                cursor.execute("SELECT account_id FROM accounts WHERE account_id = %s", (to_account_id,))
-                if not cursor.fetchone():
-                    conn.rollback()
-                    conn.close()
-                    return False, "Compte de destination introuvable."
+            success, message = self._run_transaction(post)
+            if not success:
+                return False, message
             
-            if transaction_type == 1:  # Dépôt
-                new_balance = current_balance + amount
-                cursor.execute("UPDATE accounts SET balance = %s WHERE account_id = %s", (str(new_balance), account_id))  # Convertir en chaîne pour MySQL
-                
-            elif transaction_type == 2:  # Retrait
-                if current_balance < amount:
-                    conn.rollback()
-                    conn.close()
-                    return False, "Solde insuffisant pour effectuer ce retrait."
-                
-                new_balance = current_balance - amount
-                cursor.execute("UPDATE accounts SET balance = %s WHERE account_id = %s", (str(new_balance), account_id))  # Convertir en chaîne pour MySQL
-                
-                if new_balance < 0:
-                    cursor.execute("SELECT user_id FROM accounts WHERE account_id = %s", (account_id,))
-                    user_id = cursor.fetchone()['user_id']
-                    
-                    cursor.execute(
-                        """
-                        INSERT INTO alerts (user_id, account_id, alert_type, message)
-                        VALUES (%s, %s, %s, %s)
-                        """,
-                        (user_id, account_id, "overdraft", f"Attention: votre compte est à découvert ({new_balance:.2f} €)")
-                    )
-                
-            elif transaction_type == 3:  # Transfert
-                if current_balance < amount:
-                    conn.rollback()
-                    conn.close()
-                    return False, "Solde insuffisant pour effectuer ce transfert."
-                
-                new_source_balance = current_balance - amount
-                cursor.execute("UPDATE accounts SET balance = %s WHERE account_id = %s", (str(new_source_balance), account_id))  # Convertir en chaîne pour MySQL
-                
-                cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (to_account_id,))
-                dest_account = cursor.fetchone()
-                new_dest_balance = Decimal(str(dest_account['balance'])) + amount
-                cursor.execute("UPDATE accounts SET balance = %s WHERE account_id = %s", (str(new_dest_balance), to_account_id))  # Convertir en chaîne pour MySQL
-                
-                if new_source_balance < 0:
-                    cursor.execute("SELECT user_id FROM accounts WHERE account_id = %s", (account_id,))
-                    user_id = cursor.fetchone()['user_id']
-                    
-                    cursor.execute(
-                        """
-                        INSERT INTO alerts (user_id, account_id, alert_type, message)
-                        VALUES (%s, %s, %s, %s)
-                        """,
-                        (user_id, account_id, "overdraft", f"Attention: votre compte est à découvert ({new_source_balance:.2f} €)")
-                    )
+            self.account_cache.invalidate_accounts(account_id, to_account_id)
+            return True, "Transaction effectuée avec succès."
             
-            cursor.execute(
-                """
-                INSERT INTO transactions (reference, description, amount, account_id, category_id, type_id, to_account_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """,
-                (reference, description, str(amount), account_id, category_id, transaction_type, to_account_id)  # Convertir en chaîne pour MySQL
-            )
+        except Exception as e:
+            return False, f"Erreur lors de la transaction: {e}"
+
+    def _post_transaction(self, cursor, account_id, amount, description, transaction_type, category_id, to_account_id, reference):
+        """
+        Write one posting on an open cursor, without committing.
+
+        Returns:
+            tuple: (success, error message) - on failure the caller must not commit.
+        """
+        if transaction_type not in (1, 2, 3):
+            return False, "Type de transaction invalide."
+        
+        # Mouvements : (compte, variation, message si le compte n'existe pas)
+        legs = [(account_id, amount if transaction_type == 1 else -amount, "Compte introuvable.")]
+        if transaction_type == 3:  # Transfert : le crédit du compte de destination
+            legs.append((to_account_id, amount, "Compte de destination introuvable."))
+        
+        # Verrous de ligne pris par account_id croissant : deux transferts croisés
+        # (A -> B et B -> A) s'attendent au lieu de s'interbloquer
+        for leg_account_id, delta, missing in sorted(legs, key=lambda leg: int(leg[0])):
+            if delta > 0:
+                cursor.execute("UPDATE accounts SET balance = balance + %s WHERE account_id = %s", (str(delta), leg_account_id))  # Convertir en chaîne pour MySQL
+            else:
+                # Débit seulement si le solde suffit : le solde ne peut donc pas devenir négatif ici,
+                # pas d'alerte de découvert à lever
+                cursor.execute(
+                    "UPDATE accounts SET balance = balance - %s WHERE account_id = %s AND balance >= %s",
+                    (str(amount), leg_account_id, str(amount))
+                )
             
+            if cursor.rowcount != 1:
+                if delta < 0:
+                    cursor.execute("SELECT account_id FROM accounts WHERE account_id = %s", (leg_account_id,))
+                    if cursor.fetchone():
+                        if transaction_type == 2:
+                            return False, "Solde insuffisant pour effectuer ce retrait."
+                        return False, "Solde insuffisant pour effectuer ce transfert."
+                return False, missing
+        
+        cursor.execute(
+            """
+            INSERT INTO transactions (reference, description, amount, account_id, category_id, type_id, to_account_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            (reference, description, str(amount), account_id, category_id, transaction_type, to_account_id)  # Convertir en chaîne pour MySQL
+        )
+        self._update_rollups(cursor, "t.transaction_id = %s", (cursor.lastrowid,))
+        return True, None
+
+    def transfer(self, from_account_id, to_account_id, amount, description, reference=None):
+        """
+        Move money between two accounts.
+
+        Both legs (debit of the source, credit of the destination) and the
+        transaction row are written in one DB transaction: either all of them
+        are applied or none.
+
+        Returns:
+            tuple: (success, message)
+        """
+        if from_account_id == to_account_id:
+            return False, "Les comptes source et destination doivent être différents."
+        return self.add_transaction(from_account_id, amount, description, 3,
+                                    to_account_id=to_account_id, reference=reference)
+
+    def add_transactions_bulk(self, rows, checkpoint=None):
+        """
+        Insert a batch of transactions in a single DB transaction.
+
+        Each row is a dict with the arguments of add_transaction (account_id,
+        amount, description, transaction_type and optionally category_id,
+        to_account_id, reference) plus an optional transaction_date for
+        historical data. Valid rows are inserted with executemany, each
+        touched account gets one UPDATE with its net change and one overdraft
+        alert is raised per account that the batch as a whole leaves
+        negative. Unlike add_transaction, withdrawals are not refused for
+        insufficient balance.
+
+        Args:
+            rows: iterable of transaction dicts.
+            checkpoint: optional dict (import_id, account_id, rows_done,
+                finished) saved in the same DB transaction, so an import
+                can resume exactly after the last committed batch.
+
+        Returns:
+            tuple: (success, message, errors) - errors lists (row index, message)
+            for the rows that were rejected; the other rows are inserted.
+        """
+        rows = list(rows)
+
+        def insert(conn, cursor):
+            cursor.execute("START TRANSACTION")
+            result = self._insert_bulk(cursor, rows)
+            if checkpoint is not None:
+                self._save_import_checkpoint(cursor, checkpoint)
             conn.commit()
-            conn.close()
+            return result
+
+        try:
+            inserted, errors, touched = self._run_transaction(insert)
+
+            if touched:
+                self.account_cache.invalidate_accounts(*touched)
+            return True, f"{inserted} transaction(s) importée(s).", errors
+
+        except Exception as e:
+            return False, f"Erreur lors de l'import: {e}", []
+
+    def _save_import_checkpoint(self, cursor, checkpoint):
+        """Record how far an import went, on an open cursor."""
+        cursor.execute(
+            """
+            INSERT INTO import_checkpoints (import_id, account_id, rows_done, finished)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                rows_done = VALUES(rows_done),
+                finished = VALUES(finished),
+                updated_at = NOW()
+            """,
+            (checkpoint['import_id'], checkpoint['account_id'], checkpoint['rows_done'],
+             1 if checkpoint.get('finished') else 0)
+        )
+
+    def get_import_checkpoint(self, import_id):
+        """
+        Get the progress of an import.
+
+        Returns:
+            dict: import_id, account_id, rows_done, finished, updated_at - or
+            None if the import never committed a batch.
+        """
+        try:
+            with self._connection() as (conn, cursor):
+                cursor.execute(
+                    """
+                    SELECT import_id, account_id, rows_done, finished, updated_at
+                    FROM import_checkpoints
+                    WHERE import_id = %s
+                    """,
+                    (import_id,)
+                )
+                row = cursor.fetchone()
             
-            return True, "Transaction effectuée avec succès."
+            return dict(row) if row else None
             
         except Exception as e:
-            if conn:
-                conn.rollback()
-                conn.close()
-            return False, f"Erreur lors de la transaction: {e}"
-    
+            print(f"Error getting import checkpoint: {e}")
+            return None
+
+    # Taille des listes IN lors de la lecture des comptes d'un lot
+    BULK_LOOKUP_CHUNK = 500
+
+    def _insert_bulk(self, cursor, rows):
+        """
+        Validate and insert a batch of transactions on an open cursor, without committing.
+
+        Also applies the net balance changes, the overdraft alerts and the
+        monthly rollups of the batch.
+
+        Returns:
+            tuple: (inserted count, errors, touched account ids)
+        """
+        owners = self._bulk_account_owners(cursor, rows)
+        categories = {category['category_id'] for category in self.reference.categories()}
+        now = datetime.datetime.now()
+        defaults = (f"TRX-{now.strftime('%Y%m%d%H%M%S')}", now.strftime('%Y-%m-%d %H:%M:%S'))
+
+        records = []
+        errors = []
+        net = {}      # account_id -> variation du solde
+        rollups = {}  # (user_id, month, account_id, category_id, type_id) -> [total, nombre]
+
+        for index, row in enumerate(rows):
+            try:
+                record, amount = self._validate_bulk_row(row, owners, categories, defaults)
+            except KeyError as e:
+                errors.append((index, f"Champ manquant: {e.args[0]}."))
+                continue
+            except ValueError as e:
+                errors.append((index, str(e)))
+                continue
+
+            records.append(record)
+            reference, description, _, date, account_id, category_id, type_id, to_account_id = record
+
+            if type_id == 1:  # Dépôt
+                net[account_id] = net.get(account_id, Decimal('0.00')) + amount
+            else:  # Retrait ou Transfert
+                net[account_id] = net.get(account_id, Decimal('0.00')) - amount
+                if type_id == 3:
+                    net[to_account_id] = net.get(to_account_id, Decimal('0.00')) + amount
+
+            key = (owners[account_id], date[:7], account_id, category_id or 0, type_id)
+            total = rollups.setdefault(key, [Decimal('0.00'), 0])
+            total[0] += amount
+            total[1] += 1
+
+        if not records:
+            return 0, errors, []
+
+        cursor.executemany(
+            """
+            INSERT INTO transactions (reference, description, amount, transaction_date, account_id, category_id, type_id, to_account_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            records
+        )
+
+        # Une seule mise à jour par compte, dans l'ordre des identifiants
+        touched = sorted(net)
+        cursor.executemany(
+            "UPDATE accounts SET balance = balance + %s WHERE account_id = %s",
+            [(str(net[account_id]), account_id) for account_id in touched if net[account_id]]
+        )
+
+        overdrawn = [account_id for account_id in touched if net[account_id] < 0]
+        if overdrawn:
+            placeholders = ','.join('%s' for _ in overdrawn)
+            cursor.execute(
+                f"SELECT account_id, user_id, balance FROM accounts WHERE account_id IN ({placeholders}) AND balance < 0",
+                overdrawn
+            )
+            alerts = [
+                (row['user_id'], row['account_id'], "overdraft",
+                 f"Attention: votre compte est à découvert ({Decimal(str(row['balance'])):.2f} €)")
+                for row in cursor.fetchall()
+            ]
+            if alerts:
+                cursor.executemany(
+                    """
+                    INSERT INTO alerts (user_id, account_id, alert_type, message)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    alerts
+                )
+
+        cursor.executemany(
+            """
+            INSERT INTO monthly_rollups (user_id, month, account_id, category_id, type_id, total, tx_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                total = ROUND(total + VALUES(total), 2),
+                tx_count = tx_count + VALUES(tx_count)
+            """,
+            [key + (str(total), count) for key, (total, count) in rollups.items()]
+        )
+
+        return len(records), errors, touched
+
+    def _bulk_account_owners(self, cursor, rows):
+        """Read the owner of every account referenced by a batch: {account_id: user_id}."""
+        account_ids = set()
+        for row in rows:
+            for column in ('account_id', 'to_account_id'):
+                try:
+                    account_ids.add(int(row[column]))
+                except (KeyError, TypeError, ValueError):
+                    pass
+
+        owners = {}
+        account_ids = sorted(account_ids)
+        for start in range(0, len(account_ids), self.BULK_LOOKUP_CHUNK):
+            chunk = account_ids[start:start + self.BULK_LOOKUP_CHUNK]
+            placeholders = ','.join('%s' for _ in chunk)
+            cursor.execute(f"SELECT account_id, user_id FROM accounts WHERE account_id IN ({placeholders})", chunk)
+            owners.update((row['account_id'], row['user_id']) for row in cursor.fetchall())
+        return owners
+
+    def _validate_bulk_row(self, row, owners, categories, defaults):
+        """
+        Check one row of a batch and convert it to the transactions column order.
+
+        Returns:
+            tuple: (insert parameters, amount as Decimal)
+
+        Raises:
+            ValueError: with a message suitable for the per-row error report.
+        """
+        default_reference, default_date = defaults
+
+        account_id = self._bulk_int(row['account_id'], "Compte invalide.")
+        if account_id not in owners:
+            raise ValueError("Compte introuvable.")
+
+        try:
+            amount = Decimal(str(row['amount'])).quantize(Decimal('0.01'))
+        except ArithmeticError:
+            raise ValueError("Montant invalide.")
+        # 'NaN' et 'Infinity' passent quantize mais ne se comparent pas
+        if not amount.is_finite():
+            raise ValueError("Montant invalide.")
+        if amount <= 0:
+            raise ValueError("Le montant doit être positif.")
+
+        type_id = self._bulk_int(row['transaction_type'], "Type de transaction invalide.")
+        if type_id not in (1, 2, 3):
+            raise ValueError("Type de transaction invalide.")
+
+        to_account_id = row.get('to_account_id')
+        if type_id == 3:
+            if not to_account_id:
+                raise ValueError("Compte de destination requis pour un transfert.")
+            to_account_id = self._bulk_int(to_account_id, "Compte de destination invalide.")
+            if to_account_id not in owners:
+                raise ValueError("Compte de destination introuvable.")
+        else:
+            to_account_id = None
+
+        category_id = row.get('category_id')
+        if category_id is not None:
+            category_id = self._bulk_int(category_id, "Catégorie invalide.")
+            if category_id not in categories:
+                raise ValueError("Catégorie inconnue.")
+
+        date = row.get('transaction_date') or default_date
+        try:
+            if isinstance(date, str):
+                parsed = datetime.datetime.fromisoformat(date)
+                # Déjà au format 'YYYY-MM-DD HH:MM:SS' : gardé tel quel
+                if len(date) != 19 or date[10] != ' ':
+                    date = parsed.isoformat(sep=' ', timespec='seconds')
+            elif isinstance(date, datetime.datetime):
+                date = date.isoformat(sep=' ', timespec='seconds')
+            else:
+                date = datetime.datetime.combine(date, datetime.time()).isoformat(sep=' ', timespec='seconds')
+        except (TypeError, ValueError):
+            raise ValueError("Date invalide.")
+
+        record = (row.get('reference') or default_reference, row.get('description'), str(amount),
+                  date, account_id, category_id, type_id, to_account_id)
+        return record, amount
+
+    @staticmethod
+    def _bulk_int(value, message):
+        """Convert an identifier of a bulk row to int, or raise ValueError(message)."""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(message)
+
     def get_account_balance(self, account_id):
         """
         Récupère le solde actuel d'un compte
         """
+        balance = self.account_cache.balance(account_id)
+        if balance is not None:
+            return Decimal(str(balance))
+        
         try:
-            conn, cursor = self._get_connection()
-            cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (account_id,))
-            result = cursor.fetchone()
-            conn.close()
+            with self._connection() as (conn, cursor):
+                cursor.execute(PreparedSQL("SELECT balance FROM accounts WHERE account_id = %s"), (account_id,))
+                result = cursor.fetchone()
             
             if result:
                 return Decimal(str(result['balance']))
@@ -558,84 +1339,72 @@ class Database:
         Get monthly summary of income and expenses for a user.
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT account_id FROM accounts WHERE user_id = %s", (user_id,))
-            accounts = cursor.fetchall()
-            
-            if not accounts:
-                conn.close()
-                return {}
-            
-            account_ids = [account['account_id'] for account in accounts]
-            account_ids_str = ','.join('%s' for _ in account_ids)
-            
-            query = f"""
-                SELECT 
-                    DATE_FORMAT(transaction_date, '%Y-%m') as month,
-                    SUM(CASE WHEN type_id = 1 THEN amount ELSE 0 END) as income,
-                    SUM(CASE WHEN type_id = 2 THEN amount ELSE 0 END) as expenses
-                FROM transactions
-                WHERE account_id IN ({account_ids_str})
-                    AND transaction_date >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-                GROUP BY DATE_FORMAT(transaction_date, '%Y-%m')
-                ORDER BY month
-            """
-            
-            cursor.execute(query, account_ids)
-            
-            monthly_data = {}
-            for row in cursor.fetchall():
-                monthly_data[row['month']] = {
-                    'income': row['income'],
-                    'expenses': row['expenses'],
-                    'net': row['income'] - row['expenses']
-                }
-            
-            conn.close()
-            return monthly_data
+            with self._connection() as (conn, cursor):
+                return self._fetch_monthly_summary(cursor, user_id)
             
         except Exception as e:
             print(f"Error getting monthly summary: {e}")
             return {}
     
+    def _fetch_monthly_summary(self, cursor, user_id):
+        """
+        Compute the monthly summary of a user on an open cursor (see get_monthly_summary).
+
+        Reads monthly_rollups for the last 12 calendar months, current one included.
+        """
+        today = datetime.date.today()
+        first_month = f"{today.year - 1 + today.month // 12}-{today.month % 12 + 1:02d}"
+        cursor.execute(
+            PreparedSQL("""
+            SELECT 
+                month,
+                SUM(CASE WHEN type_id = 1 THEN total ELSE 0 END) as income,
+                SUM(CASE WHEN type_id = 2 THEN total ELSE 0 END) as expenses
+            FROM monthly_rollups
+            WHERE user_id = %s AND month >= %s
+            GROUP BY month
+            ORDER BY month
+            """),
+            (user_id, first_month)
+        )
+        
+        monthly_data = {}
+        for row in cursor.fetchall():
+            monthly_data[row['month']] = {
+                'income': row['income'],
+                'expenses': row['expenses'],
+                'net': row['income'] - row['expenses']
+            }
+        
+        return monthly_data
+    
     def get_category_summary(self, user_id):
         """
         Get expense summary by category for a user.
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT account_id FROM accounts WHERE user_id = %s", (user_id,))
-            accounts = cursor.fetchall()
-            
-            if not accounts:
-                conn.close()
-                return {}
-            
-            account_ids = [account['account_id'] for account in accounts]
-            account_ids_str = ','.join('%s' for _ in account_ids)
-            
-            query = f"""
-                SELECT 
-                    c.category_name,
-                    SUM(t.amount) as total
-                FROM transactions t
-                JOIN categories c ON t.category_id = c.category_id
-                WHERE t.account_id IN ({account_ids_str})
-                    AND t.type_id = 2
-                    AND DATE_FORMAT(t.transaction_date, '%Y-%m') = DATE_FORMAT(CURDATE(), '%Y-%m')
-                GROUP BY c.category_name
-                ORDER BY total DESC
-            """
-            
-            cursor.execute(query, account_ids)
+            with self._connection() as (conn, cursor):
+                cursor.execute(
+                    PreparedSQL("""
+                    SELECT 
+                        c.category_name,
+                        SUM(r.total) as total
+                    FROM monthly_rollups r
+                    JOIN categories c ON r.category_id = c.category_id
+                    WHERE r.user_id = %s
+                        AND r.month = %s
+                        AND r.type_id = 2
+                    GROUP BY c.category_name
+                    ORDER BY total DESC
+                    """),
+                    (user_id, datetime.date.today().strftime('%Y-%m'))
+                )
+                rows = cursor.fetchall()
             
             category_data = {}
-            for row in cursor.fetchall():
+            for row in rows:
                 category_data[row['category_name']] = row['total']
             
-            conn.close()
             return category_data
             
         except Exception as e:
@@ -645,69 +1414,67 @@ class Database:
     def add_external_transfer(self, account_id, amount, beneficiary, iban, description):
         """Enregistre un transfert externe"""
         try:
-            conn, cursor = self._get_connection()
-            
-            # 1. Débit du compte
-            cursor.execute("UPDATE accounts SET balance = balance - %s WHERE account_id = %s", 
-                        (amount, account_id))
-            
-            # 2. Enregistrement spécial
-            cursor.execute("""
-                INSERT INTO external_transfers 
-                (account_id, amount, beneficiary, iban, description, status)
-                VALUES (%s, %s, %s, %s, %s, 'PENDING')
-            """, (account_id, amount, beneficiary, iban, description))
-            
-            conn.commit()
+            with self._connection() as (conn, cursor):
+                # 1. Débit du compte
+                cursor.execute("UPDATE accounts SET balance = balance - %s WHERE account_id = %s", 
+                            (amount, account_id))
+                
+                # 2. Enregistrement spécial
+                cursor.execute("""
+                    INSERT INTO external_transfers 
+                    (account_id, amount, beneficiary, iban, description, status)
+                    VALUES (%s, %s, %s, %s, %s, 'PENDING')
+                """, (account_id, amount, beneficiary, iban, description))
+                
+                conn.commit()
+            self.account_cache.invalidate_accounts(account_id)
             return True, "Transfert programmé"
         except Exception as e:
-            conn.rollback()
             return False, str(e)
-        finally:
-            conn.close()
     
     def get_alerts(self, user_id):
         """
         Get alerts for a user.
         """
         try:
-            conn, cursor = self._get_connection()
+            with self._connection() as (conn, cursor):
+                return self._fetch_alerts(cursor, user_id)
             
-            cursor.execute(
-                """
+        except Exception as e:
+            print(f"Error getting alerts: {e}")
+            return []
+
+    def _fetch_alerts(self, cursor, user_id, unread_only=False):
+        """Read the alerts of a user on an open cursor, most recent first."""
+        def build():
+            query = """
                 SELECT a.alert_id, a.alert_type, a.message, a.is_read, a.created_at,
                        acc.account_name
                 FROM alerts a
                 LEFT JOIN accounts acc ON a.account_id = acc.account_id
                 WHERE a.user_id = %s
-                ORDER BY a.created_at DESC
-                """,
-                (user_id,)
-            )
-            
-            alerts = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            return alerts
-            
-        except Exception as e:
-            print(f"Error getting alerts: {e}")
-            return []
+            """
+            if unread_only:
+                query += " AND a.is_read = 0"
+            return query + " ORDER BY a.created_at DESC"
+        
+        query = query_templates.get(("alerts", unread_only), build)
+        
+        cursor.execute(query, (user_id,))
+        return [dict(row) for row in cursor.fetchall()]
     
     def mark_alert_as_read(self, alert_id):
         """
         Mark an alert as read.
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute(
-                "UPDATE alerts SET is_read = 1 WHERE alert_id = %s",
-                (alert_id,)
-            )
-            
-            conn.commit()
-            conn.close()
+            with self._connection() as (conn, cursor):
+                cursor.execute(
+                    "UPDATE alerts SET is_read = 1 WHERE alert_id = %s",
+                    (alert_id,)
+                )
+                
+                conn.commit()
             
             return True
             
@@ -720,141 +1487,366 @@ class Database:
         Get scheduled payments for an account.
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute(
-                """
-                SELECT sp.payment_id, sp.reference, sp.description, sp.amount, 
-                       sp.frequency, sp.next_date, c.category_name
-                FROM scheduled_payments sp
-                LEFT JOIN categories c ON sp.category_id = c.category_id
-                WHERE sp.account_id = %s
-                ORDER BY sp.next_date
-                """,
-                (account_id,)
-            )
-            
-            payments = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            return payments
+            with self._connection() as (conn, cursor):
+                cursor.execute(
+                    """
+                    SELECT sp.payment_id, sp.reference, sp.description, sp.amount, 
+                           sp.frequency, sp.next_date, c.category_name
+                    FROM scheduled_payments sp
+                    LEFT JOIN categories c ON sp.category_id = c.category_id
+                    WHERE sp.account_id = %s
+                    ORDER BY sp.next_date
+                    """,
+                    (account_id,)
+                )
+                
+                return [dict(row) for row in cursor.fetchall()]
             
         except Exception as e:
             print(f"Error getting scheduled payments: {e}")
             return []
     
+    def _fetch_user_scheduled_payments(self, cursor, user_id):
+        """
+        Read the scheduled payments of all the accounts of a user on an open cursor.
+
+        Returns:
+            dict: account_id -> list of payments ordered by next_date.
+        """
+        cursor.execute(
+            PreparedSQL("""
+            SELECT sp.payment_id, sp.account_id, sp.reference, sp.description, sp.amount, 
+                   sp.frequency, sp.next_date, c.category_name
+            FROM scheduled_payments sp
+            JOIN accounts a ON sp.account_id = a.account_id
+            LEFT JOIN categories c ON sp.category_id = c.category_id
+            WHERE a.user_id = %s
+            ORDER BY sp.account_id, sp.next_date
+            """),
+            (user_id,)
+        )
+        
+        payments = {}
+        for row in cursor.fetchall():
+            payments.setdefault(row['account_id'], []).append(dict(row))
+        return payments
+    
     def create_scheduled_payment(self, account_id, reference, description, amount, category_id, frequency, next_date):
         """
         Create a scheduled payment.
+
+        The day of next_date is kept as the anchor day of the monthly and
+        yearly occurrences (a payment created for the 31st stays on the 31st).
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute(
-                """
-                INSERT INTO scheduled_payments 
-                (account_id, reference, description, amount, category_id, frequency, next_date)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """,
-                (account_id, reference, description, amount, category_id, frequency, next_date)
-            )
-            
-            conn.commit()
-            conn.close()
+            if isinstance(next_date, str):
+                next_date = datetime.date.fromisoformat(next_date)
+            with self._connection() as (conn, cursor):
+                cursor.execute(
+                    """
+                    INSERT INTO scheduled_payments 
+                    (account_id, reference, description, amount, category_id, frequency, next_date, anchor_day)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    (account_id, reference, description, amount, category_id, frequency, next_date, next_date.day)
+                )
+                
+                conn.commit()
             
             return True, "Paiement programmé créé avec succès."
             
         except Exception as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             return False, f"Erreur lors de la création du paiement programmé: {e}"
+
+    def get_payment_schedule(self, after_payment_id=None, payment_ids=None):
+        """
+        Get the next due date of scheduled payments (for the scheduler).
+
+        Args:
+            after_payment_id: only payments created after this one (incremental refresh).
+            payment_ids: only these payments.
+
+        Returns:
+            list: dicts (payment_id, account_id, next_date), by payment_id.
+        """
+        query = "SELECT payment_id, account_id, next_date FROM scheduled_payments"
+        try:
+            with self._connection() as (conn, cursor):
+                if payment_ids is None:
+                    cursor.execute(query + " WHERE payment_id > %s ORDER BY payment_id", (after_payment_id or 0,))
+                    return [dict(row) for row in cursor.fetchall()]
+
+                schedule = []
+                payment_ids = sorted(set(payment_ids))
+                for start in range(0, len(payment_ids), self.BULK_LOOKUP_CHUNK):
+                    chunk = payment_ids[start:start + self.BULK_LOOKUP_CHUNK]
+                    placeholders = ','.join('%s' for _ in chunk)
+                    cursor.execute(query + f" WHERE payment_id IN ({placeholders}) ORDER BY payment_id", chunk)
+                    schedule.extend(dict(row) for row in cursor.fetchall())
+                return schedule
+
+        except Exception as e:
+            print(f"Error getting payment schedule: {e}")
+            return []
         
     def get_expenses_by_category(self, user_id):
         """
         Récupère le total des dépenses par catégorie pour un utilisateur donné.
         """
         try:
-            conn, cursor = self._get_connection()
-            
-            query = """
-                SELECT c.category_name, SUM(t.amount) AS total
-                FROM transactions t
-                JOIN accounts a ON t.account_id = a.account_id
-                JOIN categories c ON t.category_id = c.category_id
-                WHERE a.user_id = %s
-                AND t.type_id IN (2, 3)  # 2 = Retrait, 3 = Transfert
-                GROUP BY c.category_name
-                ORDER BY total DESC
-            """
-            
-            cursor.execute(query, (user_id,))
-            result = cursor.fetchall()
-            
-            expenses = [{"category": row["category_name"], "amount": row["total"]} for row in result] if result else []
-            
-            conn.close()
-            return expenses
+            with self._connection() as (conn, cursor):
+                return self._fetch_expenses_by_category(cursor, user_id)
         
         except Exception as e:
             print(f"Erreur lors de la récupération des dépenses par catégorie: {e}")
             return []
 
-    def process_due_scheduled_payments(self):
+    def _fetch_expenses_by_category(self, cursor, user_id):
+        """Read the expense totals by category of a user on an open cursor."""
+        query = PreparedSQL("""
+            SELECT c.category_name, SUM(r.total) AS total
+            FROM monthly_rollups r
+            JOIN categories c ON r.category_id = c.category_id
+            WHERE r.user_id = %s
+            AND r.type_id IN (2, 3)  -- 2 = Retrait, 3 = Transfert
+            GROUP BY c.category_name
+            ORDER BY total DESC
+        """)
+        
+        cursor.execute(query, (user_id,))
+        result = cursor.fetchall()
+        
+        return [{"category": row["category_name"], "amount": row["total"]} for row in result] if result else []
+
+    def get_dashboard_snapshot(self, user_id, recent_limit=5):
         """
-        Process all due scheduled payments.
+        Get everything the home screen displays in one immutable snapshot.
+
+        All the reads run on a single pooled connection inside one
+        transaction, so the parts are consistent with each other. The
+        accounts come from the account cache when it is warm.
+
+        Args:
+            user_id: ID of the user.
+            recent_limit: number of recent transactions to include.
+
+        Returns:
+            DashboardSnapshot: empty (but still usable) if the reads fail.
         """
         try:
-            conn, cursor = self._get_connection()
+            accounts = self.account_cache.get(user_id)
+            generation = self.account_cache.generation()
+            with self._connection() as (conn, cursor):
+                if accounts is None:
+                    accounts = self._fetch_user_accounts(cursor, user_id)
+                    self.account_cache.put(user_id, accounts, generation)
+                
+                snapshot = DashboardSnapshot(
+                    user_id=user_id,
+                    accounts=freeze(accounts),
+                    total_balance=sum((Decimal(str(account['balance'])) for account in accounts), Decimal('0.00')),
+                    monthly_summary=freeze(self._fetch_monthly_summary(cursor, user_id)),
+                    unread_alerts=freeze(self._fetch_alerts(cursor, user_id, unread_only=True)),
+                    scheduled_payments=freeze(self._fetch_user_scheduled_payments(cursor, user_id)),
+                    expenses_by_category=freeze(self._fetch_expenses_by_category(cursor, user_id)),
+                    recent_transactions=freeze(self._fetch_user_transactions(cursor, user_id, {'limit': recent_limit})),
+                )
             
+            return snapshot
+        
+        except Exception as e:
+            print(f"Error getting dashboard snapshot: {e}")
+            return DashboardSnapshot(user_id=user_id)
+
+    def process_due_scheduled_payments(self, payment_ids=None, today=None):
+        """
+        Post every due occurrence of the scheduled payments in one DB transaction.
+
+        Missed periods are caught up, each one dated on its own due date
+        (calendar months and years from the payment's anchor day, see
+        data.recurrence). Occurrences are
+        paid per account in date order while the balance allows it; a
+        payment that cannot be paid stays due from its first unpaid date.
+        The postings go through the bulk path (one INSERT batch, one balance
+        UPDATE per account) and next_date is advanced in the same
+        transaction, so running the processor again - or concurrently -
+        never posts an occurrence twice.
+
+        Args:
+            payment_ids: only process these payments (default: all).
+            today: process what is due on or before this date (default: today).
+
+        Returns:
+            int: number of transactions posted.
+        """
+        today = today or datetime.date.today()
+        if payment_ids is not None:
+            payment_ids = sorted(set(payment_ids))
+            if not payment_ids:
+                return 0
+
+        def process(conn, cursor):
+            # Verrouiller d'abord : un second passage attend puis relit les dates déjà avancées
             cursor.execute("START TRANSACTION")
-            
-            cursor.execute(
-                """
-                SELECT payment_id, account_id, reference, description, amount, category_id, frequency, next_date
-                FROM scheduled_payments
-                WHERE next_date <= CURDATE()
-                """
+            due = self._lock_due_payments(cursor, payment_ids, today)
+            # Un paiement invalide (montant nul, catégorie inconnue...) est écarté, pas les autres
+            invalid = self._invalid_scheduled_payments(cursor, due)
+            for payment_id, message in sorted(invalid.items()):
+                print(f"Paiement programmé {payment_id} ignoré: {message}")
+            due = [payment for payment in due if payment['payment_id'] not in invalid]
+            if not due:
+                return 0, []
+
+            rows, advanced = self._plan_scheduled_postings(due, today)
+            inserted, errors, touched = self._insert_bulk(cursor, rows) if rows else (0, [], [])
+            if errors:
+                raise ValueError(f"Paiement programmé invalide: {errors[0][1]}")
+            
+            # Avance groupée ; la condition sur l'ancienne date rend l'opération rejouable
+            cursor.executemany(
+                "UPDATE scheduled_payments SET next_date = %s WHERE payment_id = %s AND next_date = %s",
+                advanced
             )
-            
-            due_payments = [dict(row) for row in cursor.fetchall()]
-            processed_count = 0
-            
-            for payment in due_payments:
-                result = self.add_transaction(
-                    payment['account_id'],
-                    payment['reference'],
-                    payment['description'],
-                    payment['amount'],
-                    2,  # Retrait (expense)
-                    payment['category_id']
-                )
-                
-                if result[0]:
-                    current_date = datetime.datetime.fromisoformat(payment['next_date'])
-                    
-                    if payment['frequency'] == 'monthly':
-                        next_date = (current_date + datetime.timedelta(days=30)).date().isoformat()
-                    elif payment['frequency'] == 'weekly':
-                        next_date = (current_date + datetime.timedelta(days=7)).date().isoformat()
-                    elif payment['frequency'] == 'yearly':
-                        next_date = (current_date + datetime.timedelta(days=365)).date().isoformat()
-                    
-                    if next_date:
-                        cursor.execute(
-                            "UPDATE scheduled_payments SET next_date = %s WHERE payment_id = %s",
-                            (next_date, payment['payment_id'])
-                        )
-                        processed_count += 1
-            
             conn.commit()
-            conn.close()
-            
-            return processed_count
+            return inserted, touched
+
+        try:
+            posted, touched = self._run_transaction(process)
+            if touched:
+                self.account_cache.invalidate_accounts(*touched)
+            return posted
             
         except Exception as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             print(f"Error processing scheduled payments: {e}")
-            return 0
\ No newline at end of file
+            return 0
+
+    def _lock_due_payments(self, cursor, payment_ids, today):
+        """Read and lock the due scheduled payments with the balance of their account."""
+        query = """
+            SELECT sp.payment_id, sp.account_id, sp.reference, sp.description, sp.amount,
+                   sp.category_id, sp.frequency, sp.next_date, sp.anchor_day, a.balance
+            FROM scheduled_payments sp
+            JOIN accounts a ON sp.account_id = a.account_id
+            WHERE sp.next_date <= %s
+        """
+        if payment_ids is None:
+            cursor.execute(query + " ORDER BY sp.account_id, sp.next_date, sp.payment_id FOR UPDATE", (today.isoformat(),))
+            return [dict(row) for row in cursor.fetchall()]
+
+        due = []
+        for start in range(0, len(payment_ids), self.BULK_LOOKUP_CHUNK):
+            chunk = payment_ids[start:start + self.BULK_LOOKUP_CHUNK]
+            placeholders = ','.join('%s' for _ in chunk)
+            cursor.execute(
+                query + f" AND sp.payment_id IN ({placeholders}) ORDER BY sp.account_id, sp.next_date, sp.payment_id FOR UPDATE",
+                [today.isoformat()] + chunk
+            )
+            due.extend(dict(row) for row in cursor.fetchall())
+        return due
+
+    def _invalid_scheduled_payments(self, cursor, due):
+        """
+        Check one posting of each due payment as _insert_bulk will.
+
+        A category unknown to the cached reference data is checked again
+        after reloading it (category created since the cache was filled).
+
+        Returns:
+            dict: payment_id -> error message, for the payments that cannot be posted.
+        """
+        if not due:
+            return {}
+        postings = [self._scheduled_posting(payment, payment['next_date']) for payment in due]
+        owners = self._bulk_account_owners(cursor, postings)
+        now = datetime.datetime.now()
+        defaults = (f"TRX-{now.strftime('%Y%m%d%H%M%S')}", now.strftime('%Y-%m-%d %H:%M:%S'))
+
+        def check(payments):
+            categories = {category['category_id'] for category in self.reference.categories()}
+            invalid = {}
+            for payment, posting in payments:
+                try:
+                    self._validate_bulk_row(posting, owners, categories, defaults)
+                except KeyError as e:
+                    invalid[payment['payment_id']] = f"Champ manquant: {e.args[0]}."
+                except ValueError as e:
+                    invalid[payment['payment_id']] = str(e)
+            return invalid
+
+        invalid = check(zip(due, postings))
+        if "Catégorie inconnue." in invalid.values():
+            self.reference.invalidate()
+            retried = [(payment, posting) for payment, posting in zip(due, postings)
+                       if invalid.get(payment['payment_id']) == "Catégorie inconnue."]
+            for payment, _ in retried:
+                del invalid[payment['payment_id']]
+            invalid.update(check(retried))
+        return invalid
+
+    @staticmethod
+    def _scheduled_posting(payment, date):
+        """Build the _insert_bulk row of one occurrence of a scheduled payment."""
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        elif isinstance(date, str):
+            date = datetime.date.fromisoformat(date)
+        return {
+            "account_id": payment['account_id'],
+            "amount": Decimal(str(payment['amount'])),
+            "description": payment['description'] or payment['reference'],
+            "transaction_type": 2,  # Retrait (dépense)
+            "category_id": payment['category_id'],
+            "reference": payment['reference'],
+            "transaction_date": f"{date.isoformat()} 00:00:00",
+        }
+
+    @staticmethod
+    def _plan_scheduled_postings(due, today):
+        """
+        Expand due payments into postings, account by account.
+
+        Returns:
+            tuple: (rows for _insert_bulk, [(new next_date, payment_id, old next_date)])
+        """
+        by_account = {}
+        for payment in due:
+            by_account.setdefault(payment['account_id'], []).append(payment)
+
+        rows = []
+        advanced = []
+        for account_id, payments in by_account.items():
+            balance = Decimal(str(payments[0]['balance']))
+            occurrences = []
+            for payment in payments:
+                next_date = payment['next_date']
+                if isinstance(next_date, datetime.datetime):
+                    next_date = next_date.date()
+                elif isinstance(next_date, str):
+                    next_date = datetime.date.fromisoformat(next_date)
+                # Paiements créés avant anchor_day : le jour de next_date tient lieu d'ancre
+                payment['anchor_day'] = payment['anchor_day'] or next_date.day
+                dates, _ = due_dates(next_date, payment['frequency'], today, payment['anchor_day'])
+                payment['first_date'] = next_date
+                payment['paid'] = 0
+                occurrences.extend((date, payment['payment_id'], payment) for date in dates)
+
+            # Ordre chronologique : les plus anciennes échéances passent en premier
+            occurrences.sort(key=lambda occurrence: occurrence[:2])
+            blocked = set()
+            for date, payment_id, payment in occurrences:
+                if payment_id in blocked:
+                    continue
+                amount = Decimal(str(payment['amount']))
+                if balance < amount:
+                    blocked.add(payment_id)  # reste dû à partir de cette échéance
+                    continue
+                balance -= amount
+                payment['paid'] += 1
+                rows.append(Database._scheduled_posting(payment, date))
+
+            for payment in payments:
+                if payment['paid']:
+                    new_date = advance(payment['first_date'], payment['frequency'], payment['paid'], payment['anchor_day'])
+                    advanced.append((new_date.isoformat(), payment['payment_id'], payment['first_date'].isoformat()))
+
+        return rows, advanced
@@ -0,0 +1,410 @@
+import datetime
+import re
+import sqlite3
+from decimal import Decimal
+from functools import lru_cache
+
+from data.config import DATABASE, ENGINE, SQLITE
+
+
+class MySQLEngine:
+    """
+    Storage engine backed by a MySQL server through mysql-connector.
+
+    The SQL in Database is written in the MySQL dialect, so statements are
+    passed through unchanged.
+    """
+
+    name = "mysql"
+
+    def __init__(self, settings=None):
+        self.settings = dict(DATABASE, **(settings or {}))
+        self.key = ("mysql", self.settings["host"], self.settings["port"],
+                    self.settings["user"], self.settings["database"])
+
+    def connect(self):
+        """Open a new raw connection."""
+        import mysql.connector
+        return mysql.connector.connect(**self.settings)
+
+    def ping(self, raw):
+        """Tell whether a pooled connection is still alive."""
+        return raw.is_connected()
+
+    def cursor(self, conn):
+        """Create a cursor returning rows as dicts."""
+        return conn.cursor(dictionary=True)
+
+    def stream_cursor(self, conn):
+        """Create an unbuffered cursor: rows stay on the server until fetched."""
+        return conn.cursor(dictionary=True, buffered=False)
+
+    def discard_results(self, raw):
+        """
+        Drop the rows an unbuffered cursor left unread on the server.
+
+        mysql-connector refuses to close such a cursor (Unread result found)
+        or to reuse its connection, e.g. when an export stream is abandoned.
+        """
+        if raw.unread_result:
+            raw.consume_results()
+
+    def prepared_cursor(self, conn):
+        """
+        Create a cursor bound to a server-side prepared statement.
+
+        Returns None when the installed connector has no prepared cursor
+        returning dicts (mysql-connector < 8.0.29 or so).
+        """
+        try:
+            return conn.cursor(prepared=True, dictionary=True)
+        except ValueError:
+            return None
+
+    def existing_indexes(self, cursor, table):
+        """Get the names of the indexes defined on a table."""
+        cursor.execute(
+            """
+            SELECT DISTINCT index_name AS index_name
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s
+            """,
+            (table,)
+        )
+        return {row['index_name'] for row in cursor.fetchall()}
+
+    def existing_columns(self, cursor, table):
+        """Get the names of the columns of a table."""
+        cursor.execute(
+            """
+            SELECT column_name AS column_name
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s
+            """,
+            (table,)
+        )
+        return {row['column_name'] for row in cursor.fetchall()}
+
+    def drop_index(self, cursor, name, table):
+        """Drop an index of a table."""
+        cursor.execute(f"DROP INDEX {name} ON {table}")
+
+    # ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT : la transaction a été annulée et peut être rejouée
+    TRANSIENT_ERRNOS = (1213, 1205)
+
+    def is_transient(self, error):
+        """Tell whether an error aborted the transaction only because of lock contention."""
+        return getattr(error, "errno", None) in self.TRANSIENT_ERRNOS
+
+    def full_scans(self, cursor, sql, params=()):
+        """
+        EXPLAIN a SELECT and report the tables it reads with a full scan.
+
+        A scan is reported even when the table has a usable index
+        (possible_keys): the optimizer ignoring it is a regression too.
+
+        Returns:
+            list: table names (or aliases) accessed with type ALL.
+        """
+        cursor.execute("EXPLAIN " + sql, params)
+        return [row['table'] for row in cursor.fetchall() if row['type'] == 'ALL']
+
+
+class SQLiteEngine:
+    """
+    Serverless storage engine backed by a local SQLite file.
+
+    Statements written in the MySQL dialect are rewritten on the fly (see
+    translate()) and connections emulate MySQL's non-autocommit behaviour:
+    the first statement opens a transaction that lasts until commit() or
+    rollback().
+    """
+
+    name = "sqlite"
+
+    def __init__(self, settings=None):
+        self.settings = dict(SQLITE, **(settings or {}))
+        self.path = self.settings["path"]
+        self.key = ("sqlite", self.path)
+
+    def connect(self):
+        """Open a new connection and apply the tuned pragmas."""
+        raw = sqlite3.connect(
+            self.path,
+            timeout=self.settings["busy_timeout"],
+            isolation_level=None,  # transactions are managed by SQLiteConnection
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,  # voir _decimal_sums()
+            check_same_thread=False,  # pooled connections move between threads
+            cached_statements=self.settings["cached_statements"],
+        )
+        raw.row_factory = _dict_row
+        for pragma, value in self.settings["pragmas"].items():
+            raw.execute(f"PRAGMA {pragma} = {value}")
+        return SQLiteConnection(raw)
+
+    def ping(self, raw):
+        """Tell whether a pooled connection is still alive."""
+        raw.execute("SELECT 1")
+        return True
+
+    def cursor(self, conn):
+        """Create a cursor returning rows as dicts."""
+        return conn.cursor(dictionary=True)
+
+    def stream_cursor(self, conn):
+        """Create a cursor for streaming; SQLite cursors already step through rows lazily."""
+        return conn.cursor(dictionary=True)
+
+    def discard_results(self, raw):
+        """Nothing to do: closing a SQLite cursor drops its pending rows."""
+
+    def prepared_cursor(self, conn):
+        """Create a cursor for one statement; sqlite3 keeps its compiled form in the connection's statement cache."""
+        return conn.cursor(dictionary=True)
+
+    def existing_indexes(self, cursor, table):
+        """Get the names of the indexes defined on a table."""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s", (table,))
+        return {row['name'] for row in cursor.fetchall()}
+
+    def existing_columns(self, cursor, table):
+        """Get the names of the columns of a table."""
+        cursor.execute("SELECT name FROM pragma_table_info(%s)", (table,))
+        return {row['name'] for row in cursor.fetchall()}
+
+    def drop_index(self, cursor, name, table):
+        """Drop an index of a table (index names are global in SQLite)."""
+        cursor.execute(f"DROP INDEX {name}")
+
+    def is_transient(self, error):
+        """Tell whether an error is SQLITE_BUSY / SQLITE_LOCKED (the busy timeout ran out)."""
+        if not isinstance(error, sqlite3.OperationalError):
+            return False
+        code = getattr(error, "sqlite_errorcode", None)
+        if code is None:
+            return "locked" in str(error) or "busy" in str(error)
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)  # codes étendus inclus
+
+    def full_scans(self, cursor, sql, params=()):
+        """
+        EXPLAIN QUERY PLAN a SELECT and report the tables it reads with a full scan.
+
+        Returns:
+            list: table names (or aliases) scanned without any index.
+        """
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        scans = []
+        for row in cursor.fetchall():
+            match = _FULL_SCAN.match(row['detail'])
+            if match and match.group(1) != "CONSTANT":
+                scans.append(match.group(1))
+        return scans
+
+
+class SQLiteConnection:
+    """Connection wrapper exposing the subset of the mysql-connector API used by Database."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def cursor(self, dictionary=True):
+        return SQLiteCursor(self._raw)
+
+    def execute(self, sql, params=()):
+        return self._raw.execute(sql, params)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def is_connected(self):
+        try:
+            self._raw.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteCursor:
+    """Cursor translating MySQL-dialect statements and %s placeholders for SQLite."""
+
+    def __init__(self, raw_conn):
+        self._conn = raw_conn
+        self._cursor = raw_conn.cursor()
+
+    def execute(self, sql, params=()):
+        statement = translate(sql)
+        if statement == "BEGIN IMMEDIATE":
+            # START TRANSACTION commits any open transaction, as in MySQL
+            if self._conn.in_transaction:
+                self._conn.commit()
+        elif not self._conn.in_transaction:
+            self._cursor.execute("BEGIN")
+        self._cursor.execute(statement, tuple(params or ()))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        if not self._conn.in_transaction:
+            self._cursor.execute("BEGIN")
+        self._cursor.executemany(translate(sql), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._cursor.fetchmany()
+        return self._cursor.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+# Ligne de plan SQLite "SCAN <table>" sans index (pas "SCAN <table> USING ... INDEX")
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING)(?:\s|$)")
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# Conversion des types déclarés vers les mêmes types Python que mysql-connector
+_CENTS = Decimal("0.01")
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()).quantize(_CENTS))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+
+
+# --- Traduction du dialecte MySQL vers SQLite ---
+
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_DATE_FORMAT = re.compile(r"DATE_FORMAT\(\s*([^,]+?)\s*,\s*'([^']*)'\s*\)", re.IGNORECASE)
+_DATE_SUB = re.compile(r"DATE_SUB\(\s*CURDATE\(\)\s*,\s*INTERVAL\s+(\d+)\s+(DAY|MONTH|YEAR)\s*\)", re.IGNORECASE)
+_ENUM = re.compile(r"(\w+)\s+ENUM\(([^)]*)\)", re.IGNORECASE)
+_ON_DUPLICATE_KEY = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_INSERTED_VALUE = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+_DATE_FORMAT_CODES = {"%i": "%M", "%s": "%S"}
+_SUM = re.compile(r"\bSUM\(", re.IGNORECASE)
+_ALIAS = re.compile(r"\s+AS\s+(\w+)", re.IGNORECASE)
+
+_SUBSTITUTIONS = [
+    (re.compile(r"^\s*START\s+TRANSACTION\s*$", re.IGNORECASE), "BEGIN IMMEDIATE"),
+    (re.compile(r"\s+FOR\s+UPDATE\s*$", re.IGNORECASE), ""),  # une transaction d'écriture verrouille déjà toute la base
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"\bAUTO_INCREMENT\b", re.IGNORECASE), "AUTOINCREMENT"),
+    (re.compile(r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", re.IGNORECASE), "DEFAULT (datetime('now', 'localtime'))"),
+    (re.compile(r"\bCURDATE\(\)", re.IGNORECASE), "date('now', 'localtime')"),
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), "datetime('now', 'localtime')"),
+    (re.compile(r"%s"), "?"),
+]
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """
+    Rewrite a MySQL-dialect statement for SQLite.
+
+    Handles DATE_FORMAT, DATE_SUB(CURDATE(), INTERVAL n ...), CURDATE(),
+    NOW(), SUM(...) AS alias (read back as Decimal), INSERT IGNORE, SELECT ... FOR UPDATE, ON DUPLICATE KEY UPDATE (as an upsert without
+    conflict target, SQLite >= 3.35), ENUM columns, AUTO_INCREMENT,
+    START TRANSACTION and %s placeholders. String literals are left
+    untouched.
+    """
+    sql = _DATE_FORMAT.sub(_date_format, sql)
+    sql = _decimal_sums(sql)
+    upsert = _ON_DUPLICATE_KEY.split(sql, maxsplit=1)
+    if len(upsert) == 2:
+        # VALUES(col) désigne la valeur proposée, "excluded.col" en SQLite
+        sql = upsert[0] + "ON CONFLICT DO UPDATE SET" + _INSERTED_VALUE.sub(r"excluded.\1", upsert[1])
+    sql = _DATE_SUB.sub(lambda m: f"date('now', 'localtime', '-{m.group(1)} {m.group(2).lower()}s')", sql)
+    sql = _ENUM.sub(lambda m: f"{m.group(1)} TEXT CHECK ({m.group(1)} IN ({m.group(2)}))", sql)
+
+    parts = _LITERAL.split(sql)
+    for i in range(0, len(parts), 2):  # les indices impairs sont des littéraux
+        for pattern, replacement in _SUBSTITUTIONS:
+            parts[i] = pattern.sub(replacement, parts[i])
+    return "".join(parts).strip()
+
+
+def _decimal_sums(sql):
+    """
+    Type the aliased SUM() columns as DECIMAL, as mysql-connector returns them.
+
+    An aggregate has no declared type, so SQLite would return a float or an
+    int. The alias becomes "total [DECIMAL]", which PARSE_COLNAMES reads as
+    the DECIMAL converter; the column is still named "total".
+    """
+    # Toutes les sommes du dépôt portent sur des montants
+    pieces = []
+    position = 0
+    for match in _SUM.finditer(sql):
+        if match.start() < position:
+            continue  # SUM imbriqué dans une somme déjà traitée
+        depth, end = 1, match.end()
+        while end < len(sql) and depth:
+            depth += {"(": 1, ")": -1}.get(sql[end], 0)
+            end += 1
+        alias = _ALIAS.match(sql, end)
+        if alias:
+            pieces.append(sql[position:end] + f' AS "{alias.group(1)} [DECIMAL]"')
+            position = alias.end()
+        else:
+            pieces.append(sql[position:end])
+            position = end
+    return "".join(pieces) + sql[position:]
+
+
+def _date_format(match):
+    fmt = match.group(2)
+    for mysql_code, sqlite_code in _DATE_FORMAT_CODES.items():
+        fmt = fmt.replace(mysql_code, sqlite_code)
+    return f"strftime('{fmt}', {match.group(1)})"
+
+
+ENGINES = {
+    "mysql": MySQLEngine,
+    "sqlite": SQLiteEngine,
+}
+
+
+def create_engine(name=None, settings=None):
+    """
+    Create the storage engine selected in data.config (or by name).
+
+    Args:
+        name: "mysql" or "sqlite"; defaults to data.config.ENGINE.
+        settings: engine-specific overrides of the configuration.
+    """
+    name = (name or ENGINE).lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown database engine: {name}")
+    return ENGINES[name](settings)
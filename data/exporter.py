@@ -0,0 +1,178 @@
+"""
+Streaming export of transactions (CSV, JSON Lines, optionally gzip-compressed).
+
+Rows come from Database.iter_transactions and are written one at a time,
+so an export runs in constant memory whatever the length of the history,
+to a file or to a pipe (standard output).
+
+Usage:
+    python -m data.exporter --user 1 -o transactions.csv
+    python -m data.exporter --account 3 --format jsonl -o - | jq .
+    python -m data.exporter --user 1 -o transactions.jsonl.gz
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import io
+import itertools
+import json
+import sys
+from contextlib import contextmanager
+from decimal import Decimal
+
+from data.database import Database
+
+
+# Colonnes exportées, dans l'ordre
+EXPORT_FIELDS = (
+    "transaction_id", "transaction_date", "reference", "description", "amount",
+    "type_name", "category_name", "account_id", "account_name", "to_account_id",
+)
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    raise TypeError(f"Type non exportable: {type(value).__name__}")
+
+
+def write_csv(rows, stream, delimiter=";"):
+    """
+    Write transactions as CSV with a header line.
+
+    Returns:
+        int: number of rows written.
+    """
+    writer = csv.writer(stream, delimiter=delimiter)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for row in rows:
+        writer.writerow(["" if row.get(field) is None else row.get(field) for field in EXPORT_FIELDS])
+        count += 1
+    return count
+
+
+def write_jsonl(rows, stream):
+    """
+    Write transactions as JSON Lines (one object per line).
+
+    Returns:
+        int: number of rows written.
+    """
+    count = 0
+    for row in rows:
+        stream.write(json.dumps({field: row.get(field) for field in EXPORT_FIELDS},
+                                default=_json_value, ensure_ascii=False))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+}
+
+
+@contextmanager
+def open_output(path, compress=None):
+    """
+    Open an export destination as a UTF-8 text stream.
+
+    Args:
+        path: file path, or '-' for standard output.
+        compress: gzip the output; defaults to True when path ends with '.gz'.
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+
+    if path == "-":
+        binary = sys.stdout.buffer
+        if compress:
+            binary = gzip.GzipFile(fileobj=binary, mode="wb")
+        stream = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        try:
+            yield stream
+        finally:
+            stream.detach()  # vide le tampon texte sans fermer la sortie standard
+            if compress:
+                binary.close()  # écrit la fin du flux gzip
+    elif compress:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as stream:
+            yield stream
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as stream:
+            yield stream
+
+
+def export_transactions(db, path, fmt=None, user_id=None, account_id=None, filters=None,
+                        compress=None, batch_size=None):
+    """
+    Export the transactions of a user or of an account.
+
+    Args:
+        db: Database instance.
+        path: destination file, or '-' for standard output.
+        fmt: 'csv' or 'jsonl'; guessed from the file name if None (csv by default).
+        user_id / account_id: scope of the export (exactly one).
+        filters: same filters as Database.get_account_transactions.
+        compress: gzip the output (default: when path ends with '.gz').
+        batch_size: rows fetched per round trip.
+
+    Returns:
+        tuple: (success, message, number of rows written)
+    """
+    if fmt is None:
+        fmt = "jsonl" if ".jsonl" in path or ".ndjson" in path else "csv"
+    if fmt not in WRITERS:
+        return False, f"Format d'export non pris en charge: {fmt}", 0
+
+    # Vérifié avant d'ouvrir (et de vider) le fichier de sortie
+    if (user_id is None) == (account_id is None):
+        return False, "Indiquer un utilisateur ou un compte.", 0
+
+    rows = db.iter_transactions(user_id=user_id, account_id=account_id, filters=filters, batch_size=batch_size)
+    try:
+        # Première ligne lue avant d'ouvrir la sortie : une requête en échec ne laisse pas de fichier vide
+        first = next(rows, None)
+        with open_output(path, compress) as stream:
+            count = WRITERS[fmt](itertools.chain([first] if first is not None else [], rows), stream)
+    except Exception as e:
+        return False, f"Erreur lors de l'export: {e}", 0
+    finally:
+        rows.close()  # Rend la connexion au pool même si l'écriture échoue
+
+    return True, f"{count} transaction(s) exportée(s).", count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export transactions as CSV or JSON Lines (optionally gzipped).")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--user", type=int, help="export every account of this user_id")
+    scope.add_argument("--account", type=int, help="export this account_id")
+    parser.add_argument("-o", "--output", default="-", help="destination file, '-' for standard output")
+    parser.add_argument("--format", choices=sorted(WRITERS), default=None)
+    parser.add_argument("--gzip", action="store_true", default=None, help="compress (implied by a .gz name)")
+    parser.add_argument("--start-date", help="YYYY-MM-DD")
+    parser.add_argument("--end-date", help="YYYY-MM-DD")
+    parser.add_argument("--batch-size", type=int, default=None, help="rows fetched per round trip")
+    args = parser.parse_args(argv)
+
+    filters = {"sort_by": "date", "sort_order": "asc"}
+    if args.start_date:
+        filters["start_date"] = args.start_date
+    if args.end_date:
+        filters["end_date"] = args.end_date
+
+    ok, message, _ = export_transactions(Database(), args.output, args.format, user_id=args.user,
+                                         account_id=args.account, filters=filters,
+                                         compress=args.gzip, batch_size=args.batch_size)
+    print(message, file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
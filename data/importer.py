@@ -0,0 +1,447 @@
+"""
+Streaming import of bank statements (CSV, OFX, QIF).
+
+Statements are parsed by generators (line by line, OFX in fixed-size
+chunks) and committed in chunks through Database.add_transactions_bulk,
+so memory stays bounded whatever the size of the file. The progress is
+saved in the same DB transaction as each chunk: running the same import
+again resumes right after the last committed chunk, and a finished import
+is not applied twice.
+
+Usage:
+    python -m data.importer releve.csv --account 3
+    python -m data.importer releve.ofx --account 3 --chunk-size 10000
+"""
+import argparse
+import csv
+import datetime
+import hashlib
+import os
+import re
+import sys
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+
+from data.config import IMPORT
+from data.database import Database
+
+
+# --- Conversion des champs ---
+
+_AMOUNT_NOISE = re.compile(r"[\s€$]")  # \s couvre aussi les espaces insécables
+_DAY_FIRST_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d.%m.%Y")
+_MONTH_FIRST_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y")
+_TIME_SUFFIXES = ("", " %H:%M", " %H:%M:%S")
+_NUMERIC_DATE = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$")
+
+
+def parse_amount(text):
+    """
+    Parse an amount as written in bank statements into a signed Decimal.
+
+    Accepts '1 234,56', '-1,234.56', '12.50 €' and '(12.50)' (negative).
+    Raises ValueError for unreadable or non-finite amounts ('NaN', 'Infinity').
+    """
+    cleaned = _AMOUNT_NOISE.sub("", str(text))
+    if cleaned.startswith("(") and cleaned.endswith(")"):
+        cleaned = "-" + cleaned[1:-1]
+    if "," in cleaned and "." in cleaned:
+        # Le dernier séparateur est le séparateur décimal
+        if cleaned.rfind(",") > cleaned.rfind("."):
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        else:
+            cleaned = cleaned.replace(",", "")
+    else:
+        cleaned = cleaned.replace(",", ".")
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Montant illisible: {text!r}")
+    # 'NaN' et 'Infinity' sont des Decimal valides mais pas des montants
+    if not amount.is_finite():
+        raise ValueError(f"Montant illisible: {text!r}")
+    return amount
+
+
+def parse_date(text, day_first=True):
+    """Parse an ISO, dd/mm/yyyy (or mm/dd/yyyy) date, with an optional time."""
+    text = text.strip()
+    # Cas le plus courant (jj/mm/aaaa sans heure) sans passer par strptime
+    match = _NUMERIC_DATE.match(text)
+    if match:
+        first, second, year = map(int, match.groups())
+        day, month = (first, second) if day_first else (second, first)
+        try:
+            return datetime.datetime(year, month, day)
+        except ValueError:
+            raise ValueError(f"Date illisible: {text!r}")
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for date_format in (_DAY_FIRST_FORMATS if day_first else _MONTH_FIRST_FORMATS):
+        for suffix in _TIME_SUFFIXES:
+            try:
+                return datetime.datetime.strptime(text, date_format + suffix)
+            except ValueError:
+                pass
+    raise ValueError(f"Date illisible: {text!r}")
+
+
+# --- CSV ---
+
+# En-têtes reconnus (normalisés : minuscules, sans accents) pour chaque champ
+CSV_COLUMNS = {
+    "date": ("date", "date operation", "date de l'operation", "transaction date", "date comptable", "booking date"),
+    "amount": ("amount", "montant", "montant (eur)", "montant eur"),
+    "debit": ("debit", "debit (eur)"),
+    "credit": ("credit", "credit (eur)"),
+    "description": ("description", "libelle", "libelle operation", "label", "memo", "payee"),
+    "category": ("category", "categorie"),
+    "type": ("type", "type name"),
+    "reference": ("reference", "ref", "id", "fitid"),
+}
+
+
+def _normalize_header(name):
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode()
+    return " ".join(text.lower().replace("_", " ").split())
+
+
+def parse_csv(stream, delimiter=None, day_first=True, columns=None):
+    """
+    Parse a CSV statement with a header line.
+
+    Args:
+        stream: text stream opened with newline=''.
+        delimiter: field separator; guessed from the header (; , tab |) if None.
+        day_first: read 01/02/2024 as 1 February (French banks) rather than 2 January.
+        columns: {field: header} overrides of CSV_COLUMNS.
+
+    Yields:
+        dict: date, amount (signed), description, category, type, reference -
+        or {'error': message} for an unreadable line.
+    """
+    header = stream.readline()
+    if not header:
+        return
+    if delimiter is None:
+        delimiter = max(";,\t|", key=header.count)
+
+    reader = csv.reader(chain([header], stream), delimiter=delimiter)
+    names = [_normalize_header(name) for name in next(reader)]
+    aliases = dict(CSV_COLUMNS)
+    for field, name in (columns or {}).items():
+        aliases[field] = (_normalize_header(name),)
+    index = {}
+    for field, candidates in aliases.items():
+        for position, name in enumerate(names):
+            if name in candidates:
+                index[field] = position
+                break
+
+    if "date" not in index or ("amount" not in index and "debit" not in index and "credit" not in index):
+        raise ValueError("Colonnes date et montant introuvables dans l'en-tête CSV.")
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            yield _csv_line(row, index, day_first)
+        except ValueError as e:
+            yield {"error": str(e)}
+
+
+def _csv_line(row, index, day_first):
+    def cell(field):
+        position = index.get(field)
+        if position is None or position >= len(row):
+            return ""
+        return row[position].strip()
+
+    if "amount" in index:
+        amount = parse_amount(cell("amount"))
+    else:
+        # Colonnes Débit / Crédit séparées : le débit peut être écrit positif ou négatif
+        debit = abs(parse_amount(cell("debit"))) if cell("debit") else Decimal("0")
+        credit = parse_amount(cell("credit")) if cell("credit") else Decimal("0")
+        amount = credit - debit
+
+    return {
+        "date": parse_date(cell("date"), day_first),
+        "amount": amount,
+        "description": cell("description"),
+        "category": cell("category"),
+        "type": cell("type"),
+        "reference": cell("reference"),
+    }
+
+
+# --- OFX / QFX ---
+
+def _ofx_elements(stream, chunk_size=65536):
+    """Yield (TAG, text) for every tag of an OFX document (SGML or XML), read in fixed-size chunks."""
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        parts = (pending + chunk).split("<")
+        pending = parts.pop() if chunk else ""
+        for part in parts:
+            tag, separator, text = part.partition(">")
+            if separator:
+                yield tag.strip().upper(), text.strip()
+        if not chunk:
+            return
+
+
+def parse_ofx(stream):
+    """
+    Parse the <STMTTRN> entries of an OFX/QFX statement.
+
+    Yields:
+        dict: same fields as parse_csv, or {'error': message}.
+    """
+    current = None
+    for tag, text in _ofx_elements(stream):
+        if tag == "STMTTRN":
+            current = {}
+        elif tag == "/STMTTRN":
+            if current is not None:
+                try:
+                    yield _ofx_line(current)
+                except ValueError as e:
+                    yield {"error": str(e)}
+            current = None
+        elif current is not None and not tag.startswith("/"):
+            current[tag] = text
+
+
+def _ofx_line(entry):
+    posted = entry.get("DTPOSTED", "")
+    digits = posted[:14]
+    try:
+        date = datetime.datetime.strptime(digits, "%Y%m%d%H%M%S" if len(digits) == 14 else "%Y%m%d")
+    except ValueError:
+        raise ValueError(f"Date illisible: {posted!r}")
+    if "TRNAMT" not in entry:
+        raise ValueError("Montant absent.")
+
+    description = " - ".join(part for part in (entry.get("NAME"), entry.get("MEMO")) if part)
+    return {
+        "date": date,
+        "amount": parse_amount(entry["TRNAMT"]),
+        "description": description,
+        "category": "",
+        "type": "",
+        "reference": entry.get("FITID") or entry.get("CHECKNUM", ""),
+    }
+
+
+# --- QIF ---
+
+def parse_qif(stream, day_first=True):
+    """
+    Parse a QIF statement (one record per '^'-terminated block).
+
+    Yields:
+        dict: same fields as parse_csv, or {'error': message}.
+    """
+    record = {}
+    for line in stream:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                yield _qif_record(record, day_first)
+            record = {}
+        elif code in "DTUPMLN":
+            record.setdefault(code, value)
+    if record:
+        yield _qif_record(record, day_first)
+
+
+def _qif_record(record, day_first):
+    try:
+        # Dates QIF : 31/12'24 ou 1/ 5/24
+        date = parse_date(record.get("D", "").replace("'", "/").replace(" ", "0"), day_first)
+        amount = parse_amount(record.get("T") or record.get("U") or "")
+    except ValueError as e:
+        return {"error": str(e)}
+
+    category = record.get("L", "")
+    if category.startswith("["):  # [Compte] = virement, pas une catégorie
+        category = ""
+    description = " - ".join(part for part in (record.get("P"), record.get("M")) if part)
+    return {
+        "date": date,
+        "amount": amount,
+        "description": description,
+        "category": category.split(":")[0],
+        "type": "",
+        "reference": record.get("N", ""),
+    }
+
+
+FORMATS = {
+    "csv": parse_csv,
+    "ofx": parse_ofx,
+    "qfx": parse_ofx,
+    "qif": parse_qif,
+}
+
+
+# --- Import ---
+
+def statement_id(path, account_id):
+    """Identify an import by the statement content and the target account (sha256, read in blocks)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(f":{account_id}".encode())
+    return digest.hexdigest()
+
+
+def to_transactions(lines, account_id, reference):
+    """
+    Map parsed statement lines to add_transactions_bulk rows.
+
+    Positive amounts become deposits and negative ones withdrawals, unless
+    the statement names a known transaction type. Categories are matched by
+    name (case-insensitive); unknown ones fall back to Revenu / Autre.
+    Error entries are passed through unchanged.
+    """
+    categories = {row['category_name'].casefold(): row['category_id'] for row in reference.categories()}
+    types = {row['type_name'].casefold(): row['type_id'] for row in reference.transaction_types()}
+    income = reference.category_id("Revenu")
+    other = reference.category_id("Autre")
+
+    for line in lines:
+        if "error" in line:
+            yield line
+            continue
+
+        amount = line["amount"]
+        type_id = types.get(line["type"].casefold()) if line.get("type") else None
+        if type_id not in (1, 2):  # Les virements d'un relevé n'ont pas de compte de destination
+            type_id = 1 if amount >= 0 else 2
+        category_id = categories.get(line["category"].casefold()) if line.get("category") else None
+        if category_id is None:
+            category_id = income if type_id == 1 else other
+
+        yield {
+            "account_id": account_id,
+            "amount": abs(amount),
+            "description": line.get("description") or None,
+            "transaction_type": type_id,
+            "category_id": category_id,
+            "reference": (line.get("reference") or "")[:50] or None,
+            "transaction_date": line["date"],
+        }
+
+
+def import_statement(db, path, account_id, fmt=None, chunk_size=None, import_id=None,
+                     encoding="utf-8-sig", **options):
+    """
+    Import a statement file into an account, committing every chunk_size lines.
+
+    Args:
+        db: Database instance.
+        path: statement file.
+        account_id: account receiving the transactions.
+        fmt: 'csv', 'ofx', 'qfx' or 'qif'; guessed from the extension if None.
+        chunk_size: lines per commit (data.config.IMPORT by default).
+        import_id: identifier of the import; by default a hash of the file
+            and the account, so re-running the same file resumes it.
+        encoding: text encoding of the file.
+        **options: passed to the parser (delimiter, day_first, columns).
+
+    Returns:
+        tuple: (success, message, report) - report has import_id, imported,
+        rejected, skipped (lines committed by a previous run), finished and
+        errors, a list of (line number, message) limited to
+        data.config.IMPORT['max_errors'].
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in FORMATS:
+        return False, f"Format de relevé non pris en charge: {fmt}", None
+
+    chunk_size = chunk_size or IMPORT["chunk_size"]
+    import_id = import_id or statement_id(path, account_id)
+    checkpoint = db.get_import_checkpoint(import_id)
+    position = checkpoint['rows_done'] if checkpoint else 0
+    report = {"import_id": import_id, "imported": 0, "rejected": 0, "skipped": position,
+              "finished": bool(checkpoint and checkpoint['finished']), "errors": []}
+    if report["finished"]:
+        return True, "Relevé déjà importé.", report
+
+    def reject(number, message):
+        report["rejected"] += 1
+        if len(report["errors"]) < IMPORT["max_errors"]:
+            report["errors"].append((number, message))
+
+    try:
+        with open(path, encoding=encoding, errors="replace", newline="" if fmt == "csv" else None) as stream:
+            lines = to_transactions(FORMATS[fmt](stream, **options), account_id, db.reference)
+            lines = islice(lines, position, None)  # Reprise : lignes déjà validées
+
+            while not report["finished"]:
+                chunk = list(islice(lines, chunk_size))
+                rows, numbers = [], []
+                for offset, line in enumerate(chunk, start=position + 1):
+                    if "error" in line:
+                        reject(offset, line["error"])
+                    else:
+                        rows.append(line)
+                        numbers.append(offset)
+
+                finished = len(chunk) < chunk_size
+                ok, message, errors = db.add_transactions_bulk(rows, checkpoint={
+                    "import_id": import_id, "account_id": account_id,
+                    "rows_done": position + len(chunk), "finished": finished})
+                if not ok:
+                    return False, message, report
+
+                for index, error in errors:
+                    reject(numbers[index], error)
+                report["imported"] += len(rows) - len(errors)
+                position += len(chunk)
+                report["finished"] = finished
+
+    except (OSError, ValueError) as e:
+        return False, f"Erreur lors de la lecture du relevé: {e}", report
+
+    return True, f"{report['imported']} transaction(s) importée(s), {report['rejected']} rejetée(s).", report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a CSV, OFX or QIF bank statement into an account.")
+    parser.add_argument("path", help="statement file")
+    parser.add_argument("--account", type=int, required=True, help="account_id receiving the transactions")
+    parser.add_argument("--format", choices=sorted(FORMATS), default=None, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=None, help="lines per commit")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    parser.add_argument("--delimiter", default=None, help="CSV field separator (guessed by default)")
+    parser.add_argument("--month-first", action="store_true", help="read 01/02/2024 as January 2nd")
+    args = parser.parse_args(argv)
+
+    fmt = (args.format or os.path.splitext(args.path)[1].lstrip(".")).lower()
+    options = {}
+    if fmt in ("csv", "qif"):
+        options["day_first"] = not args.month_first
+    if fmt == "csv" and args.delimiter:
+        options["delimiter"] = args.delimiter
+
+    ok, message, report = import_statement(Database(), args.path, args.account, fmt=fmt,
+                                           chunk_size=args.chunk_size, encoding=args.encoding, **options)
+    print(message)
+    for number, error in (report or {}).get("errors", []):
+        print(f"  ligne {number}: {error}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Per-method instrumentation of the data layer.
+
+With BUDGET_METRICS=1, every public Database method is wrapped at import
+time and records, per method: calls, latency histogram, rows fetched, SQL
+statements, SQL errors and time spent waiting for a pooled connection.
+Statements slower than METRICS['slow_query_ms'] go to the slow-query log
+with the calling method, the SQL and the shape of its parameters (types,
+never values).
+
+Disabled (the default), nothing is wrapped: the only cost left is a clock
+read and an attribute test per connection checkout.
+
+    from data.metrics import query_metrics
+    print(query_metrics.prometheus())
+    query_metrics.dump("metrics.json")
+
+Usage:
+    python -m data.metrics dump.json            # print a JSON dump in Prometheus format
+"""
+import atexit
+import bisect
+import collections
+import functools
+import inspect
+import json
+import sys
+import threading
+import time
+
+from data.config import METRICS
+
+# Bornes des histogrammes de latence (s)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MethodStats:
+    """Counters of one Database method. Updated under QueryMetrics' lock."""
+
+    def __init__(self):
+        self.calls = 0
+        self.duration = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # dernier : au-delà de la plus grande borne
+        self.rows = 0
+        self.statements = 0
+        self.sql_errors = 0
+        self.slow_queries = 0
+        self.connection_wait = 0.0
+        self.checkouts = 0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "duration_seconds": round(self.duration, 6),
+            "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], self.buckets)),
+            "rows": self.rows,
+            "statements": self.statements,
+            "sql_errors": self.sql_errors,
+            "slow_queries": self.slow_queries,
+            "connection_wait_seconds": round(self.connection_wait, 6),
+            "checkouts": self.checkouts,
+        }
+
+
+class QueryMetrics:
+    """
+    Registry of the per-method counters and of the slow-query log.
+
+    The method being run is tracked per thread, so the statements, rows and
+    connection waits are charged to the innermost Database method of the
+    calling thread (or to "-" outside of any).
+    """
+
+    def __init__(self, enabled=False, slow_query_ms=100, slow_query_log="", slow_query_keep=200):
+        """
+        Args:
+            enabled: instrument Database (checked once, at import time).
+            slow_query_ms: statements at least this long are logged.
+            slow_query_log: file the slow queries are appended to (JSON lines).
+            slow_query_keep: slow queries kept in memory.
+        """
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.slow_query_log = slow_query_log
+        self._methods = collections.defaultdict(MethodStats)
+        self._slow = collections.deque(maxlen=slow_query_keep)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_at = time.time()
+
+    # --- Appel en cours ---
+
+    def current(self):
+        """Get the name of the Database method running in this thread, or '-'."""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else "-"
+
+    def _enter(self, name):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+
+    def _leave(self):
+        self._local.stack.pop()
+
+    # --- Enregistrement ---
+
+    def record_call(self, name, seconds):
+        with self._lock:
+            stats = self._methods[name]
+            stats.calls += 1
+            stats.duration += seconds
+            stats.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def record_rows(self, count):
+        if count:
+            with self._lock:
+                self._methods[self.current()].rows += count
+
+    def record_wait(self, seconds):
+        """Charge a connection checkout and its wait to the current method."""
+        with self._lock:
+            stats = self._methods[self.current()]
+            stats.connection_wait += seconds
+            stats.checkouts += 1
+
+    def record_statement(self, sql, params, seconds, failed=False, many=False):
+        method = self.current()
+        slow = seconds >= self.slow_query_seconds
+        with self._lock:
+            stats = self._methods[method]
+            stats.statements += 1
+            if failed:
+                stats.sql_errors += 1
+            if slow:
+                stats.slow_queries += 1
+        if slow:
+            self._log_slow(method, sql, params, seconds, failed, many)
+
+    def _log_slow(self, method, sql, params, seconds, failed, many):
+        entry = {
+            "at": round(time.time(), 3),
+            "method": method,
+            "duration_ms": round(seconds * 1000, 3),
+            "sql": " ".join(str(sql).split()),
+            "params": parameter_shape(params, many),
+            "failed": failed,
+        }
+        with self._lock:
+            self._slow.append(entry)
+        if self.slow_query_log:
+            try:
+                with open(self.slow_query_log, "a", encoding="utf-8") as log:
+                    log.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Error writing slow query log: {e}")
+
+    # --- Instrumentation ---
+
+    def wrap(self, name, method):
+        """Wrap a Database method so that its calls are recorded under name."""
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator(*args, **kwargs):
+                # Durée de la création à la fermeture ; la méthode n'est « en cours » que pendant chaque reprise
+                started = time.perf_counter()
+                items = method(*args, **kwargs)
+                try:
+                    while True:
+                        self._enter(name)
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            return
+                        finally:
+                            self._leave()
+                        yield item
+                finally:
+                    self._enter(name)
+                    try:
+                        items.close()
+                    finally:
+                        self._leave()
+                        self.record_call(name, time.perf_counter() - started)
+            return generator
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            self._enter(name)
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record_call(name, time.perf_counter() - started)
+                self._leave()
+        return wrapper
+
+    def cursor(self, cursor):
+        """Wrap a cursor so that its statements and rows are recorded."""
+        return InstrumentedCursor(cursor, self)
+
+    # --- Export ---
+
+    def snapshot(self):
+        """
+        Get the counters as plain data.
+
+        Returns:
+            dict: {'started_at', 'methods': {name: MethodStats.as_dict()}, 'slow_queries': [...]}
+        """
+        with self._lock:
+            return {
+                "started_at": self._started_at,
+                "methods": {name: stats.as_dict() for name, stats in sorted(self._methods.items())},
+                "slow_queries": list(self._slow),
+            }
+
+    def reset(self):
+        """Clear every counter and the in-memory slow-query log."""
+        with self._lock:
+            self._methods.clear()
+            self._slow.clear()
+            self._started_at = time.time()
+
+    def json(self, indent=2):
+        """Export the counters and the slow queries as JSON."""
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def prometheus(self):
+        """Export the counters in the Prometheus text exposition format."""
+        return prometheus_text(self.snapshot())
+
+    def dump(self, path):
+        """Write the counters to path: Prometheus format for *.prom, JSON otherwise."""
+        text = self.prometheus() if path.endswith(".prom") else self.json()
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(text)
+
+
+class InstrumentedCursor:
+    """Cursor proxy timing every statement and counting the rows fetched."""
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            result = self._cursor.execute(sql, params)
+        except Exception:
+            self._metrics.record_statement(sql, params, time.perf_counter() - started, failed=True)
+            raise
+        self._metrics.record_statement(sql, params, time.perf_counter() - started)
+        return self if result is self._cursor else result
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        started = time.perf_counter()
+        try:
+            result = self._cursor.executemany(sql, seq_of_params)
+        except Exception:
+            self._metrics.record_statement(sql, seq_of_params, time.perf_counter() - started, failed=True, many=True)
+            raise
+        self._metrics.record_statement(sql, seq_of_params, time.perf_counter() - started, many=True)
+        return self if result is self._cursor else result
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._metrics.record_rows(1)
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._metrics.record_rows(len(rows))
+        return rows
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._metrics.record_rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def parameter_shape(params, many=False):
+    """
+    Describe statement parameters without their values.
+
+    Returns:
+        str: e.g. "(int, str, Decimal)", or "500 x (int, Decimal)" for executemany.
+    """
+    if many:
+        rows = list(params or ())
+        return f"{len(rows)} x {parameter_shape(rows[0]) if rows else '()'}"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in (params or ())) + ")"
+
+
+def prometheus_text(snapshot):
+    """Render a snapshot() in the Prometheus text exposition format."""
+    methods = snapshot["methods"]
+    lines = []
+
+    def family(name, kind, help_text, values):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for method, value in values:
+            lines.append(f'{name}{{method="{method}"}} {value}')
+
+    family("budget_db_calls_total", "counter", "Database method calls.",
+           [(method, stats["calls"]) for method, stats in methods.items() if stats["calls"]])
+
+    lines.append("# HELP budget_db_call_duration_seconds Database method latency.")
+    lines.append("# TYPE budget_db_call_duration_seconds histogram")
+    for method, stats in methods.items():
+        if not stats["calls"]:
+            continue
+        cumulative = 0
+        for bound, count in stats["buckets"].items():
+            cumulative += count
+            lines.append(f'budget_db_call_duration_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+        lines.append(f'budget_db_call_duration_seconds_sum{{method="{method}"}} {stats["duration_seconds"]}')
+        lines.append(f'budget_db_call_duration_seconds_count{{method="{method}"}} {stats["calls"]}')
+
+    family("budget_db_rows_total", "counter", "Rows fetched by Database methods.",
+           [(method, stats["rows"]) for method, stats in methods.items()])
+    family("budget_db_statements_total", "counter", "SQL statements executed.",
+           [(method, stats["statements"]) for method, stats in methods.items()])
+    family("budget_db_sql_errors_total", "counter", "SQL statements that raised.",
+           [(method, stats["sql_errors"]) for method, stats in methods.items()])
+    family("budget_db_slow_queries_total", "counter", "SQL statements over the slow-query threshold.",
+           [(method, stats["slow_queries"]) for method, stats in methods.items()])
+    family("budget_db_connection_wait_seconds_total", "counter", "Time spent waiting for a pooled connection.",
+           [(method, stats["connection_wait_seconds"]) for method, stats in methods.items()])
+    family("budget_db_connection_checkouts_total", "counter", "Pooled connections checked out.",
+           [(method, stats["checkouts"]) for method, stats in methods.items()])
+    return "\n".join(lines) + "\n"
+
+
+query_metrics = QueryMetrics(
+    enabled=METRICS["enabled"],
+    slow_query_ms=METRICS["slow_query_ms"],
+    slow_query_log=METRICS["slow_query_log"],
+    slow_query_keep=METRICS["slow_query_keep"],
+)
+
+
+def instrumented(cls):
+    """
+    Class decorator wrapping every public method of cls with query_metrics.
+
+    The *_stats accessors are left out. Does nothing when the metrics are
+    disabled, so the methods stay the plain functions.
+    """
+    if not query_metrics.enabled:
+        return cls
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or name.endswith("_stats") or not inspect.isfunction(attribute):
+            continue
+        setattr(cls, name, query_metrics.wrap(name, attribute))
+    return cls
+
+
+if query_metrics.enabled and METRICS["dump_path"]:
+    atexit.register(lambda: query_metrics.dump(METRICS["dump_path"]))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: python -m data.metrics dump.json")
+        return 2
+    with open(argv[0], encoding="utf-8") as dump:
+        print(prometheus_text(json.load(dump)), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
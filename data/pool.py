@@ -0,0 +1,232 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available before the checkout timeout."""
+
+
+class PooledConnection:
+    """
+    Proxy around a raw DB-API connection checked out of a ConnectionPool.
+
+    Every attribute is forwarded to the raw connection, except close(),
+    which hands the connection back to the pool instead of closing it.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._returned = False
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def close(self):
+        """Return the connection to the pool (idempotent)."""
+        if not self._returned:
+            self._returned = True
+            self._pool._release(self._raw, self._created_at)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of database connections.
+
+    Idle connections are reused most-recently-used first. A connection that
+    has been idle longer than health_check_interval is pinged before being
+    handed out, and one older than recycle seconds is closed and replaced.
+    """
+
+    def __init__(self, connect, size=5, timeout=10.0, recycle=3600.0,
+                 health_check_interval=30.0, ping=None):
+        """
+        Args:
+            connect: callable returning a new raw connection.
+            size: maximum number of connections (idle + checked out).
+            timeout: default seconds to wait for a free connection.
+            recycle: maximum connection age in seconds (<= 0 disables).
+            health_check_interval: idle seconds after which a connection is pinged.
+            ping: callable(raw) -> bool telling whether a connection is alive.
+        """
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.health_check_interval = health_check_interval
+        self._connect = connect
+        self._ping = ping or (lambda raw: True)
+        self._idle = deque()  # (raw, created_at, last_used)
+        self._total = 0
+        self._disposed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "checkouts": 0,
+            "returns": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "wait_time": 0.0,
+        }
+
+    def acquire(self, timeout=None):
+        """
+        Check a connection out of the pool.
+
+        Returns:
+            PooledConnection: call close() on it to give it back.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        entry = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._total < self.size:
+                    self._total += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {timeout:.1f}s "
+                        f"(pool size {self.size})"
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            raw, created_at = self._validate(entry)
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time"] += time.monotonic() - started
+        return PooledConnection(self, raw, created_at)
+
+    def _validate(self, entry):
+        """Return a usable (raw, created_at), replacing stale or dead connections."""
+        if entry is not None:
+            raw, created_at, last_used = entry
+            now = time.monotonic()
+            if self.recycle > 0 and now - created_at > self.recycle:
+                self._close_quietly(raw)
+                with self._cond:
+                    self._stats["recycled"] += 1
+            elif now - last_used > self.health_check_interval and not self._safe_ping(raw):
+                self._close_quietly(raw)
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+            else:
+                return raw, created_at
+
+        raw = self._connect()
+        with self._cond:
+            self._stats["created"] += 1
+        return raw, time.monotonic()
+
+    def _safe_ping(self, raw):
+        try:
+            return bool(self._ping(raw))
+        except Exception:
+            return False
+
+    def _release(self, raw, created_at):
+        """Put a connection back, rolling back any transaction left open."""
+        if self._disposed:
+            # Pool fermé : la connexion rendue est fermée au lieu d'être remise en réserve
+            self._close_quietly(raw)
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            return
+        try:
+            raw.rollback()
+        except Exception:
+            self._close_quietly(raw)
+            with self._cond:
+                self._total -= 1
+                self._stats["discarded"] += 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append((raw, created_at, time.monotonic()))
+            self._stats["returns"] += 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager yielding a pooled connection and returning it on exit."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self):
+        """
+        Get a snapshot of the pool statistics.
+
+        Returns:
+            dict: counters plus current size, idle and in-use connection counts.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._total
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._total - len(self._idle)
+        return stats
+
+    def dispose(self):
+        """Close every idle connection. Checked-out connections are closed on return."""
+        with self._cond:
+            self._disposed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            self._close_quietly(raw)
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(key, connect, **options):
+    """
+    Get the process-wide pool registered under key, creating it on first use.
+
+    Lets every Database instance (login screen, home screen, ...) share the
+    same connections instead of each opening its own.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(connect, **options)
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,211 @@
+"""
+Query-plan guard for the Database read paths.
+
+Runs every read method of Database against a scratch database, captures
+each SELECT it issues and EXPLAINs it. Any table read with a full scan
+(other than the small reference tables and the ALLOWED_SCANS) is reported
+as a regression.
+
+The guard seeds fixture rows, so it never runs against the application
+database: on MySQL it uses the schema named by BUDGET_PLAN_CHECK_DB
+(budget_query_plans by default, created if missing) and refuses to run if
+that is the application's BUDGET_DB_NAME.
+
+The guard runs on a scratch SQLite file unless --engine mysql is given,
+whatever BUDGET_DB_ENGINE says.
+
+Usage:
+    python -m data.query_plans                  # scratch SQLite file
+    python -m data.query_plans --engine mysql   # BUDGET_DB_HOST, BUDGET_PLAN_CHECK_DB...
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+from data.config import DATABASE
+from data.database import Database
+
+# Tables de référence de quelques lignes : un parcours complet est normal
+REFERENCE_TABLES = {"categories", "transaction_types"}
+
+# Parcours complets acceptés après examen : (méthode, table)
+ALLOWED_SCANS = set()
+
+# Transactions d'un autre utilisateur : sur des tables presque vides, l'optimiseur
+# MySQL préfère un parcours complet à un index qui ne filtrerait rien
+PADDING_ROWS = 200
+
+SCRATCH_SCHEMA = os.environ.get("BUDGET_PLAN_CHECK_DB", "budget_query_plans")
+
+_TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|LEFT\b|JOIN\b|GROUP\b|ORDER\b)(\w+))?", re.IGNORECASE)
+
+
+class _CapturingCursor:
+    """Cursor proxy recording the SELECT statements that go through it."""
+
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def execute(self, sql, params=()):
+        if sql.lstrip().upper().startswith("SELECT"):
+            self._statements.append((sql, tuple(params or ())))
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PlanCheckDatabase(Database):
+    """Database whose cursors record every SELECT they run."""
+
+    def __init__(self, *args, **kwargs):
+        self.statements = []
+        super().__init__(*args, **kwargs)
+
+    def _get_connection(self, streaming=False):
+        conn, cursor = super()._get_connection(streaming)
+        return conn, _CapturingCursor(cursor, self.statements)
+
+
+def _aliases(sql):
+    """Map every alias (and table name) used in a statement to its table."""
+    mapping = {}
+    for table, alias in _TABLE_ALIAS.findall(sql):
+        mapping[table] = table
+        if alias:
+            mapping[alias] = table
+    return mapping
+
+
+def _fixture_user(db, first_name, email):
+    """Register a fixture user, or log it in when a previous run already created it."""
+    ok, message, user_id = db.register_user(first_name, "Check", email, "Plan-Check-2024!")
+    if not ok:
+        _, _, user = db.login_user(email, "Plan-Check-2024!")
+        user_id = user["user_id"]
+    return user_id
+
+
+def seed(db):
+    """Create the minimal data every read method needs to run all its queries."""
+    padding_id = _fixture_user(db, "Padding", "plan.padding@example.com")
+    padding_account = db.get_user_accounts(padding_id)[0]["account_id"]
+    db.add_transactions_bulk([
+        {"account_id": padding_account, "amount": "1.00", "description": f"Plan check padding {n}",
+         "transaction_type": 1 if n % 2 else 2, "category_id": 8 if n % 2 else 1 + n % 7}
+        for n in range(PADDING_ROWS)
+    ])
+
+    user_id = _fixture_user(db, "Plan", "plan.check@example.com")
+    account_id = db.get_user_accounts(user_id)[0]["account_id"]
+    db.add_transaction(account_id, "100.00", "Plan check deposit", 1, 8)
+    db.add_transaction(account_id, "10.00", "Plan check withdrawal", 2, 2)
+    db.create_scheduled_payment(account_id, "PLAN-CHECK", "Plan check", "1.00", 4, "monthly", "2000-01-01")
+    return user_id, account_id
+
+
+def read_paths(db, user_id, account_id):
+    """The read methods of Database, called with representative arguments."""
+    return [
+        ("login_user", lambda: db.login_user("plan.check@example.com", "wrong password")),
+        ("get_user_accounts", lambda: db.get_user_accounts(user_id)),
+        ("get_account_transactions", lambda: db.get_account_transactions(account_id)),
+        ("get_account_transactions[filters]", lambda: db.get_account_transactions(account_id, {
+            "start_date": "2000-01-01", "end_date": "2100-01-01",
+            "category_id": 2, "type_id": 2, "sort_by": "amount", "sort_order": "desc", "limit": 5})),
+        ("get_user_transactions", lambda: db.get_user_transactions(user_id, {"limit": 5})),
+        ("get_user_transactions[filters]", lambda: db.get_user_transactions(user_id, {
+            "start_date": "2000-01-01", "category_id": 2, "sort_by": "category", "sort_order": "asc"})),
+        ("get_user_transactions_page", lambda: db.get_user_transactions_page(user_id, {"sort_by": "amount"}, page_size=1)),
+        ("get_account_transactions_page", lambda: db.get_account_transactions_page(
+            account_id, None, db.get_account_transactions_page(account_id, None, page_size=1)[1], page_size=1)),
+        ("iter_transactions", lambda: list(db.iter_transactions(user_id=user_id, batch_size=1))),
+        ("get_account_balance", lambda: db.get_account_balance(account_id)),
+        ("get_monthly_summary", lambda: db.get_monthly_summary(user_id)),
+        ("get_category_summary", lambda: db.get_category_summary(user_id)),
+        ("get_expenses_by_category", lambda: db.get_expenses_by_category(user_id)),
+        ("get_alerts", lambda: db.get_alerts(user_id)),
+        ("get_scheduled_payments", lambda: db.get_scheduled_payments(account_id)),
+        ("get_payment_schedule", lambda: db.get_payment_schedule()),
+        ("get_payment_schedule[ids]", lambda: db.get_payment_schedule(payment_ids=[1, 2])),
+        ("get_dashboard_snapshot", lambda: (db.account_cache.invalidate(user_id), db.get_dashboard_snapshot(user_id))),
+        ("process_due_scheduled_payments", lambda: db.process_due_scheduled_payments()),
+    ]
+
+
+def check_query_plans(db, user_id, account_id):
+    """
+    EXPLAIN every SELECT issued by the Database read paths.
+
+    Returns:
+        list: (method, table, sql) for every full scan of a non-reference
+            table that is not in ALLOWED_SCANS.
+    """
+    violations = []
+    for method, call in read_paths(db, user_id, account_id):
+        db.statements.clear()
+        call()
+        statements = list(db.statements)
+        with db._connection() as (conn, cursor):
+            for sql, params in statements:
+                tables = _aliases(sql)
+                for scanned in db.engine.full_scans(cursor, sql, params):
+                    table = tables.get(scanned, scanned)
+                    if table not in REFERENCE_TABLES and (method, table) not in ALLOWED_SCANS:
+                        violations.append((method, table, " ".join(sql.split())))
+    return violations
+
+
+def scratch_settings(engine):
+    """
+    Get the settings of the scratch database the guard seeds.
+
+    Args:
+        engine: "sqlite" or "mysql".
+
+    Returns:
+        dict: engine settings, or None if the scratch schema is the application database.
+    """
+    if engine == "sqlite":
+        return {"path": os.path.join(tempfile.mkdtemp(), "plan_check.db")}
+    if SCRATCH_SCHEMA == DATABASE["database"] or not re.fullmatch(r"\w+", SCRATCH_SCHEMA):
+        return None
+    import mysql.connector
+    server = {key: value for key, value in DATABASE.items() if key != "database"}
+    conn = mysql.connector.connect(**server)
+    try:
+        conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{SCRATCH_SCHEMA}`")
+    finally:
+        conn.close()
+    return {"database": SCRATCH_SCHEMA}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engine", choices=("sqlite", "mysql"), default="sqlite",
+                        help="storage engine to check (default: a scratch SQLite file)")
+    args = parser.parse_args(argv)
+
+    settings = scratch_settings(args.engine)
+    if settings is None:
+        print(f"Refusing to seed {SCRATCH_SCHEMA!r}: set BUDGET_PLAN_CHECK_DB to a scratch schema "
+              f"other than the application database ({DATABASE['database']!r})")
+        return 2
+    db = PlanCheckDatabase(settings=settings, engine=args.engine)
+    user_id, account_id = seed(db)
+
+    violations = check_query_plans(db, user_id, account_id)
+    for method, table, sql in violations:
+        print(f"FULL SCAN {method}: {table}\n    {sql}")
+    if violations:
+        print(f"{len(violations)} query plan regression(s) on {db.engine.name}")
+        return 1
+    print(f"All query plans use indexes on {db.engine.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Calendar arithmetic for scheduled payments.
+
+Months and years are added on the calendar, not as a fixed number of days:
+a payment due on January 31st is next due on February 28th (29th in a leap
+year), then March 31st. Each monthly or yearly occurrence is computed from
+the payment's anchor day (scheduled_payments.anchor_day, the day of month
+it was created for), so a clamped month does not shift the following ones,
+whether they are posted in one pass or one pass at a time.
+"""
+import calendar
+import datetime
+
+
+# Pas de chaque fréquence : (mois, jours)
+FREQUENCIES = {
+    "weekly": (0, 7),
+    "monthly": (1, 0),
+    "yearly": (12, 0),
+}
+
+
+def add_months(date, months, day=None):
+    """
+    Add calendar months to a date, clamping the day to the end of the target month.
+
+    Args:
+        day: day of month to aim for instead of date.day (anchor of a payment
+            whose date was clamped by a shorter month).
+    """
+    month_index = date.month - 1 + months
+    year = date.year + month_index // 12
+    month = month_index % 12 + 1
+    return date.replace(year=year, month=month, day=min(day or date.day, calendar.monthrange(year, month)[1]))
+
+
+def advance(date, frequency, periods=1, anchor_day=None):
+    """
+    Get the date periods occurrences after date.
+
+    Args:
+        anchor_day: day of month of the monthly and yearly occurrences
+            (date.day by default); ignored for weekly payments.
+
+    Raises:
+        ValueError: unknown frequency.
+    """
+    try:
+        months, days = FREQUENCIES[frequency]
+    except KeyError:
+        raise ValueError(f"Fréquence inconnue: {frequency}") from None
+    if months:
+        return add_months(date, months * periods, anchor_day)
+    return date + datetime.timedelta(days=days * periods)
+
+
+def due_dates(next_date, frequency, until, anchor_day=None):
+    """
+    List the occurrences of a payment that are due on or before until.
+
+    Args:
+        anchor_day: see advance().
+
+    Returns:
+        tuple: (due dates, oldest first; next date strictly after until)
+    """
+    dates = []
+    occurrence = next_date
+    while occurrence <= until:
+        dates.append(occurrence)
+        occurrence = advance(next_date, frequency, len(dates), anchor_day)
+    return dates, occurrence
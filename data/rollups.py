@@ -0,0 +1,33 @@
+"""
+Rebuild the monthly_rollups table from the raw transactions.
+
+Database keeps the rollups up to date on every write; this is only needed
+after transactions were modified by hand or restored from a backup.
+
+Usage:
+    python -m data.rollups              # every user
+    python -m data.rollups --user 42    # a single user
+"""
+import argparse
+import sys
+
+from data.database import Database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute the monthly summary rollups.")
+    parser.add_argument("--user", type=int, default=None, help="only rebuild this user_id")
+    args = parser.parse_args(argv)
+
+    db = Database()
+    ok, result = db.rebuild_rollups(args.user)
+    if not ok:
+        print(result)
+        return 1
+    scope = f"user {args.user}" if args.user is not None else "all users"
+    print(f"Rebuilt {result} rollup row(s) for {scope} on {db.engine.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
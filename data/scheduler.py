@@ -0,0 +1,338 @@
+"""
+Standalone scheduler for the recurring payments.
+
+Keeps the next due date of every scheduled payment in an in-memory min-heap
+and posts each payment as soon as it is due, without any GUI running. The
+heap is filled once at startup, then refreshed incrementally: new payments
+are read periodically (payment_id greater than the last one seen), processed
+payments are re-read after their run, and a full resync picks up edits and
+deletions from time to time.
+
+Due payments are handed to a fixed pool of worker threads. Accounts are
+partitioned over the workers by account_id, so the payments of one account
+are always processed by the same worker, one batch after the other.
+
+Usage:
+    python -m data.scheduler                      # run until interrupted
+    python -m data.scheduler --once               # process what is due now, then exit
+    python -m data.scheduler --workers 8 --stats-interval 30
+"""
+import argparse
+import collections
+import datetime
+import heapq
+import json
+import queue
+import signal
+import sys
+import threading
+import time
+
+from data.config import SCHEDULER
+from data.database import Database
+
+
+def due_timestamp(date):
+    """Get the moment a payment due on date becomes due (local midnight), as a timestamp."""
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    return datetime.datetime.combine(date, datetime.time.min).timestamp()
+
+
+class PaymentScheduler:
+    """
+    Dispatch due scheduled payments to worker threads partitioned by account.
+
+    Counters (see stats()): the backlog of due payments not processed yet,
+    the lag of the oldest of them, and the postings throughput.
+    """
+
+    # Fenêtre du débit instantané (s)
+    THROUGHPUT_WINDOW = 60
+
+    def __init__(self, db, workers=None, batch_size=None, refresh_interval=None,
+                 resync_interval=None, retry_interval=None):
+        """
+        Args:
+            db: Database instance; its pool should hold at least workers connections.
+            workers: number of worker threads.
+            batch_size: payment ids per process_due_scheduled_payments call.
+            refresh_interval: seconds between two reads of the new payments.
+            resync_interval: seconds between two full reads of the schedule.
+            retry_interval: seconds before a payment still due after its run
+                (insufficient balance, error) is tried again.
+        """
+        self.db = db
+        self.workers = max(1, workers or SCHEDULER["workers"])
+        self.batch_size = max(1, batch_size or SCHEDULER["batch_size"])
+        self.refresh_interval = refresh_interval or SCHEDULER["refresh_interval"]
+        self.resync_interval = resync_interval or SCHEDULER["resync_interval"]
+        self.retry_interval = retry_interval or SCHEDULER["retry_interval"]
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._heap = []      # (ready_at, payment_id), entrées périmées ignorées au dépilage
+        self._entries = {}   # payment_id -> (ready_at, due_at, account_id) : seule entrée valide
+        self._pending = {}   # payment_id -> (due_at, account_id), confié à un worker et pas encore traité
+        self._last_payment_id = 0
+        self._queues = [queue.Queue() for _ in range(self.workers)]
+        self._threads = []
+        self._recent = collections.deque()  # (horodatage, écritures) dans la fenêtre de débit
+        self._started_at = None
+        self._stats = {
+            "runs": 0,          # appels de process_due_scheduled_payments
+            "payments": 0,      # paiements passés dans un run
+            "postings": 0,      # transactions écrites
+            "deferred": 0,      # paiements encore dus après leur run
+            "refreshes": 0,
+            "resyncs": 0,
+        }
+
+    # --- Échéancier ---
+
+    def _schedule(self, payment_id, account_id, next_date, retry=False):
+        """Put a payment in the heap at its due time (or at the retry time if it is overdue). Lock held."""
+        due_at = due_timestamp(next_date)
+        ready_at = max(due_at, time.time() + self.retry_interval) if retry else due_at
+        self._entries[payment_id] = (ready_at, due_at, account_id)
+        heapq.heappush(self._heap, (ready_at, payment_id))
+
+    def refresh(self):
+        """Add the payments created since the last refresh."""
+        rows = self.db.get_payment_schedule(after_payment_id=self._last_payment_id)
+        with self._lock:
+            for row in rows:
+                if row['payment_id'] not in self._pending:
+                    self._schedule(row['payment_id'], row['account_id'], row['next_date'])
+                self._last_payment_id = max(self._last_payment_id, row['payment_id'])
+            self._stats["refreshes"] += 1
+        if rows:
+            self._wakeup.set()
+        return len(rows)
+
+    def resync(self):
+        """Reload the whole schedule: picks up edited and deleted payments, and new categories."""
+        # Catégories créées depuis le démarrage du démon : rechargées au prochain accès
+        self.db.reference.invalidate()
+        rows = self.db.get_payment_schedule()
+        with self._lock:
+            if not rows and self._entries:
+                return 0  # lecture en échec (ou tout supprimé) : garder l'échéancier connu
+            self._entries = {}
+            self._heap = []
+            for row in rows:
+                if row['payment_id'] not in self._pending:
+                    self._schedule(row['payment_id'], row['account_id'], row['next_date'])
+                self._last_payment_id = max(self._last_payment_id, row['payment_id'])
+            self._stats["resyncs"] += 1
+        self._wakeup.set()
+        return len(rows)
+
+    def _next_ready_at(self):
+        """Get when the earliest payment of the heap becomes ready, or None. Lock held."""
+        while self._heap:
+            ready_at, payment_id = self._heap[0]
+            entry = self._entries.get(payment_id)
+            if entry is not None and entry[0] == ready_at:
+                return ready_at
+            heapq.heappop(self._heap)  # entrée remplacée ou supprimée
+        return None
+
+    def dispatch(self, now=None):
+        """
+        Hand every ready payment to the worker owning its account.
+
+        Returns:
+            int: number of payments dispatched.
+        """
+        now = now or time.time()
+        partitions = collections.defaultdict(list)
+        with self._lock:
+            while True:
+                ready_at = self._next_ready_at()
+                if ready_at is None or ready_at > now:
+                    break
+                _, payment_id = heapq.heappop(self._heap)
+                _, due_at, account_id = self._entries.pop(payment_id)
+                self._pending[payment_id] = (due_at, account_id)
+                partitions[account_id % self.workers].append(payment_id)
+
+        for worker, payment_ids in partitions.items():
+            for start in range(0, len(payment_ids), self.batch_size):
+                self._queues[worker].put(payment_ids[start:start + self.batch_size])
+        return sum(len(payment_ids) for payment_ids in partitions.values())
+
+    # --- Workers ---
+
+    def _work(self, worker):
+        jobs = self._queues[worker]
+        while True:
+            payment_ids = jobs.get()
+            try:
+                if payment_ids is None:
+                    return
+                self._run(payment_ids)
+            finally:
+                jobs.task_done()
+
+    def _run(self, payment_ids):
+        """Process a batch of payments of this worker's accounts, then reschedule them."""
+        # Les deux appels journalisent et absorbent leurs erreurs
+        posted = self.db.process_due_scheduled_payments(payment_ids=payment_ids)
+        rows = {row['payment_id']: row for row in self.db.get_payment_schedule(payment_ids=payment_ids)}
+
+        today = due_timestamp(datetime.date.today())
+        with self._lock:
+            for payment_id in payment_ids:
+                due_at, account_id = self._pending.pop(payment_id)
+                row = rows.get(payment_id)
+                if row is None:
+                    # Supprimé, ou échéancier illisible : réessayer, la prochaine resynchronisation fera le tri
+                    self._stats["deferred"] += 1
+                    self._schedule(payment_id, account_id, datetime.date.fromtimestamp(due_at), retry=True)
+                    continue
+                still_due = due_timestamp(row['next_date']) <= today
+                if still_due:
+                    self._stats["deferred"] += 1
+                self._schedule(payment_id, row['account_id'], row['next_date'], retry=still_due)
+            self._stats["runs"] += 1
+            self._stats["payments"] += len(payment_ids)
+            self._stats["postings"] += posted
+            self._recent.append((time.time(), posted))
+        self._wakeup.set()
+
+    # --- Cycle de vie ---
+
+    def start(self):
+        """Start the worker threads."""
+        self._started_at = time.time()
+        self._stopping.clear()
+        self._threads = [threading.Thread(target=self._work, args=(worker,), name=f"scheduler-{worker}", daemon=True)
+                         for worker in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Ask run() to return; workers finish their current batch."""
+        self._stopping.set()
+        self._wakeup.set()
+
+    def _join(self):
+        for jobs in self._queues:
+            jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def run(self):
+        """Run until stop() is called."""
+        self.start()
+        try:
+            self.resync()
+            next_refresh = time.time() + self.refresh_interval
+            next_resync = time.time() + self.resync_interval
+            while not self._stopping.is_set():
+                now = time.time()
+                if now >= next_resync:
+                    self.resync()
+                    next_resync = now + self.resync_interval
+                    next_refresh = now + self.refresh_interval
+                elif now >= next_refresh:
+                    self.refresh()
+                    next_refresh = now + self.refresh_interval
+                self.dispatch(now)
+
+                with self._lock:
+                    ready_at = self._next_ready_at()
+                wake_at = min(next_refresh, ready_at) if ready_at is not None else next_refresh
+                self._wakeup.wait(max(0.0, wake_at - time.time()))
+                self._wakeup.clear()
+        finally:
+            self._join()
+
+    def run_once(self):
+        """
+        Process everything due now, then return.
+
+        Returns:
+            dict: stats() at the end of the pass.
+        """
+        self.start()
+        try:
+            self.resync()
+            self.dispatch()
+            for jobs in self._queues:
+                jobs.join()
+        finally:
+            self._join()
+        return self.stats()
+
+    # --- Compteurs ---
+
+    def stats(self):
+        """
+        Get a snapshot of the scheduler counters.
+
+        Returns:
+            dict: the cumulative counters plus
+                backlog: due payments not processed yet (queued, running or deferred),
+                lag_seconds: how long the oldest of them has been due,
+                queued: batches waiting per worker,
+                scheduled: payments in the heap,
+                throughput: postings per second over the last minute.
+        """
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            overdue = [due_at for _, due_at, _ in self._entries.values() if due_at <= now]
+            overdue.extend(due_at for due_at, _ in self._pending.values())
+            while self._recent and self._recent[0][0] < now - self.THROUGHPUT_WINDOW:
+                self._recent.popleft()
+            window = min(self.THROUGHPUT_WINDOW, now - self._started_at) if self._started_at else 0
+            recent = sum(postings for _, postings in self._recent)
+            stats["scheduled"] = len(self._entries)
+        stats["backlog"] = len(overdue)
+        stats["lag_seconds"] = round(now - min(overdue), 1) if overdue else 0.0
+        stats["queued"] = [jobs.qsize() for jobs in self._queues]
+        stats["throughput"] = round(recent / window, 1) if window > 0 else 0.0
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post the scheduled payments as they fall due.")
+    parser.add_argument("--workers", type=int, default=SCHEDULER["workers"], help="worker threads")
+    parser.add_argument("--batch-size", type=int, default=SCHEDULER["batch_size"], help="payments per run")
+    parser.add_argument("--once", action="store_true", help="process what is due now and exit")
+    parser.add_argument("--stats-interval", type=float, default=60, help="print the counters every N seconds (0: never)")
+    args = parser.parse_args(argv)
+
+    db = Database(pool_options={"size": args.workers + 1})
+    scheduler = PaymentScheduler(db, workers=args.workers, batch_size=args.batch_size)
+
+    if args.once:
+        print(json.dumps(scheduler.run_once()))
+        return 0
+
+    def shutdown(signum, frame):
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    if args.stats_interval > 0:
+        def report():
+            while not scheduler._stopping.wait(args.stats_interval):
+                print(json.dumps(scheduler.stats()), flush=True)
+        threading.Thread(target=report, name="scheduler-stats", daemon=True).start()
+
+    print(f"Scheduler started on {db.engine.name} with {args.workers} worker(s)", flush=True)
+    scheduler.run()
+    print(json.dumps(scheduler.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Password hashing.
+
+Hashes are stored as 'pbkdf2_sha256$<iterations>$<salt>$<hash>' (salt and
+hash in hex), so the cost travels with each hash and can be raised in
+data.config without invalidating existing passwords: a hash below the
+current cost, or in the legacy '<hash>:<salt>' format (100 000 iterations),
+is recomputed on the next successful login (see needs_rehash()).
+
+Key derivation is CPU-bound. PasswordHasher runs it in a process pool so
+that neither the Tk thread nor the other logins of a server process wait
+on it.
+"""
+import atexit
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from data.config import SECURITY
+
+ALGORITHM = "pbkdf2_sha256"
+LEGACY_ITERATIONS = 100000
+SALT_BYTES = 32
+
+
+class UnknownHashFormat(ValueError):
+    """The stored password is in none of the supported formats."""
+
+
+def hash_password(password, iterations=None, salt=None):
+    """
+    Hash a password with PBKDF2-SHA256.
+
+    Returns:
+        str: 'pbkdf2_sha256$iterations$salt$hash'
+    """
+    iterations = iterations or SECURITY["pbkdf2_iterations"]
+    salt = salt or secrets.token_bytes(SALT_BYTES)
+    key = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${salt.hex()}${key.hex()}"
+
+
+def parse_hash(encoded):
+    """
+    Split a stored password into its parameters.
+
+    Returns:
+        tuple: (iterations, salt bytes, hash bytes)
+
+    Raises:
+        UnknownHashFormat: neither the current nor the legacy format.
+    """
+    try:
+        if encoded.startswith(ALGORITHM + "$"):
+            _, iterations, salt, key = encoded.split("$")
+            return int(iterations), bytes.fromhex(salt), bytes.fromhex(key)
+        key, salt = encoded.split(":")  # ancien format "hash:sel"
+        return LEGACY_ITERATIONS, bytes.fromhex(salt), bytes.fromhex(key)
+    except ValueError:
+        raise UnknownHashFormat("Erreur de format de mot de passe stocké.") from None
+
+
+def verify_password(password, encoded):
+    """
+    Check a password against a stored hash (current or legacy format).
+
+    Raises:
+        UnknownHashFormat: the stored hash cannot be read.
+    """
+    iterations, salt, expected = parse_hash(encoded)
+    key = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return hmac.compare_digest(key, expected)
+
+
+def needs_rehash(encoded):
+    """Tell whether a stored hash uses an older format or a lower cost than configured."""
+    if not encoded.startswith(ALGORITHM + "$"):
+        return True
+    try:
+        iterations, _, _ = parse_hash(encoded)
+    except UnknownHashFormat:
+        return True
+    return iterations < SECURITY["pbkdf2_iterations"]
+
+
+class PasswordHasher:
+    """
+    Run hash_password / verify_password in a pool of worker processes.
+
+    The pool is started on first use, with the "spawn" start method: it is
+    created from a worker thread of the GUI process, and forking a process
+    that runs other threads can deadlock the children on inherited locks.
+    With workers=-1, or if processes cannot be started, the work is done in
+    the calling thread.
+    """
+
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers: processes; 0 for min(2, CPUs), -1 for no pool
+                (defaults to data.config.SECURITY['hash_workers']).
+        """
+        self.workers = SECURITY["hash_workers"] if workers is None else workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self.workers < 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                try:
+                    # Un hachage par connexion : deux processus suffisent
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers or min(2, os.cpu_count() or 1),
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    atexit.register(self.shutdown)
+                except (OSError, NotImplementedError) as e:
+                    print(f"Hachage dans le thread appelant (pool de processus indisponible: {e})")
+                    self.workers = -1
+                    return None
+            return self._executor
+
+    def _call(self, func, *args):
+        pool = self._pool()
+        if pool is None:
+            return func(*args)
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool as e:
+            # Processus morts au démarrage (module principal sans garde __main__, mémoire...)
+            print(f"Hachage dans le thread appelant (pool de processus indisponible: {e})")
+            self.shutdown()
+            self.workers = -1
+            return func(*args)
+
+    def hash(self, password):
+        """Hash a password (blocks the calling thread only, not the others)."""
+        return self._call(hash_password, password, SECURITY["pbkdf2_iterations"])
+
+    def verify(self, password, encoded):
+        """Check a password against a stored hash; see verify_password()."""
+        return self._call(verify_password, password, encoded)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def shared_hasher():
+    """Get the process-wide PasswordHasher, creating it on first use."""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
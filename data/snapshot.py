@@ -0,0 +1,56 @@
+import datetime
+from dataclasses import dataclass, field
+from decimal import Decimal
+from types import MappingProxyType
+
+
+def freeze(value):
+    """
+    Recursively convert dicts to read-only mappings and lists to tuples.
+
+    Scalars (Decimal, datetime, str, ...) are already immutable and are
+    returned unchanged.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """
+    Everything the home screen displays for a user, read in one go.
+
+    Built by Database.get_dashboard_snapshot() from a single connection, so
+    all the parts come from the same point in time. Instances are immutable:
+    rows are read-only mappings and lists are tuples, so a snapshot can be
+    shared between threads or kept around without being altered.
+
+    Attributes:
+        user_id: owner of the snapshot.
+        accounts: account rows (account_id, account_name, balance).
+        total_balance: sum of the account balances.
+        monthly_summary: month ('YYYY-MM') -> {income, expenses, net}, oldest first.
+        unread_alerts: unread alert rows, most recent first.
+        scheduled_payments: account_id -> scheduled payment rows, by next_date.
+        expenses_by_category: {category, amount} rows, largest first.
+        recent_transactions: latest transactions across all accounts.
+        taken_at: when the snapshot was read.
+    """
+
+    user_id: int
+    accounts: tuple = ()
+    total_balance: Decimal = Decimal('0.00')
+    monthly_summary: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    unread_alerts: tuple = ()
+    scheduled_payments: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    expenses_by_category: tuple = ()
+    recent_transactions: tuple = ()
+    taken_at: datetime.datetime = field(default_factory=datetime.datetime.now)
+
+    @property
+    def has_scheduled_payments(self):
+        """Tell whether any account of the user has a scheduled payment."""
+        return any(self.scheduled_payments.values())
@@ -0,0 +1,257 @@
+"""
+Compiled query templates and per-connection prepared statements.
+
+The transaction listings build their SQL from a few variable parts (the
+filters present, the sort, the pagination). QueryTemplates builds the text
+of each shape once and hands it out as PreparedSQL. StatementCursor, the
+cursor Database hands out, runs PreparedSQL through a prepared statement
+kept on the pooled connection, so the server parses and plans each shape
+once per connection instead of once per call. Any other statement goes
+through the plain cursor, unchanged.
+"""
+import threading
+from collections import OrderedDict
+
+
+class PreparedSQL(str):
+    """SQL text to run as a prepared statement (see StatementCursor)."""
+
+    __slots__ = ()
+
+
+class QueryTemplates:
+    """Build the SQL text of each query shape once, with hit/miss counters."""
+
+    def __init__(self, max_templates=512):
+        """
+        Args:
+            max_templates: shapes kept; past it, new shapes are built on every call.
+        """
+        self.max_templates = max_templates
+        self._templates = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key, build):
+        """
+        Get the SQL of a query shape.
+
+        Args:
+            key: hashable description of the shape (never the parameter values).
+            build: callable returning the SQL text, called on the first request.
+
+        Returns:
+            PreparedSQL: the same object for every call with this key.
+        """
+        sql = self._templates.get(key)
+        if sql is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return sql
+        sql = PreparedSQL(build())
+        with self._lock:
+            self._stats["misses"] += 1
+            if len(self._templates) < self.max_templates:
+                sql = self._templates.setdefault(key, sql)
+        return sql
+
+    def stats(self):
+        """
+        Get a snapshot of the template counters.
+
+        Returns:
+            dict: hits, misses and the number of templates kept.
+        """
+        with self._lock:
+            return dict(self._stats, templates=len(self._templates))
+
+
+query_templates = QueryTemplates()
+
+
+class StatementCache:
+    """
+    Prepared statements of the connections of one engine.
+
+    Each raw connection keeps its own LRU of prepared cursors (one per SQL
+    text, at most size of them) for as long as it lives in the pool; the
+    evicted ones are closed, which frees the statement on the server. The
+    counters are shared by all the connections.
+    """
+
+    # Attribut posé sur la connexion brute : les requêtes préparées vivent et meurent avec elle
+    ATTRIBUTE = "_budget_prepared_statements"
+
+    def __init__(self, engine, size):
+        """
+        Args:
+            engine: storage engine providing prepared_cursor(conn).
+            size: prepared statements per connection (0 disables them).
+        """
+        self.engine = engine
+        self.size = size
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "errors": 0, "unsupported": 0}
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def checkout(self, raw, sql):
+        """
+        Get the prepared cursor of sql on a connection, preparing it on first use.
+
+        Returns:
+            tuple: (sql, cursor) - run cursor.execute with this exact sql
+                object, the connector reuses the statement only for the same
+                text object. None if the connection cannot prepare statements.
+        """
+        statements = getattr(raw, self.ATTRIBUTE, None)
+        if statements is None:
+            statements = OrderedDict()
+            try:
+                setattr(raw, self.ATTRIBUTE, statements)
+            except AttributeError:
+                self._count("unsupported")
+                return None
+
+        entry = statements.get(sql)
+        if entry is not None:
+            statements.move_to_end(sql)
+            self._count("hits")
+            return entry
+
+        cursor = self.engine.prepared_cursor(raw)
+        if cursor is None:
+            self._count("unsupported")
+            return None
+        entry = statements[sql] = (sql, cursor)
+        self._count("misses")
+        while len(statements) > self.size:
+            _, (_, evicted) = statements.popitem(last=False)
+            self._close_quietly(evicted)
+            self._count("evictions")
+        return entry
+
+    def discard(self, raw, sql):
+        """Drop the prepared statement of sql after a failure; it is prepared again next time."""
+        statements = getattr(raw, self.ATTRIBUTE, None) or {}
+        entry = statements.pop(sql, None)
+        if entry is not None:
+            self._close_quietly(entry[1])
+        self._count("errors")
+
+    @staticmethod
+    def _close_quietly(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """
+        Get a snapshot of the prepared statement counters.
+
+        Returns:
+            dict: hits, misses, evictions, errors, unsupported and size.
+        """
+        with self._lock:
+            return dict(self._stats, size=self.size)
+
+
+class StatementCursor:
+    """
+    Cursor running PreparedSQL as prepared statements and the rest as usual.
+
+    The rows of a prepared statement are read in full at execute time, so
+    the statement is free again before the next one runs on the connection.
+    """
+
+    def __init__(self, cursor, raw, cache):
+        """
+        Args:
+            cursor: plain cursor of the connection.
+            raw: raw connection the prepared statements are kept on.
+            cache: StatementCache of the engine.
+        """
+        self._cursor = cursor
+        self._raw = raw
+        self._cache = cache
+        self._rows = None  # lignes de la dernière requête préparée
+        self._prepared = None
+
+    def execute(self, sql, params=()):
+        if isinstance(sql, PreparedSQL) and self._cache.size > 0:
+            entry = self._cache.checkout(self._raw, sql)
+            if entry is not None:
+                text, cursor = entry
+                try:
+                    cursor.execute(text, tuple(params or ()))
+                    self._rows = cursor.fetchall() if cursor.description else []
+                except Exception:
+                    self._cache.discard(self._raw, sql)
+                    raise
+                self._prepared = cursor
+                return self
+        self._rows = self._prepared = None
+        self._cursor.execute(sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._rows = self._prepared = None
+        self._cursor.executemany(sql, seq_of_params)
+        return self
+
+    def fetchone(self):
+        if self._rows is None:
+            return self._cursor.fetchone()
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        if self._rows is None:
+            return self._cursor.fetchall()
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        if self._rows is None:
+            return self._cursor.fetchmany(size)
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    @property
+    def rowcount(self):
+        return (self._prepared or self._cursor).rowcount
+
+    @property
+    def lastrowid(self):
+        return (self._prepared or self._cursor).lastrowid
+
+    @property
+    def description(self):
+        return (self._prepared or self._cursor).description
+
+    def close(self):
+        """Close the plain cursor; the prepared statements stay on the connection."""
+        self._rows = self._prepared = None
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_statement_cache(key, engine, size):
+    """Get the process-wide StatementCache registered under key, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = StatementCache(engine, size)
+            _caches[key] = cache
+        return cache
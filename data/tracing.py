@@ -0,0 +1,244 @@
+"""
+End-to-end tracing, from a UI action down to the SQL statements.
+
+With BUDGET_TRACE=trace.json, every UI action (see gui.actions), every
+Database call, every connection checkout and every SQL statement becomes a
+span; the spans are written at exit as Chrome trace-event JSON, to open in
+chrome://tracing or https://ui.perfetto.dev. The loads and renders an
+action hands to BackgroundTasks are tagged with the action and linked to it
+by flow arrows, across threads.
+
+Disabled (the default), nothing is wrapped and span() returns a shared
+no-op context manager.
+"""
+import atexit
+import contextlib
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+
+from data.config import TRACING
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Tracer:
+    """Collect spans as Chrome trace events ("X" complete events, "s"/"f" flows)."""
+
+    def __init__(self, path="", max_events=500000):
+        """
+        Args:
+            path: file written by write() (and at exit); empty disables tracing.
+            max_events: events kept; later ones are counted in dropped.
+        """
+        self.path = path
+        self.enabled = bool(path)
+        self.max_events = max_events
+        self.dropped = 0
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._pid = os.getpid()
+
+    @staticmethod
+    def now():
+        """Current trace timestamp, in microseconds."""
+        return time.perf_counter_ns() / 1000
+
+    def _add(self, event):
+        thread = threading.current_thread()
+        event["pid"] = self._pid
+        event["tid"] = thread.ident
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def complete(self, name, category, start, end=None, **args):
+        """Record a span that has already ended (start and end from now())."""
+        end = self.now() if end is None else end
+        action = self.current_action()
+        if action is not None:
+            args.setdefault("action", action[1])
+        self._add({"name": name, "cat": category, "ph": "X", "ts": start, "dur": end - start, "args": args})
+
+    @contextlib.contextmanager
+    def _span(self, name, category, args):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.complete(name, category, start, **args)
+
+    def span(self, name, category="app", **args):
+        """Context manager recording a span around its block (no-op when disabled)."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name, category, args)
+
+    # --- Actions ---
+
+    def current_action(self):
+        """Get the (id, label) of the action running in this thread, or None."""
+        return getattr(self._local, "action", None)
+
+    @contextlib.contextmanager
+    def action(self, name):
+        """
+        Run a block as a UI action: a root span, and an action id inherited
+        by the spans it contains. Nested in another action, only a span.
+        """
+        if self.current_action() is not None:
+            with self._span(name, "ui", {}):
+                yield
+            return
+        action_id = next(self._ids)
+        self._local.action = (action_id, f"{name}#{action_id}")
+        try:
+            with self._span(name, "ui", {}):
+                yield
+        finally:
+            self._local.action = None
+
+    def follow(self, func, name, category):
+        """
+        Bind func to the current action, to run it later in any thread.
+
+        The call runs in a span tagged with the action and linked to the
+        point where follow() was called by a flow arrow.
+
+        Returns:
+            callable: func itself when disabled or outside of any action.
+        """
+        action = self.current_action()
+        if not self.enabled or action is None:
+            return func
+        flow_id = next(self._ids)
+        self._add({"name": name, "cat": "flow", "ph": "s", "id": flow_id, "ts": self.now()})
+
+        @functools.wraps(func)
+        def followed(*args, **kwargs):
+            previous = self.current_action()
+            self._local.action = action
+            try:
+                with self._span(name, category, {}):
+                    self._add({"name": name, "cat": "flow", "ph": "f", "bp": "e", "id": flow_id, "ts": self.now()})
+                    return func(*args, **kwargs)
+            finally:
+                self._local.action = previous
+        return followed
+
+    # --- Base de données ---
+
+    def wrap(self, name, method):
+        """Wrap a Database method in a "db" span."""
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator(*args, **kwargs):
+                with self._span(name, "db", {}):
+                    yield from method(*args, **kwargs)
+            return generator
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self._span(name, "db", {}):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def cursor(self, cursor):
+        """Wrap a cursor so that every statement is a "sql" span."""
+        return TracedCursor(cursor, self)
+
+    # --- Export ---
+
+    def events(self):
+        """Get the trace events recorded so far, with the thread names."""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        names = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in threads.items()]
+        return names + events
+
+    def write(self, path=None):
+        """Write the trace as Chrome trace-event JSON (to self.path by default)."""
+        path = path or self.path
+        trace = {"traceEvents": self.events(), "displayTimeUnit": "ms",
+                 "otherData": {"dropped_events": self.dropped}}
+        try:
+            with open(path, "w", encoding="utf-8") as output:
+                json.dump(trace, output, default=str)
+        except OSError as e:
+            print(f"Error writing trace: {e}")
+
+
+class TracedCursor:
+    """Cursor proxy recording each statement as a span with its SQL text."""
+
+    def __init__(self, cursor, tracer):
+        self._cursor = cursor
+        self._tracer = tracer
+
+    def execute(self, sql, params=()):
+        start = self._tracer.now()
+        try:
+            result = self._cursor.execute(sql, params)
+        finally:
+            self._tracer.complete(_statement_name(sql), "sql", start, sql=" ".join(str(sql).split()))
+        return self if result is self._cursor else result
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        start = self._tracer.now()
+        try:
+            result = self._cursor.executemany(sql, seq_of_params)
+        finally:
+            self._tracer.complete(_statement_name(sql), "sql", start,
+                                  sql=" ".join(str(sql).split()), rows=len(seq_of_params))
+        return self if result is self._cursor else result
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _statement_name(sql):
+    # "SELECT transactions" : verbe et première table, assez pour lire la frise
+    words = str(sql).split()
+    verb = words[0].upper() if words else "SQL"
+    for keyword in ("FROM", "INTO", "UPDATE", "TABLE"):
+        for i, word in enumerate(words[:-1]):
+            if word.upper() == keyword:
+                return f"{verb} {words[i + 1]}"
+    return verb
+
+
+tracer = Tracer(TRACING["path"], TRACING["max_events"])
+
+if tracer.enabled:
+    atexit.register(tracer.write)
+
+
+def traced(cls):
+    """
+    Class decorator putting every public method of cls in a "db" span.
+
+    The *_stats accessors are left out. Does nothing when tracing is disabled.
+    """
+    if not tracer.enabled:
+        return cls
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or name.endswith("_stats") or not inspect.isfunction(attribute):
+            continue
+        setattr(cls, name, tracer.wrap(name, attribute))
+    return cls
@@ -0,0 +1,51 @@
+import contextlib
+import functools
+
+from data.tracing import tracer
+from gui.profiler import profiler
+
+
+def ui_action(func=None, *, name=None):
+    """
+    Décorateur des actions de l'interface (clic sur la barre latérale, bouton de formulaire...).
+
+    Chaque appel ouvre une action : un span racine dans la trace
+    (BUDGET_TRACE), auquel sont rattachés les appels à la base, les
+    chargements confiés à BackgroundTasks et leur affichage. Quand le
+    profilage est armé (voir gui.profiler), l'action et ses suites sont
+    aussi profilées.
+
+    Args:
+        name: nom de l'action dans la trace (par défaut : nom de la méthode).
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled and not profiler.active:
+                return func(*args, **kwargs)
+            with tracer.action(label) if tracer.enabled else contextlib.nullcontext(), profiler.action(label):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def ui_phase(func=None, *, name=None):
+    """
+    Décorateur d'une étape d'affichage (construction des widgets, graphique...).
+
+    L'étape apparaît dans la trace comme un span « render » imbriqué dans
+    l'action en cours.
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(label, "render"):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
@@ -0,0 +1,114 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from data.tracing import tracer
+from gui.profiler import profiler
+
+
+class BackgroundTasks:
+    """
+    Exécute les appels à la base hors du thread Tk et rapporte leurs résultats.
+
+    Les fonctions soumises tournent dans un petit pool de threads ; leurs
+    résultats sont déposés dans une file que le thread Tk relève avec
+    after(), car Tk ne doit être touché que depuis son propre thread.
+    Chaque résultat porte le numéro de l'écran qui l'a demandé : s'il a été
+    remplacé entre-temps (new_screen()), le résultat est ignoré.
+    """
+
+    def __init__(self, widget, workers=4, poll_ms=30):
+        """
+        Args:
+            widget: fenêtre Tk utilisée pour after().
+            workers: nombre de threads de chargement.
+            poll_ms: intervalle de relève de la file tant que des tâches sont en cours.
+        """
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.screen = 0
+        self.dropped = 0  # résultats arrivés après un changement d'écran
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gui-load")
+        self._results = queue.SimpleQueue()
+        self._running = 0
+        self._polling = False
+        self._closed = False
+        widget.bind("<Destroy>", self._on_destroy, add="+")
+
+    def new_screen(self):
+        """Passe à un nouvel écran : les résultats encore attendus pour l'ancien seront ignorés."""
+        self.screen += 1
+        return self.screen
+
+    def is_current(self, screen):
+        """Indique si l'écran screen est toujours affiché."""
+        return screen == self.screen
+
+    def submit(self, fetch, on_done, on_error=None, always=False):
+        """
+        Lance fetch() dans un thread et appelle on_done(résultat) dans le thread Tk.
+
+        Args:
+            fetch: fonction sans argument, exécutée hors du thread Tk (pas de widget ici).
+            on_done: appelée avec le résultat si l'écran est toujours le même.
+            on_error: appelée avec l'exception levée par fetch (par défaut : affichée).
+            always: rapporter le résultat même après un changement d'écran
+                (écritures dont l'utilisateur doit connaître l'issue).
+
+        Returns:
+            int: numéro de l'écran auquel le résultat est destiné.
+        """
+        if self._closed:
+            return self.screen
+        screen = self.screen
+        self._running += 1
+        # Chargement et affichage rattachés à l'action en cours dans la trace
+        fetch = tracer.follow(fetch, "load", "background")
+        on_done = tracer.follow(on_done, "render", "render")
+        if profiler.active:
+            fetch = profiler.follow(fetch, "background")
+            on_done = profiler.follow(on_done, "tk")
+        future = self._executor.submit(fetch)
+        future.add_done_callback(lambda done: self._results.put((screen, always, done, on_done, on_error)))
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+        return screen
+
+    def _poll(self):
+        # Thread Tk : distribuer les résultats arrivés
+        while True:
+            try:
+                screen, always, future, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._running -= 1
+            if self._closed:
+                continue
+            if not always and screen != self.screen:
+                self.dropped += 1
+                continue
+            try:
+                error = future.exception()
+                if error is None:
+                    on_done(future.result())
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    print(f"Erreur de chargement: {error}")
+            except Exception as e:
+                # Une erreur d'affichage ne doit pas bloquer la relève des autres résultats
+                print(f"Erreur d'affichage: {e}")
+
+        if self._running and not self._closed:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def _on_destroy(self, event):
+        if event.widget is self.widget:
+            self.shutdown()
+
+    def shutdown(self):
+        """Arrête le pool ; les tâches pas encore commencées sont abandonnées."""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,12 +1,35 @@
 import customtkinter as ctk
 from data.database import *
 from gui.config import COLORS
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from gui.actions import ui_action, ui_phase
+from gui.background import BackgroundTasks
+from gui.profiler import bind_hotkey
+from gui.watchdog import StallWatchdog
 from PIL import Image, ImageTk
 from decimal import Decimal
 
+_charting = None
+
+
+def charting():
+    """
+    Retourne (pyplot, FigureCanvasTkAgg), importés au premier graphique.
+
+    matplotlib n'est pas importé avec le module : LoginApp le précharge en
+    arrière-plan pendant la connexion.
+    """
+    global _charting
+    if _charting is None:
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        _charting = (plt, FigureCanvasTkAgg)
+    return _charting
+
+
 class HomePageApp(ctk.CTk):
+    # Nombre de transactions chargées à la fois dans l'écran Transactions
+    TRANSACTIONS_PAGE_SIZE = 50
+
     def __init__(self, user_data):
         super().__init__()
         self.title("Budget Buddy - Accueil")
@@ -31,6 +54,14 @@ class HomePageApp(ctk.CTk):
         
         self.configure(fg_color=self.COLORS["background"])
         self.db = Database()
+        # Les lectures et écritures en base tournent hors du thread Tk
+        self.tasks = BackgroundTasks(self)
+        # Signale les blocages du thread Tk avec la pile qui les cause
+        self.watchdog = StallWatchdog(self).start()
+        # Ctrl+Maj+P : profile les prochaines actions
+        bind_hotkey(self)
+        self.account_choices = {}  # nom -> compte, pour les formulaires
+        self.write_pending = False
         self.load_images()
         self.user_data = user_data
         self.show_home_screen(self.user_data)
@@ -156,15 +187,27 @@ class HomePageApp(ctk.CTk):
             corner_radius=0
         )
         self.main_content.pack(side="right", fill="both", expand=True)
-        
-        user_data['accounts'] = self.db.get_user_accounts(user_data['user_id'])
 
         # Afficher le contenu par défaut (Accueil)
         self.show_home_content(user_data)
     
+    @ui_action
     def show_home_content(self, user_data):
         """Affiche le contenu de la page d'accueil avec des cartes et des graphiques modernes."""
         self.clear_main_content()
+        skeleton = self.show_loading(self.main_content)
+        
+        # Toutes les données de l'écran en une seule lecture (une connexion, instantané immuable)
+        self.tasks.submit(
+            lambda: self.db.get_dashboard_snapshot(user_data['user_id']),
+            lambda snapshot: self._render_home_content(user_data, snapshot, skeleton)
+        )
+    
+    @ui_phase
+    def _render_home_content(self, user_data, snapshot, skeleton):
+        """Construit l'écran d'accueil à partir de l'instantané chargé."""
+        skeleton.destroy()
+        user_data['accounts'] = [dict(account) for account in snapshot.accounts]
         
         # Scroll container pour le contenu
         self.content_scroll = ctk.CTkScrollableFrame(
@@ -190,9 +233,8 @@ class HomePageApp(ctk.CTk):
         summary_row = ctk.CTkFrame(self.content_scroll, fg_color="transparent")
         summary_row.pack(fill="x", pady=10)
         
-        # Récupération des données
-        accounts = self.db.get_user_accounts(user_data['user_id'])
-        total_balance = sum(account['balance'] for account in self.db.get_user_accounts(user_data['user_id']))
+        accounts = snapshot.accounts
+        total_balance = snapshot.total_balance
         
         # Fonction pour créer une carte de statistique
         def create_stat_card(parent, title, value, icon="", color=self.COLORS["accent"]):
@@ -220,8 +262,8 @@ class HomePageApp(ctk.CTk):
         # Cartes de statistiques
         create_stat_card(summary_row, "Solde Total", f"{total_balance}€", "💰")
         
-        # Essaie de récupérer les données de résumé mensuel
-        monthly_summary = self.db.get_monthly_summary(user_data['user_id'])
+        # Résumé mensuel
+        monthly_summary = snapshot.monthly_summary
         if monthly_summary and list(monthly_summary.keys()):
             latest_month = list(monthly_summary.keys())[0]
             income = monthly_summary[latest_month]['income']
@@ -250,7 +292,7 @@ class HomePageApp(ctk.CTk):
         chart_title.pack(pady=(15, 10), padx=15, anchor="w")
         
         # Graphique des dépenses
-        self.display_expense_chart(user_data['user_id'], chart_frame)
+        self.display_expense_chart(snapshot.expenses_by_category, chart_frame)
         
         # Colonne de droite pour les transactions
         trans_frame = ctk.CTkFrame(data_row, fg_color=self.COLORS["card"], corner_radius=10)
@@ -265,11 +307,10 @@ class HomePageApp(ctk.CTk):
         trans_title.pack(pady=(15, 10), padx=15, anchor="w")
         
         # Transactions récentes
-        self.display_recent_transactions(user_data['user_id'], trans_frame)
+        self.display_recent_transactions(snapshot.recent_transactions, trans_frame)
         
         # Section pour les alertes
-        alerts = self.db.get_alerts(user_data['user_id'])
-        unread_alerts = [alert for alert in alerts if not alert['is_read']]
+        unread_alerts = snapshot.unread_alerts
         
         if unread_alerts:
             alerts_frame = ctk.CTkFrame(self.content_scroll, fg_color=self.COLORS["card"], corner_radius=10)
@@ -304,15 +345,7 @@ class HomePageApp(ctk.CTk):
                 alert_date.pack(pady=(0, 10), padx=10, anchor="e")
         
         # Section pour les paiements programmés
-        has_scheduled_payments = False
-        
-        for account in accounts:
-            scheduled_payments = self.db.get_scheduled_payments(account['account_id'])
-            if scheduled_payments:
-                has_scheduled_payments = True
-                break
-        
-        if has_scheduled_payments:
+        if snapshot.has_scheduled_payments:
             payments_frame = ctk.CTkFrame(self.content_scroll, fg_color=self.COLORS["card"], corner_radius=10)
             payments_frame.pack(fill="x", pady=20)
             
@@ -325,7 +358,7 @@ class HomePageApp(ctk.CTk):
             payments_title.pack(pady=(15, 10), padx=15, anchor="w")
             
             for account in accounts:
-                scheduled_payments = self.db.get_scheduled_payments(account['account_id'])
+                scheduled_payments = snapshot.scheduled_payments.get(account['account_id'])
                 if scheduled_payments:
                     account_label = ctk.CTkLabel(
                         payments_frame, 
@@ -355,6 +388,7 @@ class HomePageApp(ctk.CTk):
                         )
                         payment_info.pack(pady=(0, 10), padx=10, anchor="w")
     
+    @ui_action
     def show_accounts(self, user_data):
         """Affiche les comptes de l'utilisateur."""
         self.clear_main_content()
@@ -372,7 +406,16 @@ class HomePageApp(ctk.CTk):
         page_title.pack(anchor="w")
         
         # Récupérer les comptes
-        accounts = self.db.get_user_accounts(user_data['user_id'])
+        skeleton = self.show_loading(self.main_content)
+        self.tasks.submit(
+            lambda: self.db.get_user_accounts(user_data['user_id']),
+            lambda accounts: self._render_accounts(user_data, accounts, skeleton)
+        )
+    
+    @ui_phase
+    def _render_accounts(self, user_data, accounts, skeleton):
+        """Affiche les cartes des comptes chargés."""
+        skeleton.destroy()
         
         if not accounts:
             no_accounts_frame = ctk.CTkFrame(self.main_content, fg_color=self.COLORS["card"], corner_radius=10)
@@ -471,6 +514,7 @@ class HomePageApp(ctk.CTk):
             )
             withdraw_btn.pack(side="left", padx=10)
 
+    @ui_action
     def show_transactions(self, user_data):
         """Affiche les transactions récentes avec des filtres intégrés."""
         self.clear_main_content()
@@ -628,9 +672,15 @@ class HomePageApp(ctk.CTk):
         )
         self.transactions_container.pack(fill="both", expand=True, padx=30, pady=20)
         
+        # Page suivante à la demande : bouton « Charger plus » en bas de la liste
+        self.transactions_cursor = None
+        self.transactions_loading = False
+        self.load_more_button = None
+        
         # Appliquer les filtres par défaut
         self.apply_transaction_filters(user_data)
     
+    @ui_action
     def apply_transaction_filters(self, user_data):
         """Applique les filtres et affiche les transactions correspondantes."""
         # Nettoyer le conteneur de transactions
@@ -650,13 +700,11 @@ class HomePageApp(ctk.CTk):
         
         category = self.category_combobox.get()
         if category and category != "Toutes catégories":
-            categories = {cat['category_name']: cat['category_id'] for cat in self.db.get_categories()}
-            filters['category_id'] = categories[category]
+            filters['category_id'] = self.db.reference.category_id(category)
         
         transaction_type = self.type_combobox.get()
         if transaction_type and transaction_type != "Tous types":
-            types = {t['type_name']: t['type_id'] for t in self.db.get_transaction_types()}
-            filters['type_id'] = types[transaction_type]
+            filters['type_id'] = self.db.reference.type_id(transaction_type)
         
         sort_order = self.sort_order_combobox.get()
         if sort_order:
@@ -667,22 +715,33 @@ class HomePageApp(ctk.CTk):
                 filters['sort_by'] = 'date'
                 filters['sort_order'] = 'desc' if "récent" in sort_order else 'asc'
         
-        # Récupérer les comptes et transactions
-        accounts = self.db.get_user_accounts(user_data['user_id'])
-        all_transactions = []
+        # Récupérer la première page des transactions de tous les comptes (triées par la base)
+        self.transactions_filters = filters
+        self.transactions_loading = False
+        self.transactions_cursor = None
+        self.load_more_button = None  # détruit avec le contenu du conteneur
         
-        for account in accounts:
-            transactions = self.db.get_account_transactions(account['account_id'], filters)
-            for transaction in transactions:
-                transaction['account_name'] = account['account_name']
-                all_transactions.append(transaction)
-        
-        # Trier toutes les transactions par date si nécessaire
-        if filters.get('sort_by') == 'date':
-            all_transactions.sort(
-                key=lambda x: x['formatted_date'], 
-                reverse=(filters.get('sort_order') == 'desc')
-            )
+        # Nouveaux filtres : les pages encore attendues pour les précédents seront ignorées
+        self.tasks.new_screen()
+        loading_label = ctk.CTkLabel(
+            self.transactions_container,
+            text="Chargement...",
+            font=("Helvetica", 14),
+            text_color="#9E9E9E"
+        )
+        loading_label.pack(pady=20)
+        self.tasks.submit(
+            lambda: self.db.get_user_transactions_page(
+                user_data['user_id'], filters, page_size=self.TRANSACTIONS_PAGE_SIZE
+            ),
+            lambda page: self._render_transactions(page, loading_label, user_data)
+        )
+    
+    @ui_phase
+    def _render_transactions(self, page, loading_label, user_data):
+        """Affiche la première page de transactions chargée."""
+        loading_label.destroy()
+        all_transactions, self.transactions_cursor = page
         
         # Afficher les transactions filtrées
         if not all_transactions:
@@ -701,6 +760,64 @@ class HomePageApp(ctk.CTk):
         # Afficher les transactions
         for transaction in all_transactions:
             self.create_transaction_item(transaction)
+        self._update_load_more_button(user_data)
+    
+    def _update_load_more_button(self, user_data):
+        """Place le bouton « Charger plus » sous la dernière transaction, s'il reste des pages."""
+        if self.load_more_button is not None and self.load_more_button.winfo_exists():
+            self.load_more_button.destroy()
+        self.load_more_button = None
+        if not self.transactions_cursor:
+            return
+        self.load_more_button = ctk.CTkButton(
+            self.transactions_container,
+            text="Charger plus de transactions",
+            font=("Helvetica", 12, "bold"),
+            fg_color=self.COLORS["accent"],
+            hover_color=self.COLORS["highlight"],
+            text_color=self.COLORS["text_light"],
+            corner_radius=6,
+            command=lambda: self.load_more_transactions(user_data)
+        )
+        self.load_more_button.pack(pady=10)
+    
+    @ui_action
+    def load_more_transactions(self, user_data):
+        """Ajoute la page suivante de transactions à la liste affichée."""
+        if self.transactions_loading:
+            return
+        if not self.transactions_cursor or not self.transactions_container.winfo_exists():
+            return
+        
+        filters, cursor = self.transactions_filters, self.transactions_cursor
+        self.transactions_loading = True
+        if self.load_more_button is not None:
+            self.load_more_button.configure(state="disabled", text="Chargement...")
+        
+        def append_page(page):
+            transactions, self.transactions_cursor = page
+            # Le bouton est recréé sous les nouvelles lignes
+            if self.load_more_button is not None:
+                self.load_more_button.destroy()
+                self.load_more_button = None
+            for transaction in transactions:
+                self.create_transaction_item(transaction)
+            self.transactions_loading = False
+            self._update_load_more_button(user_data)
+        
+        def page_failed(error):
+            self.transactions_loading = False
+            if self.load_more_button is not None:
+                self.load_more_button.configure(state="normal", text="Charger plus de transactions")
+            print(f"Erreur de chargement des transactions: {error}")
+        
+        self.tasks.submit(
+            lambda: self.db.get_user_transactions_page(
+                user_data['user_id'], filters, cursor=cursor, page_size=self.TRANSACTIONS_PAGE_SIZE
+            ),
+            append_page,
+            page_failed
+        )
     
     def create_transaction_item(self, transaction):
         # Couleurs selon le type de transaction
@@ -713,6 +830,7 @@ class HomePageApp(ctk.CTk):
         else:  # Transfert
             amount_color = "#FF9800"  # Orange pour les transferts
             amount_prefix = "→" if transaction['amount'] > 0 else "←"
+        display_amount = abs(transaction['amount'])
         
         # Création du cadre
         trans_card = ctk.CTkFrame(
@@ -798,6 +916,7 @@ class HomePageApp(ctk.CTk):
         )
         account_label.pack(pady=2, padx=8)
     
+    @ui_action
     def show_deposit_screen(self, user_data):
         """Affiche l'écran pour effectuer un dépôt."""
         self.clear_main_content()
@@ -822,11 +941,7 @@ class HomePageApp(ctk.CTk):
         )
         form_card.pack(fill="x", padx=30, pady=10)
         
-        # Récupérer les comptes
-        accounts = self.db.get_user_accounts(user_data['user_id'])
-        account_names = [account['account_name'] for account in accounts]
-        
-        # Sélection du compte
+        # Sélection du compte (liste remplie une fois les comptes chargés)
         account_frame = ctk.CTkFrame(form_card, fg_color="transparent")
         account_frame.pack(fill="x", padx=20, pady=15)
         
@@ -841,7 +956,7 @@ class HomePageApp(ctk.CTk):
         
         self.account_deposit_combobox = ctk.CTkComboBox(
             account_frame,
-            values=account_names,
+            values=[],
             width=300,
             font=("Helvetica", 13),
             fg_color="#F5F5F5",
@@ -849,8 +964,7 @@ class HomePageApp(ctk.CTk):
             corner_radius=6
         )
         self.account_deposit_combobox.pack(side="left", padx=10)
-        if account_names:
-            self.account_deposit_combobox.set(account_names[0])
+        self._load_account_choices(user_data, [self.account_deposit_combobox])
         
         # Montant
         amount_frame = ctk.CTkFrame(form_card, fg_color="transparent")
@@ -959,6 +1073,7 @@ class HomePageApp(ctk.CTk):
         )
         confirm_button.pack(side="left")
     
+    @ui_action
     def process_deposit(self, user_data):
         """Traite le dépôt d'argent sur un compte."""
         account_name = self.account_deposit_combobox.get()
@@ -984,41 +1099,31 @@ class HomePageApp(ctk.CTk):
             self.show_error("Veuillez ajouter une description.")
             return
         
-        # Récupérer l'ID du compte
-        accounts = self.db.get_user_accounts(user_data['user_id'])
-        account_id = None
-        for account in accounts:
-            if account['account_name'] == account_name:
-                account_id = account['account_id']
-                break
-        
-        if account_id is None:
+        # Récupérer l'ID du compte (comptes chargés avec le formulaire)
+        account = self.account_choices.get(account_name)
+        if account is None:
             self.show_error("Compte non trouvé.")
             return
+        account_id = account['account_id']
         
         # Récupérer l'ID de catégorie
-        categories = self.db.get_categories()
-        category_id = None
-        for cat in categories:
-            if cat['category_name'] == category:
-                category_id = cat['category_id']
-                break
+        category_id = self.db.reference.category_id(category)
         
         # Effectuer le dépôt
-        success = self.db.add_transaction(
-            account_id, 
-            amount, 
-            description, 
-            1,  # Type dépôt
-            category_id
+        self._submit_write(
+            lambda: self.db.add_transaction(
+                account_id, 
+                amount, 
+                description, 
+                1,  # Type dépôt
+                category_id
+            ),
+            user_data,
+            "Dépôt effectué avec succès!",
+            "Erreur lors du dépôt"
         )
-        
-        if success:
-            self.show_success("Dépôt effectué avec succès!")
-            self.show_home_content(user_data)
-        else:
-            self.show_error("Erreur lors du dépôt. Veuillez réessayer.")
     
+    @ui_action
     def process_withdraw(self, user_data):
         """Traite le retrait d'argent d'un compte."""
         account_name = self.account_withdraw_combobox.get()
@@ -1044,49 +1149,37 @@ class HomePageApp(ctk.CTk):
             self.show_error("Veuillez ajouter une description.")
             return
 
-        # Récupérer l'ID du compte
-        accounts = self.db.get_user_accounts(user_data['user_id'])
-        account_id = None
-        current_balance = Decimal('0.00')
-
-        for account in accounts:
-            if account['account_name'] == account_name:
-                account_id = account['account_id']
-                current_balance = Decimal(str(account['balance']))
-                break
-
-        if account_id is None:
+        # Récupérer l'ID du compte (comptes chargés avec le formulaire)
+        account = self.account_choices.get(account_name)
+        if account is None:
             self.show_error("Compte non trouvé.")
             return
+        account_id = account['account_id']
+        current_balance = Decimal(str(account['balance']))
 
         # Récupérer l'ID de catégorie
-        categories = self.db.get_categories()
-        category_id = None
-        for cat in categories:
-            if cat['category_name'] == category:
-                category_id = cat['category_id']
-                break
+        category_id = self.db.reference.category_id(category)
 
         # Vérifier le solde suffisant
         if current_balance < amount:
             self.show_error("Fonds insuffisants pour effectuer ce retrait.")
             return
 
-        # Effectuer le retrait
-        success = self.db.add_transaction(
-            account_id, 
-            amount, 
-            description, 
-            2,  # Type retrait
-            category_id
+        # Effectuer le retrait (la base revérifie le solde au moment de l'écriture)
+        self._submit_write(
+            lambda: self.db.add_transaction(
+                account_id, 
+                amount, 
+                description, 
+                2,  # Type retrait
+                category_id
+            ),
+            user_data,
+            "Retrait effectué avec succès!",
+            "Erreur lors du retrait"
         )
 
-        if success:
-            self.show_success("Retrait effectué avec succès!")
-            self.show_home_content(user_data)
-        else:
-            self.show_error("Erreur lors du retrait. Veuillez réessayer.")
-
+    @ui_action
     def process_transfer(self, user_data):
 
         """Traite complètement le transfert avec toutes les validations"""
@@ -1118,9 +1211,8 @@ class HomePageApp(ctk.CTk):
             if not description:
                 raise ValueError("Veuillez saisir une description")
 
-            # Récupération des comptes
-            accounts = self.db.get_user_accounts(user_data['user_id'])
-            from_account = next((a for a in accounts if a['account_name'] == from_acc_name), None)
+            # Récupération des comptes (chargés avec le formulaire)
+            from_account = self.account_choices.get(from_acc_name)
             
             if not from_account:
                 raise ValueError("Compte source introuvable")
@@ -1139,49 +1231,37 @@ class HomePageApp(ctk.CTk):
                     raise ValueError("IBAN invalide. Format: FRXX XXXX...")
 
                 # Enregistrement du transfert externe
-                success, msg = self.db.add_external_transfer(
-                    account_id=from_account['account_id'],
-                    amount=amount,
-                    beneficiary_name=to_acc_name,
-                    iban=iban,
-                    description=description
+                self._submit_write(
+                    lambda: self.db.add_external_transfer(
+                        account_id=from_account['account_id'],
+                        amount=amount,
+                        beneficiary_name=to_acc_name,
+                        iban=iban,
+                        description=description
+                    ),
+                    user_data,
+                    f"Transfert de {amount}€ vers compte externe programmé !",
+                    "Erreur lors du transfert"
                 )
-                
-                if not success:
-                    raise Exception(msg)
-                
-                self.show_success(f"Transfert de {amount}€ vers compte externe programmé !")
             
             # CAS 2: Transfert interne
             else:
-                to_account = next((a for a in accounts if a['account_name'] == to_acc_name), None)
+                to_account = self.account_choices.get(to_acc_name)
                 if not to_account:
                     raise ValueError("Compte destination introuvable")
 
-                # Exécution des transactions
-                success1, msg1 = self.db.add_transaction(
-                    account_id=from_account['account_id'],
-                    amount=-amount,
-                    description=f"Vers {to_acc_name}: {description}",
-                    transaction_type=3,
-                    to_account_id=to_account['account_id']
+                # Débit et crédit dans une seule transaction : tout ou rien
+                self._submit_write(
+                    lambda: self.db.transfer(
+                        from_account['account_id'],
+                        to_account['account_id'],
+                        amount,
+                        f"Vers {to_acc_name}: {description}"
+                    ),
+                    user_data,
+                    f"Transfert de {amount}€ effectué avec succès !",
+                    "Erreur lors du transfert"
                 )
-                
-                success2, msg2 = self.db.add_transaction(
-                    account_id=to_account['account_id'],
-                    amount=amount,
-                    description=f"De {from_acc_name}: {description}",
-                    transaction_type=3,
-                    to_account_id=from_account['account_id']
-                )
-                
-                if not (success1 and success2):
-                    raise Exception(msg1 if not success1 else msg2)
-                
-                self.show_success(f"Transfert de {amount}€ effectué avec succès !")
-            
-            # Retour à l'accueil après succès
-            self.show_home_content(user_data)
 
         except ValueError as ve:
             self.show_error(str(ve))
@@ -1203,7 +1283,7 @@ class HomePageApp(ctk.CTk):
         """Gère les transferts vers un compte fictif (épargne virtuelle)"""
         success, msg = self.db.add_transaction(
             account_id=source_account['account_id'],
-            amount=-amount,
+            amount=amount,
             description=f"Épargne virtuelle: {description}",
             transaction_type=2  # Traité comme un retrait
         )
@@ -1227,6 +1307,7 @@ class HomePageApp(ctk.CTk):
         else:
             self.show_error(msg)
 
+    @ui_action
     def show_withdraw_screen(self, user_data):
         """Affiche l'écran pour effectuer un retrait."""
         self.clear_main_content()
@@ -1251,11 +1332,7 @@ class HomePageApp(ctk.CTk):
         )
         form_card.pack(fill="x", padx=30, pady=10)
         
-        # Récupérer les comptes
-        accounts = self.db.get_user_accounts(user_data['user_id'])
-        account_names = [account['account_name'] for account in accounts]
-        
-        # Sélection du compte
+        # Sélection du compte (liste remplie une fois les comptes chargés)
         account_frame = ctk.CTkFrame(form_card, fg_color="transparent")
         account_frame.pack(fill="x", padx=20, pady=15)
         
@@ -1270,7 +1347,7 @@ class HomePageApp(ctk.CTk):
         
         self.account_withdraw_combobox = ctk.CTkComboBox(
             account_frame,
-            values=account_names,
+            values=[],
             width=300,
             font=("Helvetica", 13),
             fg_color="#F5F5F5",
@@ -1278,8 +1355,7 @@ class HomePageApp(ctk.CTk):
             corner_radius=6
         )
         self.account_withdraw_combobox.pack(side="left", padx=10)
-        if account_names:
-            self.account_withdraw_combobox.set(account_names[0])
+        self._load_account_choices(user_data, [self.account_withdraw_combobox])
         
         # Montant
         amount_frame = ctk.CTkFrame(form_card, fg_color="transparent")
@@ -1390,6 +1466,7 @@ class HomePageApp(ctk.CTk):
         )
         confirm_button.pack(side="left")
 
+    @ui_action
     def show_transfer_screen(self, user_data):
         """Affiche l'écran complet pour effectuer un transfert"""
         self.clear_main_content()
@@ -1428,18 +1505,15 @@ class HomePageApp(ctk.CTk):
             width=120
         ).pack(side="left")
         
-        accounts = self.db.get_user_accounts(user_data['user_id'])
         self.from_account_combobox = ctk.CTkComboBox(
             from_frame,
-            values=[acc['account_name'] for acc in accounts],
+            values=[],
             font=("Helvetica", 14),
             width=300,
             dropdown_font=("Helvetica", 12),
             state="readonly"
         )
         self.from_account_combobox.pack(side="left", padx=10)
-        if accounts:
-            self.from_account_combobox.set(accounts[0]['account_name'])
 
         # Compte destination
         to_frame = ctk.CTkFrame(form_card, fg_color="transparent")
@@ -1454,7 +1528,7 @@ class HomePageApp(ctk.CTk):
         
         self.to_account_combobox = ctk.CTkComboBox(
             to_frame,
-            values=[acc['account_name'] for acc in accounts] + ["Compte externe"],
+            values=["Compte externe"],
             font=("Helvetica", 14),
             width=300,
             dropdown_font=("Helvetica", 12),
@@ -1462,8 +1536,10 @@ class HomePageApp(ctk.CTk):
             command=self._toggle_external_fields
         )
         self.to_account_combobox.pack(side="left", padx=10)
-        if len(accounts) > 1:
-            self.to_account_combobox.set(accounts[1]['account_name'])
+        
+        # Comptes chargés hors du thread Tk : source = premier compte, destination = deuxième
+        self._load_account_choices(user_data, [self.from_account_combobox, self.to_account_combobox],
+                                   extra_choices=["Compte externe"])
 
         # Montant
         amount_frame = ctk.CTkFrame(form_card, fg_color="transparent")
@@ -1580,11 +1656,9 @@ class HomePageApp(ctk.CTk):
         self.from_account_combobox.configure(command=lambda _: validate_accounts())
         self.to_account_combobox.configure(command=lambda _: validate_accounts())
 
-    def display_expense_chart(self, user_id, parent_frame):
-        """Affiche un graphique circulaire des dépenses par catégorie."""
-        # Récupérer les données de dépenses par catégorie
-        expense_data = self.db.get_expenses_by_category(user_id)
-        
+    @ui_phase
+    def display_expense_chart(self, expense_data, parent_frame):
+        """Affiche un graphique circulaire des dépenses par catégorie (lignes {category, amount})."""
         if not expense_data:
             no_data_label = ctk.CTkLabel(
                 parent_frame,
@@ -1596,6 +1670,7 @@ class HomePageApp(ctk.CTk):
             return
         
         # Créer le graphique circulaire
+        plt, FigureCanvasTkAgg = charting()
         figure, ax = plt.subplots(figsize=(5, 4))
         figure.patch.set_facecolor(self.COLORS["card"])
         
@@ -1633,21 +1708,9 @@ class HomePageApp(ctk.CTk):
         canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True, padx=15, pady=15)
     
-    def display_recent_transactions(self, user_id, parent_frame):
-        """Affiche les transactions récentes dans un cadre donné."""
-        # Récupérer les comptes et les transactions récentes
-        accounts = self.db.get_user_accounts(user_id)
-        all_transactions = []
-        
-        for account in accounts:
-            transactions = self.db.get_account_transactions(account['account_id'], {'limit': 5})
-            for transaction in transactions:
-                transaction['account_name'] = account['account_name']
-                all_transactions.append(transaction)
-        
-        # Trier par date (plus récent d'abord)
-        all_transactions.sort(key=lambda x: x['formatted_date'], reverse=True)
-        
+    @ui_phase
+    def display_recent_transactions(self, all_transactions, parent_frame):
+        """Affiche les transactions récentes (déjà triées, tous comptes confondus) dans un cadre donné."""
         if not all_transactions:
             no_trans_label = ctk.CTkLabel(
                 parent_frame,
@@ -1824,6 +1887,69 @@ class HomePageApp(ctk.CTk):
         modal.grab_set()
         self.wait_window(modal)
     
+    def show_loading(self, parent, rows=3):
+        """Affiche un squelette de chargement et le retourne, à détruire quand les données arrivent."""
+        skeleton = ctk.CTkFrame(parent, fg_color="transparent")
+        skeleton.pack(fill="both", expand=True, padx=30, pady=20)
+        
+        ctk.CTkLabel(
+            skeleton,
+            text="Chargement...",
+            font=("Helvetica", 14),
+            text_color="#9E9E9E"
+        ).pack(anchor="w", pady=(0, 10))
+        
+        for _ in range(rows):
+            ctk.CTkFrame(skeleton, height=90, fg_color="#EFE8DC", corner_radius=10).pack(fill="x", pady=8)
+        return skeleton
+    
+    def _load_account_choices(self, user_data, comboboxes, extra_choices=()):
+        """
+        Charge les comptes hors du thread Tk puis remplit les listes déroulantes d'un formulaire.
+        
+        La i-ème liste est positionnée sur le i-ème compte (source, destination).
+        """
+        for combobox in comboboxes:
+            combobox.set("Chargement...")
+        
+        def fill(accounts):
+            self.account_choices = {account['account_name']: account for account in accounts}
+            names = [account['account_name'] for account in accounts]
+            for i, combobox in enumerate(comboboxes):
+                combobox.configure(values=names + list(extra_choices) if i else names)
+                combobox.set(names[i] if i < len(names) else "")
+        
+        self.tasks.submit(lambda: self.db.get_user_accounts(user_data['user_id']), fill)
+    
+    def _submit_write(self, write, user_data, success_message, error_message):
+        """
+        Exécute une écriture hors du thread Tk, puis affiche son issue et revient à l'accueil.
+        
+        write doit retourner (succès, message) comme les méthodes de Database.
+        """
+        if self.write_pending:
+            return  # Écriture déjà en cours (double clic)
+        self.write_pending = True
+        screen = self.tasks.screen
+        
+        def done(result):
+            self.write_pending = False
+            success, msg = result
+            if not success:
+                self.show_error(f"{error_message}: {msg}")
+                return
+            self.show_success(success_message)
+            # Retour à l'accueil seulement si l'utilisateur est resté sur le formulaire
+            if self.tasks.is_current(screen):
+                self.show_home_content(user_data)
+        
+        def failed(error):
+            self.write_pending = False
+            self.show_error(f"{error_message}: {error}")
+        
+        # Toujours rapporter l'issue d'une écriture, même après un changement d'écran
+        self.tasks.submit(write, done, failed, always=True)
+    
     def clear_screen(self):
         """Nettoie tous les widgets de l'écran principal."""
         for widget in self.winfo_children():
@@ -1831,10 +1957,13 @@ class HomePageApp(ctk.CTk):
     
     def clear_main_content(self):
         """Nettoie uniquement le contenu principal sans affecter la barre latérale."""
+        # Les chargements encore en cours pour l'écran précédent seront ignorés
+        self.tasks.new_screen()
         if hasattr(self, 'main_content'):
             for widget in self.main_content.winfo_children():
                 widget.destroy()
     
+    @ui_action
     def logout(self):
         """Ferme la page d'accueil et retourne à l'écran de connexion."""
         self.destroy()  # Ferme la fenêtre actuelle
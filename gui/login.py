@@ -1,21 +1,41 @@
-import os
-import sys
-import io
+import importlib
 import re
-
-# Changer l'encodage de la console en UTF-8
-os.system('chcp 65001 > nul')
-
-# Forcer l'encodage de la sortie standard en UTF-8
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+import sys
 
 import customtkinter as ctk
 from PIL import Image
+from data.config import STARTUP
 from data.database import *
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from .config import COLORS
-from gui.homepage import HomePageApp
+from gui.actions import ui_action
+from gui.background import BackgroundTasks
+from gui.profiler import bind_hotkey
+from gui.watchdog import StallWatchdog
+# gui.homepage (et matplotlib) n'est importé qu'après l'affichage de la fenêtre : voir _warm_home_page
+
+
+def configure_console():
+    """
+    Sortie standard en UTF-8 sous Windows (accents dans la console).
+
+    À appeler au lancement, pas à l'import. Ailleurs la console est déjà en UTF-8.
+    """
+    if sys.platform == "win32" and hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+
+
+# Préchargement de la page d'accueil, un module par étape (du plus bas au plus haut niveau) :
+# chaque étape reste courte, et les événements en attente passent entre deux étapes
+WARM_UP_MODULES = (
+    "numpy",
+    "matplotlib",
+    "matplotlib.colors",
+    "matplotlib.figure",
+    "matplotlib.pyplot",
+    "matplotlib.backends.backend_tkagg",
+    "gui.homepage",
+)
+
 
 class LoginApp(ctk.CTk):
     def __init__(self):
@@ -23,9 +43,36 @@ class LoginApp(ctk.CTk):
         self.title("Budget Buddy")
         self.geometry("800x600")
         self.db = Database()
+        # Hachage des mots de passe hors du thread Tk : la fenêtre reste réactive
+        self.tasks = BackgroundTasks(self, workers=2)
+        # Signale les blocages du thread Tk avec la pile qui les cause
+        self.watchdog = StallWatchdog(self).start()
+        # Ctrl+Maj+P : profile les prochaines actions
+        bind_hotkey(self)
         self.load_images()
         self.show_login_screen()
         self.show_pass = False
+        if STARTUP["warm_imports"]:
+            # Fenêtre affichée d'abord, puis la page d'accueil se charge pendant la saisie
+            self.after_idle(self._warm_home_page)
+
+    def _warm_home_page(self, step=0):
+        """
+        Importe la page d'accueil et matplotlib pendant la saisie des identifiants.
+
+        Un module de WARM_UP_MODULES par rappel after_idle, dans le thread Tk :
+        un import dans un thread tiendrait le GIL des centaines de ms d'un
+        coup, et la fenêtre ne répondrait pas mieux. Entre deux étapes, Tk
+        traite les événements en attente.
+        """
+        if step >= len(WARM_UP_MODULES):
+            return
+        try:
+            importlib.import_module(WARM_UP_MODULES[step])
+        except ImportError as e:
+            print(f"Préchargement de la page d'accueil interrompu: {e}")
+            return
+        self.after_idle(self._warm_home_page, step + 1)
 
     def load_images(self):
         """Charge les images de fond et icônes."""
@@ -44,6 +91,7 @@ class LoginApp(ctk.CTk):
     
     def show_login_screen(self):
         """Affiche l'interface de connexion."""
+        self.tasks.new_screen()
         self.clear_screen()
         self.bg_label = ctk.CTkLabel(self, image=self.images["background"])
         self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
@@ -110,6 +158,7 @@ class LoginApp(ctk.CTk):
             self.password_entry.configure(show="")
         self.show_pass = not self.show_pass
 
+    @ui_action
     def login(self):
         """Gestion de la connexion utilisateur."""
         email = self.email_entry.get()
@@ -119,17 +168,29 @@ class LoginApp(ctk.CTk):
             self.login_error_label.configure(text="Please fill in all fields.")
             return
             
-        success, message, user_data= self.db.login_user(email, password)
+        self.login_button.configure(state="disabled", text="Logging in...")
+        self.tasks.submit(
+            lambda: self.db.login_user(email, password),
+            self._on_login_done,
+            on_error=lambda error: self._on_login_done((False, str(error), None))
+        )
+
+    def _on_login_done(self, result):
+        """Affiche le résultat de la connexion (thread Tk)."""
+        success, message, user_data = result
         if success:
             self.destroy()  # Ferme la fenêtre de login
+            from gui.homepage import HomePageApp  # déjà importé si le préchargement a fini
             home_app = HomePageApp(user_data)  # Lance la page d'accueil
             home_app.mainloop()
         else:
+            self.login_button.configure(state="normal", text="Log In")
             self.login_error_label.configure(text="Wrong email or password.")
             print("Échec de connexion: ", message)
     
     def show_register_screen(self):
         """Affiche l'écran d'inscription."""
+        self.tasks.new_screen()
         self.clear_screen()
         self.bg_label = ctk.CTkLabel(self, image=self.images["background"])
         self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
@@ -218,6 +279,7 @@ class LoginApp(ctk.CTk):
             return False
         return True
         
+    @ui_action
     def register(self):
         """Gestion de l'inscription."""
         first_name = self.first_name_entry.get()
@@ -240,10 +302,20 @@ class LoginApp(ctk.CTk):
             self.register_error_label.configure(text="Password too weak.")
             return
             
-        success, message, _ = self.db.register_user(first_name, last_name, email, password)
+        self.register_submit_button.configure(state="disabled", text="Creating account...")
+        self.tasks.submit(
+            lambda: self.db.register_user(first_name, last_name, email, password),
+            self._on_register_done,
+            on_error=lambda error: self._on_register_done((False, str(error), None))
+        )
+
+    def _on_register_done(self, result):
+        """Affiche le résultat de l'inscription (thread Tk)."""
+        success, message, _ = result
         if success:
             self.show_login_screen()
         else:
+            self.register_submit_button.configure(state="normal", text="Register")
             self.register_error_label.configure(text=message)
             print("Échec d'inscription: ", message)
     
@@ -258,5 +330,6 @@ class LoginApp(ctk.CTk):
             widget.destroy()
 
 if __name__ == "__main__":
+    configure_console()
     app = LoginApp()
     app.mainloop()
\ No newline at end of file
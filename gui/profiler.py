@@ -0,0 +1,255 @@
+import atexit
+import collections
+import contextlib
+import cProfile
+import functools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+
+from data.config import PROFILING
+
+MODES = ("cprofile", "sampling", "both")
+
+
+class ActionCapture:
+    """
+    Profil d'une action de l'interface : son gestionnaire, puis les
+    chargements et affichages qu'il a confiés à BackgroundTasks.
+
+    Se termine quand le gestionnaire et toutes ses suites ont fini.
+    """
+
+    def __init__(self, profiler, number, label):
+        self.profiler = profiler
+        self.number = number
+        self.label = label
+        self.started_at = time.perf_counter()
+        self.profiles = []  # un cProfile.Profile par segment exécuté
+        self.samples = collections.Counter()  # pile repliée -> échantillons
+        self.pending = 1  # le gestionnaire lui-même
+        self.finished = False
+
+    @contextlib.contextmanager
+    def segment(self, thread_label):
+        """Exécute un morceau de l'action (dans n'importe quel thread) sous profilage."""
+        profiler = self.profiler
+        profiler._local.capture = self
+        profile = None
+        if profiler.mode in ("cprofile", "both"):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None  # un autre profileur est déjà actif (Python >= 3.12 : un seul à la fois)
+        profiler._enter(self, thread_label)
+        try:
+            yield
+        finally:
+            profiler._leave()
+            if profile is not None:
+                profile.disable()
+                self.profiles.append(profile)
+            profiler._local.capture = None
+
+    def write(self, directory):
+        """Écrit <n>-<action>.prof (cProfile) et <n>-<action>.collapsed (échantillons)."""
+        name = f"{self.number:03d}-{re.sub(r'[^A-Za-z0-9_-]', '_', self.label)}"
+        with self.profiler._lock:
+            samples = dict(self.samples)
+        written = []
+        os.makedirs(directory, exist_ok=True)
+        if self.profiles:
+            stats = pstats.Stats(self.profiles[0])
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+            path = os.path.join(directory, name + ".prof")
+            stats.dump_stats(path)
+            written.append(path)
+        if samples:
+            lines = [f"{self.label};{stack} {count}" for stack, count in sorted(samples.items())]
+            path = os.path.join(directory, name + ".collapsed")
+            with open(path, "w", encoding="utf-8") as output:
+                output.write("\n".join(lines) + "\n")
+            # Toutes les actions dans un seul fichier, une racine par action
+            with open(os.path.join(directory, "actions.collapsed"), "a", encoding="utf-8") as output:
+                output.write("\n".join(lines) + "\n")
+            written.append(path)
+        return written
+
+
+class ActionProfiler:
+    """
+    Profile les N prochaines actions de l'interface (voir gui.actions.ui_action).
+
+    Chaque action produit un fichier .prof (cProfile, à ouvrir avec pstats
+    ou snakeviz) et un fichier de piles repliées (échantillonnage de
+    sys._current_frames, pour flamegraph.pl ou speedscope), dans PROFILING['dir'].
+    """
+
+    def __init__(self, directory=None, mode=None, sample_interval_ms=None):
+        self.directory = directory or PROFILING["dir"]
+        self.mode = mode or PROFILING["mode"]
+        if self.mode not in MODES:
+            raise ValueError(f"Mode de profilage inconnu : {self.mode} ({', '.join(MODES)})")
+        self.interval = (sample_interval_ms or PROFILING["sample_interval_ms"]) / 1000
+        self.remaining = 0
+        self._count = 0
+        self._open = []  # actions en cours de capture
+        self._threads = {}  # ident -> (capture, étiquette du thread) pendant un segment
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sampler = None
+
+    @property
+    def active(self):
+        """Vrai si des actions restent à profiler ou sont en cours de capture."""
+        return self.remaining > 0 or bool(self._open)
+
+    def arm(self, actions=None, directory=None, mode=None):
+        """Profile les `actions` prochaines actions."""
+        if directory:
+            self.directory = directory
+        if mode:
+            if mode not in MODES:
+                raise ValueError(f"Mode de profilage inconnu : {mode} ({', '.join(MODES)})")
+            self.mode = mode
+        self.remaining = actions or PROFILING["hotkey_actions"]
+        print(f"Profilage des {self.remaining} prochaines actions ({self.mode}) dans {os.path.abspath(self.directory)}")
+
+    # --- Actions ---
+
+    @contextlib.contextmanager
+    def action(self, label):
+        """
+        Exécute le gestionnaire d'une action, profilé s'il reste des actions à profiler.
+
+        Dans une action déjà capturée (même thread), ne fait que l'exécuter.
+        """
+        if getattr(self._local, "capture", None) is not None or self.remaining <= 0:
+            yield
+            return
+        with self._lock:
+            stale = [capture for capture in self._open if not capture.finished]
+            self.remaining -= 1
+            self._count += 1
+            capture = ActionCapture(self, self._count, label)
+            self._open.append(capture)
+        for previous in stale:
+            self._finish(previous)  # suites abandonnées (écran changé) : clore l'action précédente
+        self._start_sampler()
+        try:
+            with capture.segment("tk"):
+                yield
+        finally:
+            self._done(capture)
+
+    def follow(self, func, thread_label):
+        """
+        Rattache func (chargement ou affichage confié à BackgroundTasks) à l'action capturée en cours.
+
+        Returns:
+            callable: func elle-même hors d'une action capturée.
+        """
+        capture = getattr(self._local, "capture", None)
+        if capture is None:
+            return func
+        with self._lock:
+            capture.pending += 1
+
+        @functools.wraps(func)
+        def followed(*args, **kwargs):
+            try:
+                if capture.finished:
+                    return func(*args, **kwargs)
+                with capture.segment(thread_label):
+                    return func(*args, **kwargs)
+            finally:
+                self._done(capture)
+        return followed
+
+    def _done(self, capture):
+        with self._lock:
+            capture.pending -= 1
+            complete = capture.pending <= 0
+        if complete:
+            self._finish(capture)
+
+    def _finish(self, capture):
+        with self._lock:
+            if capture.finished:
+                return
+            capture.finished = True
+            if capture in self._open:
+                self._open.remove(capture)
+        duration = time.perf_counter() - capture.started_at
+        try:
+            written = capture.write(self.directory)
+            print(f"Action {capture.label} profilée ({duration * 1000:.0f} ms) : {', '.join(written) or 'aucun échantillon'}")
+        except OSError as e:
+            print(f"Erreur d'écriture du profil de {capture.label}: {e}")
+
+    def finish_all(self):
+        """Écrit les actions encore ouvertes (à la sortie de l'application)."""
+        for capture in list(self._open):
+            self._finish(capture)
+
+    # --- Échantillonnage ---
+
+    def _enter(self, capture, thread_label):
+        with self._lock:
+            self._threads[threading.get_ident()] = (capture, thread_label)
+
+    def _leave(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def _start_sampler(self):
+        if self.mode not in ("sampling", "both"):
+            return
+        with self._lock:
+            if self._sampler is not None and self._sampler.is_alive():
+                return
+            self._sampler = threading.Thread(target=self._sample, name="gui-profiler", daemon=True)
+            self._sampler.start()
+
+    def _sample(self):
+        # S'arrête quand plus aucune action n'est en cours de capture
+        while self._open or self.remaining > 0:
+            time.sleep(self.interval)
+            with self._lock:
+                threads = dict(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            stacks = [(capture, f"{thread_label};{collapse(frames[ident])}")
+                      for ident, (capture, thread_label) in threads.items() if ident in frames]
+            # Sous le verrou : _finish marque l'action terminée avant que write() lise ses échantillons
+            with self._lock:
+                for capture, stack in stacks:
+                    if not capture.finished:
+                        capture.samples[stack] += 1
+
+
+def collapse(frame):
+    """Pile d'un frame au format replié : fonctions de la racine à la feuille, séparées par ';'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+profiler = ActionProfiler()
+if PROFILING["actions"] > 0:
+    profiler.arm(PROFILING["actions"])
+atexit.register(profiler.finish_all)
+
+
+def bind_hotkey(window):
+    """Ctrl+Maj+P : profile les prochaines actions de la fenêtre."""
+    window.bind("<Control-P>", lambda event: profiler.arm(), add="+")
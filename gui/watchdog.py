@@ -0,0 +1,145 @@
+import bisect
+import datetime
+import sys
+import threading
+import time
+import traceback
+
+from data.config import WATCHDOG
+from data.tracing import tracer
+
+# Bornes de l'histogramme des durées de blocage (s)
+STALL_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+class StallWatchdog:
+    """
+    Détecte les blocages de la boucle Tk et capture ce qui la bloque.
+
+    Le thread Tk bat la mesure avec after() toutes les interval_ms. Un
+    thread de surveillance vérifie que les battements arrivent : s'il n'y en
+    a pas eu depuis plus de threshold_ms, il capture la pile Python du
+    thread Tk (sys._current_frames) et la journalise, puis recommence à
+    chaque nouveau seuil écoulé, jusqu'à max_samples piles par blocage. Au
+    battement suivant, la durée du blocage est ajoutée à l'histogramme.
+    """
+
+    def __init__(self, widget, threshold_ms=None, interval_ms=None, max_samples=None, log_path=None):
+        """
+        Args:
+            widget: fenêtre Tk surveillée (HomePageApp, LoginApp).
+            threshold_ms: blocage signalé au-delà de cette durée.
+            interval_ms: intervalle des battements.
+            max_samples: piles capturées au plus par blocage.
+            log_path: fichier où ajouter les blocages (par défaut : la console).
+        """
+        self.widget = widget
+        self.threshold = (threshold_ms or WATCHDOG["threshold_ms"]) / 1000
+        self.interval_ms = interval_ms or WATCHDOG["interval_ms"]
+        self.interval = self.interval_ms / 1000
+        self.max_samples = WATCHDOG["max_samples"] if max_samples is None else max_samples
+        self.log_path = WATCHDOG["log_path"] if log_path is None else log_path
+        self.stalls = 0
+        self.longest = 0.0
+        self.total = 0.0
+        self.histogram = [0] * (len(STALL_BUCKETS) + 1)  # dernier : au-delà de la plus grande borne
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._tk_thread = None
+        self._last_beat = time.monotonic()
+        self._samples = 0  # piles capturées pour le blocage en cours
+        self._started = False
+
+    def start(self):
+        """Démarre les battements et la surveillance (sans effet si BUDGET_WATCHDOG=0)."""
+        if not WATCHDOG["enabled"] or self._started:
+            return self
+        self._started = True
+        self._tk_thread = threading.get_ident()  # appelé depuis le thread Tk
+        self._last_beat = time.monotonic()
+        self.widget.after(self.interval_ms, self._beat)
+        self.widget.bind("<Destroy>", self._on_destroy, add="+")
+        threading.Thread(target=self._watch, name="tk-watchdog", daemon=True).start()
+        return self
+
+    def _beat(self):
+        # Thread Tk : un retard au-delà du seuil est un blocage terminé
+        if self._stop.is_set():
+            return
+        now = time.monotonic()
+        with self._lock:
+            stalled = now - self._last_beat - self.interval
+            self._last_beat = now
+            self._samples = 0
+        if stalled >= self.threshold:
+            self._record(stalled)
+        try:
+            self.widget.after(self.interval_ms, self._beat)
+        except Exception:
+            self.stop()  # fenêtre détruite
+
+    def _record(self, stalled):
+        with self._lock:
+            self.stalls += 1
+            self.total += stalled
+            self.longest = max(self.longest, stalled)
+            self.histogram[bisect.bisect_left(STALL_BUCKETS, stalled)] += 1
+        if tracer.enabled:
+            tracer.complete("stall", "watchdog", tracer.now() - stalled * 1e6, seconds=round(stalled, 3))
+        self._log(f"Thread Tk débloqué après {stalled:.2f} s")
+
+    def _watch(self):
+        # Thread de surveillance : capture la pile du thread Tk pendant qu'il est bloqué
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                blocked = time.monotonic() - self._last_beat - self.interval
+                # Une pile au seuil, puis une à chaque nouveau seuil écoulé
+                if blocked < self.threshold * (self._samples + 1) or self._samples >= self.max_samples:
+                    continue
+                self._samples += 1
+                sample = self._samples
+            frame = sys._current_frames().get(self._tk_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(pile indisponible)\n"
+            self._log(f"Thread Tk bloqué depuis {blocked:.2f} s (pile {sample}/{self.max_samples}) :\n{stack}")
+
+    def _log(self, message):
+        line = f"[{datetime.datetime.now():%Y-%m-%d %H:%M:%S}] {message}"
+        if not self.log_path:
+            print(line, flush=True)
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as log:
+                log.write(line + "\n")
+        except OSError as e:
+            print(f"Erreur d'écriture du journal des blocages: {e}")
+            print(line)
+
+    def stats(self):
+        """
+        Retourne les compteurs de blocages.
+
+        Returns:
+            dict: stalls, longest_seconds, total_seconds, blocked_seconds
+                (blocage en cours) et histogram (borne -> nombre).
+        """
+        with self._lock:
+            blocked = time.monotonic() - self._last_beat - self.interval if self._started else 0.0
+            return {
+                "stalls": self.stalls,
+                "longest_seconds": round(self.longest, 3),
+                "total_seconds": round(self.total, 3),
+                "blocked_seconds": round(max(0.0, blocked), 3),
+                "histogram": dict(zip([str(bound) for bound in STALL_BUCKETS] + ["+Inf"], self.histogram)),
+            }
+
+    def _on_destroy(self, event):
+        if event.widget is self.widget:
+            self.stop()
+
+    def stop(self):
+        """Arrête la surveillance et affiche le bilan s'il y a eu des blocages."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self.stalls:
+            self._log(f"Blocages du thread Tk : {self.stats()}")
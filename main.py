@@ -1,5 +1,17 @@
-from gui.login import LoginApp
+import argparse
+
+from gui.login import LoginApp, configure_console
+from gui.profiler import MODES, profiler
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budget Buddy")
+    parser.add_argument("--profile", type=int, metavar="N", help="profile les N premières actions de l'interface")
+    parser.add_argument("--profile-mode", choices=MODES, help="cprofile, sampling ou both")
+    parser.add_argument("--profile-dir", help="dossier des profils (par défaut : profiles)")
+    args = parser.parse_args()
+    configure_console()
+    if args.profile:
+        profiler.arm(args.profile, args.profile_dir, args.profile_mode)
+
     app = LoginApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()